@@ -0,0 +1,192 @@
+"""
+Lockstep self-play: many games advanced together with NumPy.
+
+`BatchEngine.play(k)` plays `k` independent games at once. The boards are a
+(k, cells + 1) array of bytes (0 for a blank cell, else the number of the
+player that occupied it), where the extra last column is a blocked sentinel
+cell. The knight moves of every cell are precomputed as a (cells + 1, 8)
+array of cell indices padded with the sentinel, so the legal moves of the
+player to move in every game are one gather: `state[game, table[location]]
+== 0`. Since all games start together and alternate players on every ply,
+the player to move is the same in all of them; a game whose player to move
+is stuck is finished (that player loses) and drops out of the batch.
+
+Moves are chosen by batched policies, called with the boards, the (m, t)
+candidate target cells, the (m, t) legal mask, the random generator and the
+move table, which return the column of the chosen target in every game:
+
+- `random_policy`: a uniformly random legal move;
+- `mobility_policy`: the legal move leaving the most onward moves (ties are
+  broken at random).
+
+Both players place their first piece on any blank cell. The finished games
+are returned as `isolation.records.GameRecord`s, written straight to a
+record file by `generate()`; they end with the last move played (no
+termination reason), with the winner set.
+
+Run this file to generate a record file of self-play games; `--compare`
+also times `Board.play` between two `RandomPlayer`s on the same board.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from isolation import Board
+from isolation.isolation import knight_table
+from isolation.records import GameRecord
+from isolation.records import NO_MOVE
+from isolation.records import write_records
+from sample_players import RandomPlayer
+
+BATCH_SIZE = 4096  # games played in lockstep
+
+
+def neighbor_table(width, height):
+    """
+    Return the (cells + 1, 8) array of the cells a knight reaches from each
+    cell, padded with the sentinel index `cells` (also the last row).
+    """
+    cells = width * height
+    table = np.full((cells + 1, 8), cells, dtype=np.intp)
+    for index, moves in enumerate(knight_table(width, height)):
+        table[index, :len(moves)] = [r * width + c for r, c in moves]
+    return table
+
+
+def random_policy(state, targets, legal, rng, table):
+    """ Choose a uniformly random legal target in every game. """
+    scores = rng.random(legal.shape)
+    scores[~legal] = -1.
+    return scores.argmax(axis=1)
+
+
+def mobility_policy(state, targets, legal, rng, table):
+    """
+    Choose the legal target with the most blank cells a knight's move away
+    in every game, breaking ties at random.
+    """
+    games = np.arange(state.shape[0])[:, None, None]
+    mobility = (state[games, table[targets]] == 0).sum(axis=2)
+    scores = mobility + rng.random(legal.shape)
+    scores[~legal] = -1.
+    return scores.argmax(axis=1)
+
+
+POLICIES = {"random": random_policy, "mobility": mobility_policy}
+
+
+class BatchEngine(object):
+    """
+    Play self-play games in lockstep batches.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        The board geometry (at most 255 cells, the limit of game records).
+
+    policies : (callable, callable) (optional)
+        The batched policies of player 1 and player 2.
+
+    seed : int (optional)
+        Seed of the random generator of the policies.
+    """
+
+    def __init__(self, width=7, height=7, policies=(random_policy, random_policy), seed=None):
+        if width * height > NO_MOVE:
+            raise ValueError("boards of more than {} cells cannot be recorded".format(NO_MOVE))
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.policies = policies
+        self.table = neighbor_table(width, height)
+        self.rng = np.random.default_rng(seed)
+
+    def play(self, k):
+        """ Play `k` games to the end and return their `GameRecord`s. """
+        cells = self.cells
+        state = np.zeros((k, cells + 1), dtype=np.uint8)
+        state[:, cells] = 1
+        locations = np.full((k, 2), cells, dtype=np.intp)
+        moves = np.full((k, cells), NO_MOVE, dtype=np.uint8)
+        plies = np.zeros(k, dtype=np.intp)
+        winners = np.zeros(k, dtype=np.uint8)
+        first_cells = np.arange(cells)
+
+        # indices of the games still in progress
+        active = np.arange(k)
+        for ply in range(cells + 1):
+            seat = ply % 2
+            if ply < 2:
+                targets = np.broadcast_to(first_cells, (active.size, cells))
+            else:
+                targets = self.table[locations[active, seat]]
+            legal = state[active[:, None], targets] == 0
+
+            # the player to move loses the games where it is stuck
+            has_move = legal.any(axis=1)
+            winners[active[~has_move]] = 2 - seat
+            active, targets, legal = active[has_move], targets[has_move], legal[has_move]
+            if not active.size:
+                break
+
+            choice = self.policies[seat](state[active], targets, legal, self.rng, self.table)
+            cell = targets[np.arange(active.size), choice]
+            state[active, cell] = seat + 1
+            locations[active, seat] = cell
+            moves[active, ply] = cell
+            plies[active] = ply + 1
+
+        return [GameRecord(self.width, self.height, int(winners[game]), "", 0,
+                           moves[game, :plies[game]].tobytes()) for game in range(k)]
+
+    def iter_games(self, games, batch=BATCH_SIZE):
+        """ Generate the records of `games` games, played `batch` at a time. """
+        while games > 0:
+            for record in self.play(min(batch, games)):
+                yield record
+            games -= batch
+
+
+def generate(path, games, engine=None, batch=BATCH_SIZE):
+    """ Write the records of `games` self-play games of `engine` to `path`. """
+    write_records(path, (engine or BatchEngine()).iter_games(games, batch))
+
+
+def board_play_rate(games, width=7, height=7):
+    """ Return the games per second of `Board.play` between `RandomPlayer`s. """
+    start = time.perf_counter()
+    for _ in range(games):
+        Board(RandomPlayer(), RandomPlayer(), width, height).play()
+    return games / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate self-play games in lockstep batches.")
+    parser.add_argument("output", help="game record file to write")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE,
+                        help="games played in lockstep (default: %(default)s)")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--player1", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--player2", choices=sorted(POLICIES), default="random")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--compare", type=int, default=0, metavar="GAMES",
+                        help="also time this many games of Board.play with RandomPlayers")
+    args = parser.parse_args()
+
+    engine = BatchEngine(args.width, args.height,
+                         (POLICIES[args.player1], POLICIES[args.player2]), args.seed)
+    start = time.perf_counter()
+    generate(args.output, args.games, engine, args.batch)
+    rate = args.games / (time.perf_counter() - start)
+    print("{} games in {:.2f}s ({:.0f} games/s)".format(args.games, args.games / rate, rate))
+
+    if args.compare:
+        base = board_play_rate(args.compare, args.width, args.height)
+        print("Board.play with RandomPlayer: {:.0f} games/s ({:.0f}x)".format(base, rate / base))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Test cases for the lockstep self-play engine (needs NumPy).
+"""
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from isolation import Board
+from isolation.isolation import STATE_HEADER
+
+
+class ReplayPlayer(object):
+    """
+    Replay the moves of a batched game through `Board.play`, checking at
+    every turn that the legal moves of the board are those the engine
+    gathers from its move table.
+    """
+
+    def __init__(self, test, moves, table):
+        self.test = test
+        self.moves = moves
+        self.table = table
+
+    def get_move(self, game, legal_moves, time_left):
+        cells = game.width * game.height
+        state = numpy.frombuffer(bytes(game.to_bytes()[STATE_HEADER.size:]) + b"\x01",
+                                 dtype=numpy.uint8)
+        location = game.get_player_location(self)
+        if location is None:
+            targets = numpy.arange(cells)
+        else:
+            targets = self.table[location[0] * game.width + location[1]]
+        gathered = {divmod(int(cell), game.width) for cell in targets[state[targets] == 0]}
+        self.test.assertEqual(gathered, set(legal_moves))
+        if game.move_count >= len(self.moves):
+            return None
+        return divmod(self.moves[game.move_count], game.width)
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class BatchEngineTest(unittest.TestCase):
+
+    def check_games(self, engine, games):
+        for record in engine.play(games):
+            board = Board("player1", "player2", record.width, record.height)
+            for cell in record.moves:
+                move = divmod(cell, record.width)
+                self.assertIn(move, board.get_legal_moves())
+                board.apply_move(move)
+            # the game ended because the player to move is stuck
+            self.assertFalse(board.get_legal_moves())
+            self.assertEqual(record.winner, 2 if board.active_player == "player1" else 1)
+
+    def test_random_games_are_legal(self):
+        """ Every game of random policies is legal and played to the end """
+        import batch_selfplay
+        self.check_games(batch_selfplay.BatchEngine(5, 5, seed=0), 50)
+
+    def test_mobility_policy(self):
+        """ The mobility policy plays legal games against the random one """
+        import batch_selfplay
+        engine = batch_selfplay.BatchEngine(
+            7, 7, (batch_selfplay.mobility_policy, batch_selfplay.random_policy), seed=0)
+        self.check_games(engine, 50)
+
+    def test_matches_board_play(self):
+        """ Through Board.play the games have the same legal moves and winner """
+        import batch_selfplay
+        for width, height in [(5, 5), (7, 7), (4, 6)]:
+            engine = batch_selfplay.BatchEngine(width, height, seed=width * height)
+            table = batch_selfplay.neighbor_table(width, height)
+            for record in engine.play(20):
+                players = ReplayPlayer(self, record.moves, table), \
+                    ReplayPlayer(self, record.moves, table)
+                board = Board(players[0], players[1], width, height)
+                winner, history, outcome = board.play(time_limit=float("inf"))
+                # the player to move after the last recorded move had no move left
+                self.assertEqual(outcome, "illegal move")
+                self.assertEqual(board.move_count, len(record.moves))
+                self.assertIs(winner, players[record.winner - 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+"""
+Micro-benchmarks of the `isolation.Board` primitives.
+
+Every primitive is timed on a fixed corpus of mid-game positions for each
+board size: the positions are reached by random playouts from a seeded
+generator, stopped between 30% and 60% of the cells, so every run (and every
+commit) measures the same boards. After a warm-up pass each primitive is
+timed over several repeats; the median and the 10th and 90th percentiles of
+the time per call across repeats are reported.
+
+Results can be written as JSON with `--json` and compared with an earlier
+file with `--compare`, which prints the ratio of the medians. `--board`
+selects the board class (`isolation.Board` or `isolation.CompactBoard`); the
+mean bytes of a board (its own objects, without the players and the shared
+move tables) are reported along with the timings, so two runs give the
+before and after of a change of representation.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+
+from isolation import Board
+from isolation import CompactBoard
+from isolation.compact import knight_neighbors
+from memory_stats import deep_sizeof
+
+SIZES = (5, 7, 9, 11, 13, 15)
+POSITIONS = 20  # positions per board size
+REPEATS = 15
+MIN_REPEAT_TIME = 0.02  # seconds; each repeat loops over the corpus this long
+
+BOARD_CLASSES = {"board": Board, "compact": CompactBoard}
+
+
+def mid_game_positions(size, count=POSITIONS, seed=0, board_class=Board):
+    """
+    Return `count` positions of a size x size board reached by random
+    playouts stopped between 30% and 60% of the cells, each with a legal
+    move left for the player to move, as instances of `board_class`.
+    """
+    rng = random.Random("{}:{}".format(seed, size))
+    positions = []
+    while len(positions) < count:
+        board = board_class("player1", "player2", size, size)
+        plies = rng.randint(int(0.3 * size * size), int(0.6 * size * size))
+        for _ in range(plies):
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            board.apply_move(rng.choice(moves))
+        if board.get_legal_moves():
+            positions.append(board)
+    return positions
+
+
+def _first_move(board):
+    return board.get_legal_moves()[0]
+
+
+# name -> (setup, call): `setup(boards)` returns the arguments of the calls
+# of one pass, outside of the timing, and `call(argument)` is timed
+PRIMITIVES = {
+    "copy": (lambda boards: boards, lambda board: board.copy()),
+    "forecast_move": (lambda boards: [(board, _first_move(board)) for board in boards],
+                      lambda arg: arg[0].forecast_move(arg[1])),
+    "apply_move": (lambda boards: [(board.copy(), _first_move(board)) for board in boards],
+                   lambda arg: arg[0].apply_move(arg[1])),
+    "get_legal_moves": (lambda boards: boards, lambda board: board.get_legal_moves()),
+    "get_blank_spaces": (lambda boards: boards, lambda board: board.get_blank_spaces()),
+    "utility": (lambda boards: boards, lambda board: board.utility(board.active_player)),
+    "is_winner": (lambda boards: boards, lambda board: board.is_winner(board.active_player)),
+    "is_loser": (lambda boards: boards, lambda board: board.is_loser(board.active_player)),
+    "to_string": (lambda boards: boards, lambda board: board.to_string()),
+}
+
+
+def board_bytes(board):
+    """
+    Return the bytes held by a board, without its players and the move
+    tables shared by all the boards of a geometry.
+    """
+    shared = {id(board.__player_1__), id(board.__player_2__),
+              id(knight_neighbors(board.width, board.height))}
+    return deep_sizeof(board, shared)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def time_primitive(setup, call, boards, repeats=REPEATS):
+    """
+    Time one primitive over the corpus `boards`.
+
+    Returns
+    ----------
+    list<float>
+        Nanoseconds per call, for every repeat.
+    """
+    # warm up, and find how many passes over the corpus fill a repeat
+    passes = 1
+    while True:
+        args = [setup(boards) for _ in range(passes)]
+        start = time.perf_counter()
+        for pass_args in args:
+            for arg in pass_args:
+                call(arg)
+        if time.perf_counter() - start >= MIN_REPEAT_TIME:
+            break
+        passes *= 2
+
+    samples = []
+    for _ in range(repeats):
+        args = [setup(boards) for _ in range(passes)]
+        start = time.perf_counter()
+        for pass_args in args:
+            for arg in pass_args:
+                call(arg)
+        elapsed = time.perf_counter() - start
+        samples.append(1e9 * elapsed / (passes * len(boards)))
+    return samples
+
+
+def run_benchmarks(sizes=SIZES, primitives=None, repeats=REPEATS, positions=POSITIONS,
+                   board_class=Board):
+    """
+    Time the primitives (by default all of PRIMITIVES) on every board size.
+
+    Returns
+    ----------
+    list<dict>
+        One entry per primitive and size, with the median, p10 and p90 of
+        the nanoseconds per call, and the mean bytes of the boards.
+    """
+    results = []
+    for size in sizes:
+        boards = mid_game_positions(size, positions, board_class=board_class)
+        size_bytes = sum(board_bytes(board) for board in boards) / float(len(boards))
+        for name in primitives or PRIMITIVES:
+            setup, call = PRIMITIVES[name]
+            samples = time_primitive(setup, call, boards, repeats)
+            results.append({"primitive": name, "size": size, "repeats": repeats,
+                            "median_ns": percentile(samples, 0.5),
+                            "p10_ns": percentile(samples, 0.1),
+                            "p90_ns": percentile(samples, 0.9),
+                            "board_bytes": size_bytes})
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the isolation.Board primitives.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="board sizes (default: %(default)s)")
+    parser.add_argument("--primitives", nargs="+", choices=sorted(PRIMITIVES),
+                        help="primitives to time (default: all)")
+    parser.add_argument("--board", choices=sorted(BOARD_CLASSES), default="board",
+                        help="board class to time (default: %(default)s)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--positions", type=int, default=POSITIONS,
+                        help="positions per board size (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the medians with an earlier --json FILE")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.primitives, args.repeats, args.positions,
+                             BOARD_CLASSES[args.board])
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r["primitive"], r["size"]): r["median_ns"] for r in json.load(f)["results"]}
+
+    print("{:<18}{:>6}{:>12}{:>12}{:>12}{:>10}".format(
+        "primitive", "size", "median ns", "p10 ns", "p90 ns", "vs base" if baseline else ""))
+    for r in results:
+        base = baseline.get((r["primitive"], r["size"]))
+        print("{:<18}{:>6}{:>12.0f}{:>12.0f}{:>12.0f}{:>10}".format(
+            r["primitive"], r["size"], r["median_ns"], r["p10_ns"], r["p90_ns"],
+            "{:.2f}x".format(r["median_ns"] / base) if base else ""))
+    for size in args.sizes:
+        row = next(r for r in results if r["size"] == size)
+        copies = [r for r in results if r["size"] == size and r["primitive"] == "copy"]
+        print("{}x{}: {:.0f} bytes per board{}".format(
+            size, size, row["board_bytes"],
+            ", {:.0f} copies/s".format(1e9 / copies[0]["median_ns"]) if copies else ""))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"commit": _commit(), "board": args.board,
+                       "python": platform.python_version(),
+                       "machine": platform.machine(), "time": time.time(),
+                       "results": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Smoke tests of the board micro-benchmarks and their JSON results.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+import board_benchmark
+
+
+class BoardBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_main(self, *args):
+        output = io.StringIO()
+        argv = ["board_benchmark.py", "--sizes", "5", "--repeats", "2", "--positions", "2",
+                "--primitives", "copy", "get_legal_moves"] + list(args)
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch.object(board_benchmark, "MIN_REPEAT_TIME", 0.001), \
+                contextlib.redirect_stdout(output):
+            board_benchmark.main()
+        return output.getvalue()
+
+    def test_json_and_compare(self):
+        """ The JSON results round-trip through --compare, Board against CompactBoard """
+        path = os.path.join(self.directory, "board.json")
+        self.run_main("--json", path)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data["board"], "board")
+        self.assertTrue({"commit", "python", "machine", "time"} <= set(data))
+        self.assertEqual([(r["primitive"], r["size"]) for r in data["results"]],
+                         [("copy", 5), ("get_legal_moves", 5)])
+        for result in data["results"]:
+            self.assertEqual(set(result), {"primitive", "size", "repeats", "median_ns",
+                                           "p10_ns", "p90_ns", "board_bytes"})
+            self.assertTrue(0 < result["p10_ns"] <= result["median_ns"] <= result["p90_ns"])
+
+        compact_path = os.path.join(self.directory, "compact.json")
+        output = self.run_main("--board", "compact", "--compare", path, "--json", compact_path)
+        self.assertIn("vs base", output)
+        ratios = {line.split()[0]: float(line.split()[-1].rstrip("x"))
+                  for line in output.splitlines() if line.endswith("x")}
+        self.assertEqual(set(ratios), {"copy", "get_legal_moves"})
+        # a slice copy is far cheaper than a deep copy of nested lists
+        self.assertLess(ratios["copy"], 1.)
+        with open(compact_path) as f:
+            compact = json.load(f)
+        self.assertLess(compact["results"][0]["board_bytes"], data["results"][0]["board_bytes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Test cases for the compact board, checked against `isolation.Board`.
+"""
+import random
+import unittest
+
+import perft
+
+from isolation import Board
+from isolation import CompactBoard
+
+
+class CompactBoardTest(unittest.TestCase):
+
+    def test_random_games_match_board(self):
+        """ Both boards agree on every accessor along random games """
+        rng = random.Random(0)
+        for width, height in [(7, 7), (5, 7), (3, 3)] * 10:
+            board = Board("player1", "player2", width, height)
+            compact = CompactBoard("player1", "player2", width, height)
+            while True:
+                for player in (None, "player1", "player2"):
+                    self.assertEqual(compact.get_legal_moves(player), board.get_legal_moves(player))
+                    self.assertEqual(compact.count_legal_moves(player),
+                                     board.count_legal_moves(player))
+                self.assertEqual(compact.canonical_key(), board.canonical_key())
+                self.assertEqual(compact.unique_moves(), board.unique_moves())
+                self.assertEqual(compact.to_bytes(), board.to_bytes())
+                self.assertEqual(compact.to_string(), board.to_string())
+                self.assertEqual(compact.utility("player1"), board.utility("player1"))
+                self.assertEqual(compact.get_player_location("player2"),
+                                 board.get_player_location("player2"))
+                moves = board.get_legal_moves()
+                if not moves:
+                    break
+                first = rng.choice(moves)
+                self.assertEqual(list(compact.iter_legal_moves(first=first)),
+                                 list(board.iter_legal_moves(first=first)))
+                move = rng.choice(moves)
+                board.apply_move(move)
+                before = compact.to_bytes()
+                forecast = compact.forecast_move(move)
+                # the forecast does not share the cells of its parent
+                self.assertEqual(compact.to_bytes(), before)
+                compact = forecast
+
+    def test_perft_counts(self):
+        """ The compact board counts the reference game trees """
+        for (width, height), counts in perft.PERFT_TABLE.items():
+            board = CompactBoard("player1", "player2", width, height)
+            self.assertEqual([perft.perft(board, depth) for depth in range(4)], counts[:4])
+
+
+if __name__ == '__main__':
+    unittest.main()
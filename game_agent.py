@@ -6,7 +6,17 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
-import random, math
+import random, math, time
+
+from isolation.isolation import NO_LOCATION
+from isolation.isolation import STATE_HEADER
+from isolation.isolation import knight_table
+from knowledge_board_states import BoardStateKnowledge
+from memory_stats import MemoryMonitor
+from search_stats import JsonlFile
+from search_stats import SearchStats
+
+
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
@@ -15,6 +25,28 @@ class Timeout(Exception):
 # some utility constants
 POSITIVE_INFINITY = float("inf")
 NEGATIVE_INFINITY = float("-inf")
+MCTS_MAX_NODES = 2000000  # MCTSPlayer trees above this size are not reused
+
+# late move reductions: width of the null windows of the reduced searches,
+# and the moves searched at full depth at every node before reducing
+NULL_WINDOW = 1e-6
+LMR_FULL_MOVES = 3
+LMR_MIN_DEPTH = 3
+
+
+def late_move_reduction(depth, move_index):
+    """Return the plies by which `alphabeta` reduces the search of the move
+    number `move_index` (from 0, in search order) at a node `depth` plies
+    above the horizon: None (a plain full-depth search) for the first
+    LMR_FULL_MOVES moves and near the horizon, then one ply, and two for
+    the latest moves of deep nodes.
+    """
+    if move_index < LMR_FULL_MOVES or depth < LMR_MIN_DEPTH:
+        return None
+    if move_index >= 2 * LMR_FULL_MOVES and depth >= 2 * LMR_MIN_DEPTH:
+        return 2
+    return 1
+
 
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
@@ -47,12 +79,12 @@ def custom_score(game, player):
     # Option 0: 
     # Score indicated by the #player_moves - #opponent_moves
     def better_with_more_moves_than_opponent():
-        return float(len(game.get_legal_moves(player)) - len(game.get_legal_moves(game.get_opponent(player))))
+        return float(game.count_legal_moves(player) - game.count_legal_moves(game.get_opponent(player)))
 
     # Option 1:
     # Score indicated by the #player_moves - 2 * #opponent_moves
     def better_with_more_moves_than_opponent_aggressive():
-        return float(len(game.get_legal_moves(player)) - 2 * len(game.get_legal_moves(game.get_opponent(player))))
+        return float(game.count_legal_moves(player) - 2 * game.count_legal_moves(game.get_opponent(player)))
 
     # Option 2:
     # Score indicated by the relative distance between players to the center of the board
@@ -103,18 +135,80 @@ class CustomPlayer:
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
-        timer expires.
+        timer expires. Under a node-budget time control this is the number of
+        nodes left when search is aborted.
+
+    knowledge : `BoardStateKnowledge` or str (optional)
+        Store of positions solved in earlier games, or the path of its log
+        file. Proven results and deep search results are recorded into it
+        after every move, and known positions are answered from it.
+
+    symmetry_pruning : boolean (optional)
+        Flag indicating whether to search only one move of each class of
+        moves leading to equivalent positions when the searched position is
+        symmetric (e.g., on an empty square board).
+
+    book : `opening_book.OpeningBook` (optional)
+        Source of moves consulted before searching; any move it returns is
+        played without spending the search budget.
+
+    stats : sink, str or True (optional)
+        Collect the statistics of every search (see `search_stats`) and emit
+        them to this sink, or to a JSONL file at this path; with True they
+        are only kept in `last_stats`.
+
+    memory : boolean (optional)
+        Add the memory used by every move (see `memory_stats`) to its search
+        statistics, which are then collected even without a `stats` sink.
+
+    reductions : callable or True (optional)
+        Enable late move reductions in `alphabeta`: `reductions(depth,
+        move_index)` returns the plies by which to reduce the search of a
+        move, or None to search it normally (True uses
+        `late_move_reduction`). A reduced move is searched with a null
+        window at the bound it must beat, and searched again at full depth
+        only if it beats it; a reduction of 0 only checks the bound first.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 knowledge=None, symmetry_pruning=False, book=None, stats=None,
+                 memory=False, reductions=None):
         # basic attributes
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
+        self.count_node = None
         self.TIMER_THRESHOLD = timeout
+        self.symmetry_pruning = symmetry_pruning
+        self.reductions = late_move_reduction if reductions is True else reductions
+
+        # root of the current search and the move to try first from it
+        self.search_root = None
+        self.hash_move = None
+
+        # knowledge of board states from earlier games
+        if isinstance(knowledge, str):
+            knowledge = BoardStateKnowledge(knowledge)
+        self.knowledge = knowledge
+
+        # opening book and other constant-time move sources
+        self.book = book
+        if book is not None:
+            book.set_current_player(self)
+
+        # search statistics: where to send them, the record of the search in
+        # progress and the record of the last move
+        if isinstance(stats, str):
+            stats = JsonlFile(stats)
+        if memory and stats is None:
+            stats = True
+        self.stats_sink = stats
+        self.search_stats = None
+        self.last_stats = None
+        self.memory_monitor = MemoryMonitor() if memory else None
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -153,6 +247,13 @@ class CustomPlayer:
         """
 
         self.time_left = time_left
+        # node-budget time controls (`isolation.NodeBudget`) count the nodes
+        # expanded by the search instead of the elapsed time
+        self.count_node = getattr(time_left, "count", None)
+        self.search_stats = SearchStats() if self.stats_sink is not None else None
+        self.last_stats = None
+        if self.memory_monitor is not None:
+            self.memory_monitor.begin()
 
         # Perform any required initializations, including selecting an initial
         # move from the game board (i.e., an opening book), or returning
@@ -163,7 +264,33 @@ class CustomPlayer:
 
         # when no legal moves available
         if legal_moves is None:
-            return best_move
+            return self.report_move(best_move, "none")
+
+        # play the move of the book (e.g., a reflected reply) when it has one
+        if self.book is not None:
+            book_move = self.book.move_for(game)
+            if book_move is not None and book_move in legal_moves:
+                return self.report_move(book_move, "book")
+
+        # consult the knowledge gathered in earlier games: a proven win (or a
+        # result at least as deep as the fixed-depth search) is played
+        # immediately, anything else is kept as the fallback move
+        if self.knowledge is not None:
+            known = self.knowledge.lookup(game)
+            if known is not None and known[0] in legal_moves:
+                if self.search_stats is not None:
+                    self.search_stats.cache_hits += 1
+                known_move, known_depth, known_result = known
+                if known_result > 0 or (not self.iterative and known_depth >= self.search_depth):
+                    return self.report_move(known_move, "knowledge")
+                best_move = known_move
+
+        # deepest search completed so far, as (depth, score, move)
+        completed = None
+
+        # alphabeta searches the best move known so far first from the root
+        self.search_root = game
+        self.hash_move = best_move if best_move != (-1, -1) else None
 
         try:
             # The search method call (alpha beta or minimax) should happen in
@@ -178,25 +305,80 @@ class CustomPlayer:
                 # go deeper
                 while True:
                     # use chosen method to find best move
+                    self.start_iteration(depth)
                     current_best, current_move = getattr(self, self.method)(game, depth)
+                    self.end_iteration(depth)
                     # save current move as best move
                     best_move = current_move
+                    completed = (depth, current_best, current_move)
+                    self.hash_move = current_move
                     # increment depth 
                     depth += 1
             # without iterative deepening
             else:
                 # just keep using the search depth
                 # use chosen method to find best move
+                self.start_iteration(self.search_depth)
                 current_best, current_move = getattr(self, self.method)(game, self.search_depth)
+                self.end_iteration(self.search_depth)
                 # save current move as best move
                 best_move = current_move
+                completed = (self.search_depth, current_best, current_move)
 
         except Timeout:
             # Handle any actions required at timeout, if necessary
-            return best_move
+            pass
+
+        # remember the deepest completed result for later games
+        if self.knowledge is not None and completed is not None:
+            depth, score, move = completed
+            self.knowledge.record(game, move, depth, score)
 
         # Return the best move from the last completed search iteration
-        return best_move
+        return self.report_move(best_move, "search")
+
+    def start_iteration(self, depth):
+        """Note the start of a search iteration to `depth` in the statistics."""
+        if self.search_stats is not None:
+            self.search_stats.root_depth = depth
+            self.search_stats.iteration_ms.append(-1000 * time.perf_counter())
+
+    def end_iteration(self, depth):
+        """Note the end of the search iteration to `depth` in the statistics."""
+        if self.search_stats is not None:
+            self.search_stats.iteration_ms[-1] += 1000 * time.perf_counter()
+            self.search_stats.depth = depth
+
+    def report_move(self, move, source):
+        """Finish the statistics of the current move (if collected), send
+        them to the sink and return the move.
+        """
+        stats = self.search_stats
+        if stats is not None:
+            stats.source = source
+            stats.move = move
+            stats.margin = self.time_left()
+            if stats.iteration_ms and stats.iteration_ms[-1] < 0:
+                # unfinished iteration
+                stats.iteration_ms[-1] += 1000 * time.perf_counter()
+            if self.memory_monitor is not None:
+                stats.extra["memory"] = self.memory_monitor.end(self)
+            self.search_stats = None
+            self.last_stats = stats
+            if self.stats_sink is not True:
+                self.stats_sink.emit(stats.as_dict())
+        return move
+
+    def search_moves(self, game, first=None):
+        """Return the moves to search from the given game state: the legal
+        moves of the active player, generated lazily with `first` (a hash
+        move) ahead of the rest, and reduced to one move per symmetry class
+        when symmetry pruning is enabled and the position is symmetric.
+        """
+        moves = game.iter_legal_moves(first=first)
+        if self.symmetry_pruning and game.position_symmetries():
+            moves = game.unique_moves(list(moves))
+        return moves
 
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
@@ -229,15 +411,24 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
+        if self.count_node is not None:
+            self.count_node()
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        stats = self.search_stats
+        if stats is not None:
+            stats.nodes += 1
 
         # when no legal moves available
-        if game.get_legal_moves() is None:
+        if not game.has_legal_moves():
+            if stats is not None:
+                stats.leaves += 1
             return self.score(game, self), (-1, -1)
 
         # when depth is zero, reaching the end of tree
         if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
             return self.score(game, self), game.get_player_location(self)
 
         # at the max layer
@@ -247,7 +438,7 @@ class CustomPlayer:
             # initialize move status
             current_max_move = (-1, -1)
             # loop through the game's subsequent valid moves
-            for move in game.get_legal_moves():
+            for move in self.search_moves(game):
                 # apply the move and create the next minimum layer
                 # and find the either min/max value of that layer
                 next_max, next_move = self.minimax(game.forecast_move(move), depth - 1, False)
@@ -264,7 +455,7 @@ class CustomPlayer:
             # initialize move status
             current_min_move = (-1, -1)
             # loop through the game's subsequent valid moves
-            for move in game.get_legal_moves():
+            for move in self.search_moves(game):
                 # apply the move and create the next maximum layer
                 # and find the either min/max value of that layer
                 next_min, next_move = self.minimax(game.forecast_move(move), depth - 1, True)
@@ -313,15 +504,24 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
+        if self.count_node is not None:
+            self.count_node()
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
+        stats = self.search_stats
+        if stats is not None:
+            stats.nodes += 1
 
         # when no legal moves available
-        if game.get_legal_moves() is None:
+        if not game.has_legal_moves():
+            if stats is not None:
+                stats.leaves += 1
             return self.score(game, self), (-1, -1)
 
         # when depth is zero, reaching the end of tree
         if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
             return self.score(game, self), game.get_player_location(self)
 
         # at the max layer
@@ -331,9 +531,15 @@ class CustomPlayer:
             # initialize move status
             current_max_move = (-1, -1)
             # loop through game's subsequent moves
-            for move in game.get_legal_moves():
-                # apply the move and create the next minimum layer
-                next_max, next_move = self.alphabeta(game.forecast_move(move), depth - 1, alpha, beta, False)
+            for index, move in enumerate(self.search_moves(game, self.hash_move if game is self.search_root else None)):
+                # apply the move and create the next minimum layer, first
+                # with a reduced search for late moves if enabled
+                child = game.forecast_move(move)
+                next_max = None
+                if self.reductions is not None and alpha > NEGATIVE_INFINITY:
+                    next_max = self.reduced_search(child, depth, index, alpha, False)
+                if next_max is None:
+                    next_max, next_move = self.alphabeta(child, depth - 1, alpha, beta, False)
                 # compare the next value with current maximum value
                 if next_max > current_max:
                     current_max = next_max
@@ -346,6 +552,8 @@ class CustomPlayer:
                 # upper bound is already smaller than or equal to the  
                 # lower bound, if so, ignore the rest of this branch
                 if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoff(depth)
                     break
             return current_max, current_max_move
         # at the min layer
@@ -355,9 +563,15 @@ class CustomPlayer:
             # initialize move status
             current_min_move = (-1, -1)
             # loop through the game's subsequent moves
-            for move in game.get_legal_moves():
-                # apply the move and create the next maximum layer
-                next_min, next_move = self.alphabeta(game.forecast_move(move), depth - 1, alpha, beta, True)
+            for index, move in enumerate(self.search_moves(game)):
+                # apply the move and create the next maximum layer, first
+                # with a reduced search for late moves if enabled
+                child = game.forecast_move(move)
+                next_min = None
+                if self.reductions is not None and beta < POSITIVE_INFINITY:
+                    next_min = self.reduced_search(child, depth, index, beta, True)
+                if next_min is None:
+                    next_min, next_move = self.alphabeta(child, depth - 1, alpha, beta, True)
                 # compare the next value with current mimum value
                 if next_min < current_min:
                     current_min = next_min
@@ -370,6 +584,326 @@ class CustomPlayer:
                 # upper bound is already smaller than or equal to the  
                 # lower bound, if so, ignore the rest of this branch
                 if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoff(depth)
                     break
             return current_min, current_min_move
 
+    def reduced_search(self, game, depth, move_index, bound, maximizing_player):
+        """Search a late move of a node `depth` plies above the horizon at
+        reduced depth, with a null window at the `bound` it must beat (alpha
+        below a maximizing node, beta below a minimizing one); `game` is the
+        position after the move and `maximizing_player` its layer.
+
+        Returns
+        -------
+        float or None
+            The score of the reduced search if the move does not beat the
+            bound, or None if it must be searched at full depth (no
+            reduction applies, or the reduced search beat the bound).
+        """
+        reduction = self.reductions(depth, move_index)
+        if reduction is None:
+            return None
+        reduction = min(reduction, depth - 1)
+        stats = self.search_stats
+        if stats is not None:
+            stats.extra["reduced"] = stats.extra.get("reduced", 0) + 1
+        if maximizing_player:
+            score, _ = self.alphabeta(game, depth - 1 - reduction, bound - NULL_WINDOW, bound, True)
+            beaten = score < bound
+        else:
+            score, _ = self.alphabeta(game, depth - 1 - reduction, bound, bound + NULL_WINDOW, False)
+            beaten = score > bound
+        if beaten:
+            if stats is not None:
+                stats.extra["re_searched"] = stats.extra.get("re_searched", 0) + 1
+            return None
+        return score
+
+
+# knight moves by cell index, by board geometry
+_KNIGHT_INDICES = {}
+
+
+def knight_indices(width, height):
+    """Return, for every cell index of a board geometry, the tuple of the
+    cell indices a knight can reach from it (see `isolation.knight_table`).
+    """
+    table = _KNIGHT_INDICES.get((width, height))
+    if table is None:
+        table = tuple(tuple(r * width + c for r, c in moves)
+                      for moves in knight_table(width, height))
+        _KNIGHT_INDICES[(width, height)] = table
+    return table
+
+
+def cell_moves(cells, neighbors, location):
+    """Return the blank cells a player at cell `location` (None before its
+    first move) can move to on a flat board of occupied flags.
+    """
+    if location is None:
+        return [index for index, cell in enumerate(cells) if not cell]
+    return [index for index in neighbors[location] if not cells[index]]
+
+
+def random_rollout(cells, neighbors, locations, active, rand=random.random):
+    """Play uniformly random moves from a position until a player is stuck.
+
+    This is the playout kernel of `MCTSPlayer`: the position is a flat
+    `bytearray` of occupied cells (modified in place), the cell index of each
+    player (None before its first move) and the index (0 or 1) of the player
+    to move, so no `Board` is created along the playout.
+
+    Returns
+    -------
+    int
+        The index of the winning player.
+    """
+    locations = list(locations)
+    while True:
+        location = locations[active]
+        if location is None:
+            moves = [index for index, cell in enumerate(cells) if not cell]
+        else:
+            moves = [index for index in neighbors[location] if not cells[index]]
+        if not moves:
+            return 1 - active
+        move = moves[int(rand() * len(moves))]
+        cells[move] = 1
+        locations[active] = move
+        active = 1 - active
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo tree search.
+
+    Every iteration selects a path down the tree with UCT (UCB1 applied to
+    trees, unvisited children first), expands the node it ends on by adding
+    all of its moves as unvisited children, plays a random game from the
+    first of them with the `random_rollout` kernel and counts the result
+    along the path. The subtree of the position reached after the opponent's
+    reply is kept for the next move. The search stops, like `CustomPlayer`'s,
+    when `time_left()` falls under `timeout`; under a node-budget time
+    control every rollout counts as one node.
+
+    The tree is stored in parallel lists of ints indexed by node (move,
+    player who made it, wins, visits, first child and number of children,
+    the children of a node being contiguous), so it holds no object per
+    node for the garbage collector to scan during the search.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of UCT.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds, or nodes under a node budget) when
+        the search stops.
+
+    reuse_tree : boolean (optional)
+        Flag indicating whether to keep the tree between moves.
+
+    max_nodes : int (optional)
+        Size of the tree above which it is discarded instead of reused.
+
+    stats : sink, str or True (optional)
+        Collect the statistics of every search as `CustomPlayer` does: the
+        depth is that of the deepest node selected, the nodes are the nodes
+        added to the tree and the leaves the rollouts played.
+    """
+
+    def __init__(self, exploration=math.sqrt(2), timeout=10., reuse_tree=True,
+                 max_nodes=MCTS_MAX_NODES, stats=None):
+        self.exploration = exploration
+        self.TIMER_THRESHOLD = timeout
+        self.reuse_tree = reuse_tree
+        self.max_nodes = max_nodes
+        if isinstance(stats, str):
+            stats = JsonlFile(stats)
+        self.stats_sink = stats
+        self.last_stats = None
+        self.time_left = None
+        # private random generator, if seeded (see `seed`)
+        self.rng = None
+        self.clear_tree()
+        # node reached by our last move, the move count and the board width
+        # and occupied cells after it
+        self.kept_node = None
+        self.kept_move_count = None
+        self.kept_width = None
+        self.kept_cells = None
+        # rollouts played during the last move
+        self.rollouts = 0
+
+    def seed(self, seed):
+        """Expand and play out with a private random generator seeded with
+        `seed` instead of the global one."""
+        self.rng = random.Random(seed)
+
+    def clear_tree(self):
+        """Discard the search tree."""
+        self.moves = []
+        self.players = []
+        self.wins = []
+        self.visits = []
+        self.first_child = []
+        self.num_children = []
+
+    def add_node(self, move, player):
+        """Add an unexpanded node to the tree and return its index."""
+        self.moves.append(move)
+        self.players.append(player)
+        self.wins.append(0)
+        self.visits.append(0)
+        self.first_child.append(-1)
+        self.num_children.append(0)
+        return len(self.moves) - 1
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves and return
+        it before the time limit expires; see `CustomPlayer.get_move`.
+        """
+        self.time_left = time_left
+        count_node = getattr(time_left, "count", None)
+        stats = SearchStats() if self.stats_sink is not None else None
+        self.last_stats = None
+        self.rollouts = 0
+
+        if not legal_moves:
+            return self.report_move((-1, -1), "none", stats)
+        if len(legal_moves) == 1:
+            return self.report_move(legal_moves[0], "forced", stats)
+
+        state = game.to_bytes()
+        width, height, move_count, loc_1, loc_2 = STATE_HEADER.unpack_from(state)
+        cells = bytearray(state[STATE_HEADER.size:])
+        locations = tuple(None if loc == NO_LOCATION else loc for loc in (loc_1, loc_2))
+        active = move_count % 2
+        neighbors = knight_indices(width, height)
+        root = self.reused_root(width, cells, move_count, locations, active)
+        if root is None:
+            self.clear_tree()
+            root = self.add_node(None, 1 - active)
+
+        moves, players, wins, visits = self.moves, self.players, self.wins, self.visits
+        first_child, num_children = self.first_child, self.num_children
+        exploration = self.exploration
+        log = math.log
+        sqrt = math.sqrt
+        rng = random if self.rng is None else self.rng
+        rand = rng.random
+        while self.time_left() >= self.TIMER_THRESHOLD:
+            if count_node is not None:
+                count_node()
+            node = root
+            path = [root]
+            path_cells = cells[:]
+            path_locations = list(locations)
+            turn = active
+
+            # selection: descend through expanded nodes with UCT
+            while first_child[node] >= 0 and num_children[node]:
+                first = first_child[node]
+                best = -1
+                best_score = -1.
+                scale = log(visits[node])
+                for child in range(first, first + num_children[node]):
+                    child_visits = visits[child]
+                    if not child_visits:
+                        best = child
+                        break
+                    score = wins[child] / child_visits + exploration * sqrt(scale / child_visits)
+                    if score > best_score:
+                        best, best_score = child, score
+                node = best
+                path.append(node)
+                path_cells[moves[node]] = 1
+                path_locations[turn] = moves[node]
+                turn = 1 - turn
+
+            # expansion: add the moves of the node, in random order, and
+            # play the first one
+            if first_child[node] < 0:
+                node_moves = cell_moves(path_cells, neighbors, path_locations[turn])
+                rng.shuffle(node_moves)
+                first_child[node] = len(moves)
+                num_children[node] = len(node_moves)
+                for move in node_moves:
+                    self.add_node(move, turn)
+                if stats is not None:
+                    stats.nodes += len(node_moves)
+                if node_moves:
+                    node = first_child[node]
+                    path.append(node)
+                    path_cells[moves[node]] = 1
+                    path_locations[turn] = moves[node]
+                    turn = 1 - turn
+
+            # simulation and backpropagation
+            winner = random_rollout(path_cells, neighbors, path_locations, turn, rand)
+            self.rollouts += 1
+            for node in path:
+                visits[node] += 1
+                if players[node] == winner:
+                    wins[node] += 1
+            if stats is not None and len(path) - 1 > stats.depth:
+                stats.depth = len(path) - 1
+
+        first = first_child[root]
+        legal = {r * width + c for r, c in legal_moves}
+        children = [child for child in range(first, first + num_children[root])
+                    if moves[child] in legal] if first >= 0 else []
+        if not children:
+            best_move = legal_moves[0]
+        else:
+            best = max(children, key=visits.__getitem__)
+            best_move = divmod(moves[best], width)
+            # keep the subtree of our move for the next turn
+            self.kept_node, self.kept_move_count = best, move_count + 1
+            self.kept_width = width
+            self.kept_cells = bytearray(map(bool, cells))
+            self.kept_cells[moves[best]] = 1
+        if stats is not None:
+            stats.leaves = self.rollouts
+        return self.report_move(best_move, "search", stats)
+
+    def reused_root(self, width, cells, move_count, locations, active):
+        """Return the node of the kept tree for the current position (if tree
+        reuse is on and the opponent's reply to our last move was expanded),
+        or None.
+
+        The position must be the one our last move reached plus one reply,
+        cell for cell: the player may have started another game since.
+        """
+        node, self.kept_node = self.kept_node, None
+        if not self.reuse_tree or node is None or len(self.moves) > self.max_nodes or \
+                move_count != self.kept_move_count + 1 or self.moves[node] != locations[active]:
+            return None
+        reply = locations[1 - active]
+        expected = self.kept_cells
+        if width != self.kept_width or len(cells) != len(expected):
+            return None
+        expected[reply] = 1
+        if expected != bytearray(map(bool, cells)):
+            return None
+        first = self.first_child[node]
+        if first < 0:
+            return None
+        for child in range(first, first + self.num_children[node]):
+            if self.moves[child] == reply:
+                return child
+        return None
+
+    def report_move(self, move, source, stats):
+        """Finish the statistics of the move (if collected), send them to the
+        sink and return the move.
+        """
+        if stats is not None:
+            stats.source = source
+            stats.move = move
+            stats.margin = self.time_left()
+            self.last_stats = stats
+            if self.stats_sink is not True:
+                self.stats_sink.emit(stats.as_dict())
+        return move
@@ -7,13 +7,13 @@ location is blocked for the rest of the game. The first player with no
 legal moves loses, and the opponent is declared the winner.
 """
 
-import io
-
 # Make the Board class available at the root of the module for imports
 from .isolation import Board
+from .isolation import NodeBudget
+from .compact import CompactBoard
 
 
-def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
+def game_as_text(winner, move_history, termination="", board=None):
     """
     Generate a printable representation for a game of isolation.
 
@@ -35,34 +35,38 @@ def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
         Valid reasons for termination include "" (none), "timeout", and
         "illegal move".
 
-    board : isolation.Board
+    board : isolation.Board (optional)
         An instance of `isolation.Board` encoding the game state (e.g., player
-        locations and blocked cells) for a game of isolation.
+        locations and blocked cells) the moves are applied to; a new empty
+        7x7 board is used by default. The board is modified.
 
     Returns
     ----------
     str
         A string representation of a game of isolation.
     """
+    return "".join(iter_game_text(winner, move_history, termination, board))
+
 
-    ans = io.StringIO()
+def iter_game_text(winner, move_history, termination="", board=None):
+    """
+    Lazily generate the representation of `game_as_text`, one chunk of text
+    per ply, so long games (or many of them, see `records.iter_record_text`)
+    can be streamed to a file without being held in memory.
+    """
+    if board is None:
+        board = Board(1, 2)
 
     for i, move in enumerate(move_history):
         p1_move = move[0]
-        ans.write("%d." % i + " (%d,%d)\r\n" % p1_move)
         if p1_move != Board.NOT_MOVED:
             board.apply_move(p1_move)
-        ans.write(board.print_board())
+        yield "%d." % i + " (%d,%d)\r\n" % p1_move + board.print_board()
 
         if len(move) > 1:
             p2_move = move[1]
-            ans.write("%d. ..." % i + " (%d, %d)\r\n" % p2_move)
             if p2_move != Board.NOT_MOVED:
                 board.apply_move(p2_move)
-            ans.write(board.print_board())
-
-    ans.write(termination + "\r\n")
-
-    ans.write("Winner: " + str(winner) + "\r\n")
+            yield "%d. ..." % i + " (%d, %d)\r\n" % p2_move + board.print_board()
 
-    return ans.getvalue()
+    yield termination + "\r\n" + "Winner: " + str(winner) + "\r\n"
@@ -0,0 +1,294 @@
+"""
+A compact variant of `isolation.Board` for search.
+
+`CompactBoard` plays by the same rules and offers the same interface as
+`Board` (the player-object-based accessors, `copy`, `forecast_move`, move
+generation, symmetries and `play`), but keeps its state in a few slots: a
+flat `bytearray` with one byte per cell (0 when blank, else the number of
+the player that occupied it), a tuple of the players, a tuple of their
+(row, col) locations and the index of the active player. A copy is a slice
+of the cell array plus a handful of references, instead of the new dicts
+and the `deepcopy` of nested lists made by `Board.copy`.
+
+The name-mangled attributes of `Board` (`__board_state__`,
+`__last_player_move__`, `__player_1__`...) are provided as read-only
+properties for the code that inspects them directly; they are rebuilt on
+every access, so the search should go through the regular methods.
+"""
+from .isolation import Board
+from .isolation import DIRECTIONS
+from .isolation import NO_LOCATION
+from .isolation import STATE_HEADER
+from .isolation import knight_table
+from . import symmetry
+
+_NEIGHBORS = {}
+
+
+def knight_neighbors(width, height):
+    """
+    Return, for every cell index, the tuple of (cell index, (row, col)) of
+    the cells a knight can reach from it.
+    """
+    table = _NEIGHBORS.get((width, height))
+    if table is None:
+        table = tuple(tuple((r * width + c, (r, c)) for r, c in moves)
+                      for moves in knight_table(width, height))
+        _NEIGHBORS[(width, height)] = table
+    return table
+
+
+class CompactBoard(object):
+    """
+    Isolation board with slotted, flat state; see `isolation.Board` for the
+    parameters and the documentation of every method.
+    """
+    __slots__ = ("width", "height", "move_count", "_cells", "_players", "_locations",
+                 "_active", "_neighbors", "move_times", "move_stats")
+
+    BLANK = Board.BLANK
+    NOT_MOVED = Board.NOT_MOVED
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._cells = bytearray(width * height)
+        self._players = (player_1, player_2)
+        self._locations = (None, None)
+        self._active = 0
+        self._neighbors = knight_neighbors(width, height)
+
+    @property
+    def active_player(self):
+        return self._players[self._active]
+
+    @property
+    def inactive_player(self):
+        return self._players[1 - self._active]
+
+    def _index(self, player):
+        players = self._players
+        if player == players[0]:
+            return 0
+        if player == players[1]:
+            return 1
+        raise RuntimeError("`player` must be an object registered as a player in the current game.")
+
+    def is_player_one(self, player):
+        return self._players[0] == player
+
+    def is_player_two(self, player):
+        return self._players[1] == player
+
+    def get_opponent(self, player):
+        return self._players[1 - self._index(player)]
+
+    def copy(self):
+        new_board = CompactBoard.__new__(CompactBoard)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board._cells = self._cells[:]
+        new_board._players = self._players
+        new_board._locations = self._locations
+        new_board._active = self._active
+        new_board._neighbors = self._neighbors
+        return new_board
+
+    def forecast_move(self, move):
+        new_board = self.copy()
+        new_board.apply_move(move)
+        return new_board
+
+    def move_is_legal(self, move):
+        row, col = move
+        return 0 <= row < self.height and 0 <= col < self.width and \
+            not self._cells[row * self.width + col]
+
+    def get_blank_spaces(self):
+        cells, width = self._cells, self.width
+        return [(i, j) for j in range(width) for i in range(self.height)
+                if not cells[i * width + j]]
+
+    def get_player_location(self, player):
+        return self._locations[self._index(player)]
+
+    def get_legal_moves(self, player=None):
+        location = self._locations[self._active if player is None else self._index(player)]
+        if location is None:
+            return self.get_blank_spaces()
+        cells = self._cells
+        return [move for index, move in self._neighbors[location[0] * self.width + location[1]]
+                if not cells[index]]
+
+    def iter_legal_moves(self, player=None, first=None):
+        location = self._locations[self._active if player is None else self._index(player)]
+        cells = self._cells
+
+        if location is None:
+            candidates = self.get_blank_spaces()
+            if first is not None and self.move_is_legal(first):
+                yield first
+            else:
+                first = None
+        else:
+            candidates = [move for index, move in
+                          self._neighbors[location[0] * self.width + location[1]]
+                          if not cells[index]]
+            if first is not None and first in candidates:
+                yield first
+            else:
+                first = None
+
+        for move in candidates:
+            if move != first:
+                yield move
+
+    def has_legal_moves(self, player=None):
+        location = self._locations[self._active if player is None else self._index(player)]
+        if location is None:
+            return self.move_count < self.width * self.height
+        cells = self._cells
+        for index, _ in self._neighbors[location[0] * self.width + location[1]]:
+            if not cells[index]:
+                return True
+        return False
+
+    def count_legal_moves(self, player=None):
+        location = self._locations[self._active if player is None else self._index(player)]
+        if location is None:
+            return len(self.get_blank_spaces())
+        cells = self._cells
+        return sum(1 for index, _ in self._neighbors[location[0] * self.width + location[1]]
+                   if not cells[index])
+
+    def apply_move(self, move):
+        active = self._active
+        self._cells[move[0] * self.width + move[1]] = active + 1
+        if active:
+            self._locations = (self._locations[0], move)
+        else:
+            self._locations = (move, self._locations[1])
+        self._active = 1 - active
+        self.move_count += 1
+
+    def is_winner(self, player):
+        return player == self.inactive_player and not self.has_legal_moves()
+
+    def is_loser(self, player):
+        return player == self.active_player and not self.has_legal_moves()
+
+    def utility(self, player):
+        if not self.has_legal_moves():
+            if player == self.inactive_player:
+                return float("inf")
+            if player == self.active_player:
+                return float("-inf")
+        return 0.
+
+    def __get_moves__(self, move):
+        if move is None:
+            return self.get_blank_spaces()
+        r, c = move
+        return [(r + dr, c + dc) for dr, dc in DIRECTIONS if self.move_is_legal((r + dr, c + dc))]
+
+    def _cell_indices(self):
+        width = self.width
+        blocked = [index for index, cell in enumerate(self._cells) if cell]
+        p1, p2 = (None if location is None else location[0] * width + location[1]
+                  for location in self._locations)
+        return blocked, p1, p2
+
+    def symmetry_transforms(self):
+        return symmetry.transforms(self.width, self.height)
+
+    def canonical_key(self):
+        return symmetry.canonical_key(self.width, self.height, *self._cell_indices())
+
+    def position_symmetries(self):
+        blocked, p1, p2 = self._cell_indices()
+        candidates = [perm for perm in symmetry.transforms(self.width, self.height)[1:]
+                      if (p1 is None or perm[p1] == p1) and (p2 is None or perm[p2] == p2)]
+        if not candidates:
+            return []
+        cells = self._cells
+        return [perm for perm in candidates if all(cells[perm[idx]] for idx in blocked)]
+
+    unique_moves = Board.unique_moves
+
+    def to_bytes(self):
+        width = self.width
+        locations = [NO_LOCATION if location is None else location[0] * width + location[1]
+                     for location in self._locations]
+        return STATE_HEADER.pack(width, self.height, self.move_count, *locations) + \
+            bytes(self._cells)
+
+    @classmethod
+    def from_bytes(cls, data, player_1, player_2):
+        width, height, move_count, loc_1, loc_2 = STATE_HEADER.unpack_from(data)
+        board = cls(player_1, player_2, width, height)
+        board._cells[:] = data[STATE_HEADER.size:STATE_HEADER.size + width * height]
+        board._locations = tuple(None if loc == NO_LOCATION else divmod(loc, width)
+                                 for loc in (loc_1, loc_2))
+        board.move_count = move_count
+        board._active = move_count % 2
+        return board
+
+    @classmethod
+    def from_board(cls, board):
+        """ Return a `CompactBoard` holding the position of a `Board`. """
+        return cls.from_bytes(board.to_bytes(), board.__player_1__, board.__player_2__)
+
+    def to_string(self):
+        p1_loc, p2_loc = self._locations
+        cells, width = self._cells, self.width
+        out = ''
+        for i in range(self.height):
+            out += ' | '
+            for j in range(width):
+                if not cells[i * width + j]:
+                    out += ' '
+                elif (i, j) == p1_loc:
+                    out += '1'
+                elif (i, j) == p2_loc:
+                    out += '2'
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+        return out
+
+    print_board = Board.print_board
+    play = Board.play
+
+    # read-only views of the attributes of `Board`
+
+    @property
+    def __player_1__(self):
+        return self._players[0]
+
+    @property
+    def __player_2__(self):
+        return self._players[1]
+
+    @property
+    def __active_player__(self):
+        return self._players[self._active]
+
+    @property
+    def __inactive_player__(self):
+        return self._players[1 - self._active]
+
+    @property
+    def __last_player_move__(self):
+        return dict(zip(self._players, self._locations))
+
+    @property
+    def __player_symbols__(self):
+        return {Board.BLANK: Board.BLANK, self._players[0]: 1, self._players[1]: 2}
+
+    @property
+    def __board_state__(self):
+        cells, width = self._cells, self.width
+        return [list(cells[row * width:(row + 1) * width]) for row in range(self.height)]
@@ -8,14 +8,70 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import struct
 import timeit
 
 from copy import deepcopy
 from copy import copy
 
+from . import symmetry
+
 
 TIME_LIMIT_MILLIS = 200
 
+# knight move offsets, in the order moves are generated
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+_KNIGHT_TABLES = {}
+
+# compact position encoding used by Board.to_bytes(): width, height, move
+# count and the cell index of each player (NO_LOCATION before its first
+# move), followed by one byte per cell
+STATE_HEADER = struct.Struct("<BBHHH")
+NO_LOCATION = 0xFFFF
+
+
+def knight_table(width, height):
+    """
+    Return the precomputed knight moves of a board geometry: a tuple holding,
+    for every cell index `row * width + col`, the tuple of (row, col) cells a
+    knight can reach from it without leaving the board.
+    """
+    table = _KNIGHT_TABLES.get((width, height))
+    if table is None:
+        table = tuple(tuple((r + dr, c + dc) for dr, dc in DIRECTIONS
+                            if 0 <= r + dr < height and 0 <= c + dc < width)
+                      for r in range(height) for c in range(width))
+        _KNIGHT_TABLES[(width, height)] = table
+    return table
+
+
+class NodeBudget(object):
+    """
+    Work-based time control for one move, used by `Board.play` in place of
+    the wall-clock timer when a node budget is given. Like the timer it is
+    called to get the time left -- here the number of nodes left -- and
+    search agents report every node they expand through `count()`, so the
+    result of a game does not depend on the speed or load of the machine.
+
+    Parameters
+    ----------
+    nodes : int
+        The number of nodes the agent may expand before forfeiting.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.used = 0
+
+    def __call__(self):
+        return self.nodes - self.used
+
+    def count(self, nodes=1):
+        """ Report `nodes` expanded nodes. """
+        self.used += nodes
+
 
 class Board(object):
     """
@@ -192,6 +248,82 @@ class Board(object):
             player = self.active_player
         return self.__get_moves__(self.__last_player_move__[player])
 
+    def iter_legal_moves(self, player=None, first=None):
+        """
+        Generate the legal moves for the specified player one at a time, in
+        the same order as `get_legal_moves()`, so that a search can stop
+        consuming moves (e.g., after a cutoff) without generating the rest.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            generate the legal moves for the active player on the board.
+
+        first : (int, int) (optional)
+            A move to generate before all others if it is legal (e.g., the
+            best move of an earlier search); it is not generated twice.
+
+        Returns
+        ----------
+        generator<(int, int)>
+            The coordinate pairs (row, column) of the legal moves.
+        """
+        if player is None:
+            player = self.active_player
+        location = self.__last_player_move__[player]
+        state = self.__board_state__
+
+        if location == Board.NOT_MOVED:
+            candidates = ((i, j) for j in range(self.width) for i in range(self.height))
+            if first is not None and self.move_is_legal(first):
+                yield first
+            else:
+                first = None
+        else:
+            candidates = knight_table(self.width, self.height)[location[0] * self.width + location[1]]
+            if first is not None and first in candidates and not state[first[0]][first[1]]:
+                yield first
+            else:
+                first = None
+
+        for move in candidates:
+            if not state[move[0]][move[1]] and move != first:
+                yield move
+
+    def has_legal_moves(self, player=None):
+        """
+        Test whether the specified player (by default the active player) has
+        any legal move, without building the list of moves.
+        """
+        if player is None:
+            player = self.active_player
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return self.move_count < self.width * self.height
+        state = self.__board_state__
+        for r, c in knight_table(self.width, self.height)[location[0] * self.width + location[1]]:
+            if not state[r][c]:
+                return True
+        return False
+
+    def count_legal_moves(self, player=None):
+        """
+        Return the number of legal moves of the specified player (by default
+        the active player), without building the list of moves.
+        """
+        if player is None:
+            player = self.active_player
+        location = self.__last_player_move__[player]
+        if location == Board.NOT_MOVED:
+            return len(self.get_blank_spaces())
+        state = self.__board_state__
+        count = 0
+        for r, c in knight_table(self.width, self.height)[location[0] * self.width + location[1]]:
+            if not state[r][c]:
+                count += 1
+        return count
+
     def apply_move(self, move):
         """
         Move the active player to a specified location.
@@ -214,11 +346,11 @@ class Board(object):
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self.inactive_player and not self.get_legal_moves(self.active_player)
+        return player == self.inactive_player and not self.has_legal_moves(self.active_player)
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self.active_player and not self.get_legal_moves(self.active_player)
+        return player == self.active_player and not self.has_legal_moves(self.active_player)
 
     def utility(self, player):
         """
@@ -244,7 +376,7 @@ class Board(object):
             otherwise.
         """
 
-        if not self.get_legal_moves(self.active_player):
+        if not self.has_legal_moves(self.active_player):
 
             if player == self.inactive_player:
                 return float("inf")
@@ -272,6 +404,117 @@ class Board(object):
 
         return valid_moves
 
+    def symmetry_transforms(self):
+        """
+        Return the cell permutations for every symmetry of the board geometry
+        (8 on square boards, 4 otherwise), identity first. Cells are indexed
+        as `row * width + col`; see `isolation.symmetry`.
+        """
+        return symmetry.transforms(self.width, self.height)
+
+    def canonical_key(self):
+        """
+        Return a key shared by the current position and all of its rotations
+        and reflections.
+
+        Returns
+        ----------
+        (bytes, int)
+            The encoded canonical position, and the index (into
+            `symmetry_transforms()`) of the symmetry that maps this position
+            onto the canonical one.
+        """
+        return symmetry.canonical_key(self.width, self.height, *symmetry.board_cells(self))
+
+    def position_symmetries(self):
+        """
+        Return the permutations of the non-identity symmetries that map the
+        current position onto itself (i.e., same blocked cells and same
+        player locations).
+        """
+        perms = symmetry.transforms(self.width, self.height)
+        w = self.width
+        p1 = self.__last_player_move__[self.__player_1__]
+        p2 = self.__last_player_move__[self.__player_2__]
+        p1 = None if p1 is None else p1[0] * w + p1[1]
+        p2 = None if p2 is None else p2[0] * w + p2[1]
+
+        # the player locations rule out almost every symmetry before the
+        # blocked cells need to be inspected
+        candidates = [perm for perm in perms[1:]
+                      if (p1 is None or perm[p1] == p1) and (p2 is None or perm[p2] == p2)]
+        if not candidates:
+            return []
+
+        blocked, _, _ = symmetry.board_cells(self)
+        blocked_set = set(blocked)
+        return [perm for perm in candidates
+                if all(perm[idx] in blocked_set for idx in blocked)]
+
+    def unique_moves(self, moves=None):
+        """
+        Reduce a list of moves to one representative of each class of moves
+        that lead to equivalent positions under the symmetries of the current
+        position.
+
+        Parameters
+        ----------
+        moves : list<(int, int)> (optional)
+            The moves to reduce; defaults to the legal moves of the active
+            player.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The first move of each equivalence class, in the input order.
+        """
+        if moves is None:
+            moves = self.get_legal_moves()
+        perms = self.position_symmetries()
+        if not perms:
+            return moves
+
+        w = self.width
+        seen = set()
+        unique = []
+        for move in moves:
+            idx = move[0] * w + move[1]
+            if idx in seen:
+                continue
+            unique.append(move)
+            seen.add(idx)
+            seen.update(perm[idx] for perm in perms)
+        return unique
+
+    def to_bytes(self):
+        """
+        Encode the position (not the players) compactly, e.g. to send it to
+        another process; see `Board.from_bytes()`.
+        """
+        w = self.width
+        locations = [NO_LOCATION if move is None else move[0] * w + move[1]
+                     for move in (self.__last_player_move__[self.__player_1__],
+                                  self.__last_player_move__[self.__player_2__])]
+        header = STATE_HEADER.pack(w, self.height, self.move_count, *locations)
+        return header + bytes(cell for row in self.__board_state__ for cell in row)
+
+    @classmethod
+    def from_bytes(cls, data, player_1, player_2):
+        """
+        Rebuild a board encoded by `Board.to_bytes()` between two players.
+        """
+        width, height, move_count, loc_1, loc_2 = STATE_HEADER.unpack_from(data)
+        board = cls(player_1, player_2, width, height)
+        cells = data[STATE_HEADER.size:STATE_HEADER.size + width * height]
+        board.__board_state__ = [list(cells[r * width:(r + 1) * width]) for r in range(height)]
+        board.__last_player_move__ = {
+            player_1: None if loc_1 == NO_LOCATION else divmod(loc_1, width),
+            player_2: None if loc_2 == NO_LOCATION else divmod(loc_2, width)}
+        board.move_count = move_count
+        if move_count % 2:
+            board.__active_player__, board.__inactive_player__ = player_2, player_1
+        return board
+
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
         return self.to_string()
@@ -306,7 +549,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, node_budget=None, profiler=None):
         """
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
@@ -317,14 +560,35 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        node_budget : int (optional)
+            If given, replaces the wall-clock time limit: each turn the
+            player receives a `NodeBudget` of this many nodes as its
+            `time_left` function, and loses by timeout if it reports more
+            nodes than the budget allows.
+
+        profiler : profiling.MoveProfiler (optional)
+            If given, every call to `get_move` runs under the profile of its
+            player for the current game phase (see `profiling`).
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
             Return multiple including the winning player, the complete game
             move history, and a string indicating the reason for losing
             (e.g., timeout or invalid move).
+
+        The milliseconds taken by each move of the history are kept in the
+        `move_times` attribute of the board, and the search statistics of
+        each move (as a dict, or None) in `move_stats`: players that collect
+        them leave the record of their last move in a `last_stats` attribute
+        (see `search_stats.SearchStats`). Both are lists with one entry per
+        ply rather than part of the move history, whose entries stay plain
+        moves for the game records and results stores built from it;
+        `search_stats.attach_stats()` pairs the history with the statistics.
         """
         move_history = []
+        self.move_times = []
+        self.move_stats = []
 
         curr_time_millis = lambda: 1000 * timeit.default_timer()
 
@@ -335,9 +599,18 @@ class Board(object):
             game_copy = self.copy()
 
             move_start = curr_time_millis()
-            time_left = lambda : time_limit - (curr_time_millis() - move_start)
-            curr_move = self.active_player.get_move(game_copy, legal_player_moves, time_left)
+            if node_budget is not None:
+                time_left = NodeBudget(node_budget)
+            else:
+                time_left = lambda : time_limit - (curr_time_millis() - move_start)
+            get_move = self.active_player.get_move
+            if profiler is not None:
+                get_move = profiler.wrap(self.active_player, self)
+            curr_move = get_move(game_copy, legal_player_moves, time_left)
             move_end = time_left()
+            self.move_times.append(curr_time_millis() - move_start)
+            stats = getattr(self.active_player, "last_stats", None)
+            self.move_stats.append(stats.as_dict() if stats is not None else None)
 
             # print move_end
 
@@ -0,0 +1,219 @@
+"""
+Compact binary game records.
+
+A record file starts with a short header and holds any number of games back
+to back. Every game is a fixed 7-byte header followed by one byte per ply,
+the index `row * width + col` of the cell the player moved to, so boards of up
+to 255 cells can be recorded:
+
+    file header : magic "ISOR", version (u8)
+    game header : width (u8), height (u8), winner (u8: 0 unknown, 1 or 2),
+                  termination (u8, see TERMINATIONS), opening plies (u8),
+                  number of plies (u16, little-endian)
+    plies       : one cell index per ply; 0xFF for a missing or off-board
+                  move (e.g., (-1, -1) returned without legal moves)
+
+The opening plies are the moves applied before the players took over (e.g.,
+the random opening of a tournament match). As in the move history of
+`Board.play`, the last ply of a game with a termination reason is the move
+that lost it, and was never applied to the board.
+
+Reading never builds `Board` objects: `read_records()` slices games out of
+the file, and `replay()` walks the positions of a game on a flat bytearray.
+Text rendering (`iter_record_text()`) is generated lazily on top of them.
+"""
+import os
+import struct
+
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; appends are still atomic
+    fcntl = None
+
+RECORD_MAGIC = b"ISOR"
+RECORD_VERSION = 1
+FILE_HEADER = struct.Struct("<4sB")
+GAME_HEADER = struct.Struct("<BBBBBH")
+
+NO_MOVE = 0xFF
+
+# termination reasons, by code
+TERMINATIONS = ["", "timeout", "illegal move"]
+
+GameRecord = namedtuple("GameRecord", ["width", "height", "winner", "termination",
+                                       "opening", "moves"])
+GameRecord.__doc__ = """
+One recorded game. `winner` is 1 or 2 (0 if unknown), `termination` a reason
+from TERMINATIONS, `opening` the number of plies applied before the players
+took over and `moves` a bytes object holding one cell index per ply.
+"""
+
+
+def flatten_history(move_history):
+    """
+    Turn a move history as returned by `Board.play` into a flat list of the
+    moves of every ply.
+    """
+    return [move for turn in move_history for move in turn]
+
+
+def make_record(width, height, moves, winner=0, termination="", opening=0):
+    """
+    Build a `GameRecord` from a list of (row, col) moves. Moves that are
+    None or off the board (e.g., (-1, -1)) are recorded as NO_MOVE.
+    """
+    if width * height > NO_MOVE:
+        raise ValueError("boards of more than {} cells cannot be recorded".format(NO_MOVE))
+    cells = bytes(move[0] * width + move[1]
+                  if move is not None and 0 <= move[0] < height and 0 <= move[1] < width
+                  else NO_MOVE for move in moves)
+    return GameRecord(width, height, winner, termination, opening, cells)
+
+
+def encode_record(record):
+    """ Return the binary encoding of one game. """
+    return GAME_HEADER.pack(record.width, record.height, record.winner,
+                            TERMINATIONS.index(record.termination), record.opening,
+                            len(record.moves)) + bytes(record.moves)
+
+
+def write_records(path, records):
+    """ Write a new record file holding `records`. """
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION))
+        for record in records:
+            f.write(encode_record(record))
+
+
+def append_record(path, record):
+    """
+    Append one game to a record file, creating it if needed. The game is
+    written with a single `os.write` under an exclusive lock, so several
+    processes can append to the same file.
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        data = encode_record(record)
+        if os.fstat(fd).st_size == 0:
+            data = FILE_HEADER.pack(RECORD_MAGIC, RECORD_VERSION) + data
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def read_records(path):
+    """ Iterate over the `GameRecord`s of a record file. """
+    with open(path, "rb") as f:
+        data = f.read()
+    return parse_records(data)
+
+
+def parse_records(data):
+    """ Iterate over the `GameRecord`s of the contents of a record file. """
+    magic, version = FILE_HEADER.unpack_from(data, 0)
+    if magic != RECORD_MAGIC or version != RECORD_VERSION:
+        raise ValueError("not a version {} game record file".format(RECORD_VERSION))
+    offset = FILE_HEADER.size
+    unpack = GAME_HEADER.unpack_from
+    size = GAME_HEADER.size
+    while offset < len(data):
+        width, height, winner, termination, opening, plies = unpack(data, offset)
+        offset += size
+        yield GameRecord(width, height, winner, TERMINATIONS[termination], opening,
+                         data[offset:offset + plies])
+        offset += plies
+
+
+def replay(record):
+    """
+    Walk the positions of a recorded game without building boards.
+
+    Yields
+    ----------
+    (int, bytearray, list<int>)
+        For every position from the empty board to the final one: the number
+        of plies played, the cells (0 blank, 1 or 2 for the player that
+        blocked it) and the cell index of each player's location (None if
+        it has not moved). The bytearray and list are updated in place, so
+        copy them to keep a position.
+    """
+    cells = bytearray(record.width * record.height)
+    locations = [None, None]
+    moves = record.moves
+    if record.termination:
+        moves = moves[:-1]
+    yield 0, cells, locations
+    for ply, cell in enumerate(moves):
+        if cell == NO_MOVE:
+            break
+        player = ply % 2
+        cells[cell] = player + 1
+        locations[player] = cell
+        yield ply + 1, cells, locations
+
+
+def record_history(record):
+    """
+    Return the moves of a recorded game as a move history in the format of
+    `Board.play` ([player 1 move, player 2 move] per turn, from the first
+    ply of the game).
+    """
+    width = record.width
+    moves = [(-1, -1) if cell == NO_MOVE else divmod(cell, width) for cell in record.moves]
+    return [moves[i:i + 2] for i in range(0, len(moves), 2)]
+
+
+def iter_record_text(record):
+    """
+    Lazily generate the printable representation of a recorded game (see
+    `isolation.iter_game_text`), one chunk per ply.
+    """
+    from . import Board
+    from . import iter_game_text
+
+    winner = record.winner or "unknown"
+    return iter_game_text(winner, record_history(record), record.termination,
+                          Board(1, 2, record.width, record.height))
+
+
+def main():
+    import argparse
+    import sys
+    import timeit
+
+    parser = argparse.ArgumentParser(description="Summarize or print a binary game record file.")
+    parser.add_argument("path", help="the record file")
+    parser.add_argument("--text", action="store_true",
+                        help="print every game as text instead of the summary")
+    args = parser.parse_args()
+
+    if args.text:
+        for record in read_records(args.path):
+            sys.stdout.writelines(iter_record_text(record))
+        return
+
+    start = timeit.default_timer()
+    games = positions = 0
+    wins = [0, 0, 0]
+    terminations = {}
+    for record in read_records(args.path):
+        games += 1
+        wins[record.winner] += 1
+        terminations[record.termination] = terminations.get(record.termination, 0) + 1
+        for _ in replay(record):
+            positions += 1
+    elapsed = timeit.default_timer() - start
+
+    print("{} games, {} positions replayed in {:.2f}s ({:.0f} games/s)".format(
+        games, positions, elapsed, games / elapsed if elapsed else 0.))
+    print("wins: player 1 {}, player 2 {}, unknown {}".format(wins[1], wins[2], wins[0]))
+    for termination, count in sorted(terminations.items()):
+        print("  {!s:<15}{:>8d}".format(termination or "(none)", count))
+
+
+if __name__ == "__main__":
+    main()
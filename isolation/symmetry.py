@@ -0,0 +1,182 @@
+"""
+This file contains helpers for working with the dihedral symmetries of an
+isolation board. Knight moves are preserved by every rotation and reflection
+of the grid that maps the board onto itself, so positions that are images of
+each other under one of these symmetries have the same game value and their
+best moves correspond under the same transform.
+
+Cells are addressed by their index `row * width + col`. Each symmetry is
+stored as a permutation tuple `perm` such that `perm[index]` is the index of
+the image of `index`; the tables are built once per board geometry.
+"""
+
+# marker used in encoded keys for a player that has not moved yet
+NO_LOCATION = 0xFFFF
+
+_TRANSFORMS = {}
+_INVERSES = {}
+
+
+def transforms(width, height):
+    """
+    Return the cell permutations for every symmetry of a board geometry.
+
+    Rectangular boards have 4 symmetries (identity, both mirrors and the half
+    turn); square boards additionally have the two diagonal reflections and
+    the quarter turns, for 8 in total. The identity is always first.
+
+    Parameters
+    ----------
+    width : int
+        The number of columns of the board.
+
+    height : int
+        The number of rows of the board.
+
+    Returns
+    ----------
+    tuple<tuple<int>>
+        One permutation of the cell indices per symmetry.
+    """
+    key = (width, height)
+    perms = _TRANSFORMS.get(key)
+    if perms is not None:
+        return perms
+
+    w, h = width, height
+    maps = [lambda r, c: (r, c),
+            lambda r, c: (h - 1 - r, w - 1 - c),
+            lambda r, c: (h - 1 - r, c),
+            lambda r, c: (r, w - 1 - c)]
+    if width == height:
+        maps += [lambda r, c: (c, r),
+                 lambda r, c: (w - 1 - c, h - 1 - r),
+                 lambda r, c: (c, h - 1 - r),
+                 lambda r, c: (w - 1 - c, r)]
+
+    cells = [(r, c) for r in range(h) for c in range(w)]
+    perms = []
+    for fn in maps:
+        perm = []
+        for r, c in cells:
+            tr, tc = fn(r, c)
+            perm.append(tr * w + tc)
+        perms.append(tuple(perm))
+
+    perms = tuple(perms)
+    _TRANSFORMS[key] = perms
+    _INVERSES[key] = tuple(_invert(perm) for perm in perms)
+    return perms
+
+
+def inverses(width, height):
+    """
+    Return the inverse of every permutation returned by `transforms()`, in
+    the same order.
+    """
+    transforms(width, height)
+    return _INVERSES[(width, height)]
+
+
+def _invert(perm):
+    inv = [0] * len(perm)
+    for idx, image in enumerate(perm):
+        inv[image] = idx
+    return tuple(inv)
+
+
+def location_size(width, height):
+    """
+    Return the number of bytes used to encode a cell index (or the absence of
+    a location) on a board of the given geometry.
+    """
+    return 1 if width * height < 0xFF else 2
+
+
+def key_size(width, height):
+    """ Return the length in bytes of a key produced by `canonical_key()`. """
+    return (width * height + 7) // 8 + 2 * location_size(width, height)
+
+
+def encode_location(index, width, height):
+    """
+    Encode a cell index (or None for a player that has not moved) into the
+    fixed-width big-endian form used inside keys and book records.
+    """
+    size = location_size(width, height)
+    if index is None:
+        index = (1 << (8 * size)) - 1
+    return index.to_bytes(size, "big")
+
+
+def decode_location(data, width, height):
+    """ Invert `encode_location()`, returning None for the empty marker. """
+    index = int.from_bytes(data, "big")
+    if index == (1 << (8 * len(data))) - 1:
+        return None
+    return index
+
+
+def board_cells(board):
+    """
+    Extract the state of an `isolation.Board` as cell indices.
+
+    Returns
+    ----------
+    (list<int>, int or None, int or None)
+        The indices of all blocked cells, followed by the index of the
+        location of player 1 and of player 2 (None if they have not moved).
+    """
+    width = board.width
+    state = board.__board_state__
+    blocked = [r * width + c for r in range(board.height)
+               for c in range(width) if state[r][c]]
+    p1 = board.__last_player_move__[board.__player_1__]
+    p2 = board.__last_player_move__[board.__player_2__]
+    p1 = None if p1 is None else p1[0] * width + p1[1]
+    p2 = None if p2 is None else p2[0] * width + p2[1]
+    return blocked, p1, p2
+
+
+def canonical_key(width, height, blocked, p1, p2):
+    """
+    Find the canonical representative of a position among all of its images
+    under the board symmetries.
+
+    Parameters
+    ----------
+    width, height : int
+        The board geometry.
+
+    blocked : iterable<int>
+        Indices of the blocked cells.
+
+    p1, p2 : int or None
+        Indices of the player locations (None if the player has not moved).
+
+    Returns
+    ----------
+    (bytes, int)
+        The encoded canonical key, and the index (into `transforms()`) of the
+        symmetry that maps the given position onto the canonical one.
+    """
+    perms = transforms(width, height)
+    cells = width * height
+    best = None
+    best_sym = 0
+    for sym, perm in enumerate(perms):
+        mask = 0
+        for idx in blocked:
+            mask |= 1 << (cells - 1 - perm[idx])
+        candidate = (mask,
+                     NO_LOCATION if p1 is None else perm[p1],
+                     NO_LOCATION if p2 is None else perm[p2])
+        if best is None or candidate < best:
+            best = candidate
+            best_sym = sym
+
+    mask, t1, t2 = best
+    key = mask.to_bytes((cells + 7) // 8, "big") + \
+        encode_location(None if t1 == NO_LOCATION else t1, width, height) + \
+        encode_location(None if t2 == NO_LOCATION else t2, width, height)
+    return key, best_sym
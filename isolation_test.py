@@ -0,0 +1,78 @@
+"""
+Test cases for the move generation and terminal checks of the isolation board
+that the search agents rely on.
+"""
+import random
+import unittest
+
+import isolation
+import game_agent
+
+from sample_players import improved_score
+
+
+class MoveGenerationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = isolation.Board("player1", "player2", 7, 7)
+
+    def test_iter_legal_moves_order(self):
+        """ Lazy generation matches get_legal_moves, with `first` up front """
+        rng = random.Random(0)
+        for _ in range(20):
+            board = isolation.Board("player1", "player2", 7, 7)
+            while True:
+                moves = board.get_legal_moves()
+                self.assertEqual(list(board.iter_legal_moves()), moves)
+                self.assertEqual(list(board.iter_legal_moves(first=None)), moves)
+                if not moves:
+                    break
+                # a legal hash move is generated first and only once
+                first = rng.choice(moves)
+                self.assertEqual(list(board.iter_legal_moves(first=first)),
+                                 [first] + [move for move in moves if move != first])
+                # an illegal one (blocked, out of reach or off the board) is ignored
+                for illegal in [(-1, 0), (7, 7)] + [cell for cell in [(0, 0), (3, 3)]
+                                                    if cell not in moves]:
+                    self.assertEqual(list(board.iter_legal_moves(first=illegal)), moves)
+                board.apply_move(rng.choice(moves))
+
+    def test_count_and_has_legal_moves(self):
+        """ count_legal_moves and has_legal_moves agree with get_legal_moves """
+        rng = random.Random(1)
+        for width, height in [(7, 7), (5, 4), (3, 3)]:
+            for _ in range(10):
+                board = isolation.Board("player1", "player2", width, height)
+                while True:
+                    for player in (None, "player1", "player2"):
+                        moves = board.get_legal_moves(player)
+                        self.assertEqual(board.count_legal_moves(player), len(moves))
+                        self.assertEqual(board.has_legal_moves(player), bool(moves))
+                    if not board.get_legal_moves():
+                        break
+                    board.apply_move(rng.choice(board.get_legal_moves()))
+
+    def test_terminal_position(self):
+        """ A player with no legal move has lost, and the search stops there """
+        # no knight move leaves the center of a 3x3 board
+        board = isolation.Board("player1", "player2", 3, 3)
+        board.apply_move((1, 1))
+        board.apply_move((0, 0))
+        self.assertFalse(board.has_legal_moves())
+        self.assertTrue(board.has_legal_moves("player2"))
+        self.assertTrue(board.is_loser("player1"))
+        self.assertTrue(board.is_winner("player2"))
+        self.assertEqual(board.utility("player1"), float("-inf"))
+        self.assertEqual(board.utility("player2"), float("inf"))
+
+        for method in ("minimax", "alphabeta"):
+            player = game_agent.CustomPlayer(score_fn=improved_score, method=method)
+            game = isolation.Board(player, "player2", 3, 3)
+            for move in [(1, 1), (0, 0)]:
+                game.apply_move(move)
+            player.time_left = lambda: 1000.
+            self.assertEqual(getattr(player, method)(game, 3), (float("-inf"), (-1, -1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
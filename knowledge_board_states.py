@@ -1,8 +1,241 @@
+"""
+Knowledge about board states gathered by deep searches and kept across games.
+
+Results worth remembering -- proven wins and losses, and the best moves found
+by searches deep enough to be trusted -- are stored under the canonical key of
+the position (see `isolation.symmetry`), so every rotation or reflection of a
+position shares the same entry. When the store is backed by a file, every new
+entry is appended to a compact binary log and the log is replayed when the
+store is created, so an agent knows everything learned by earlier games and
+earlier runs as soon as it is constructed.
+
+Log record layout (little-endian):
+
+    crc32 (u32) of the rest of the record, width (u8), height (u8),
+    move (u16, cell index in the canonical frame), depth (u8),
+    result (i8, +1 proven win / -1 proven loss / 0 unproven for the player
+    to move), canonical key (size fixed by the board geometry)
+
+Appends take an exclusive lock on the log and are written with a single
+`os.write` on a descriptor opened in append mode, so several tournament
+worker processes can share one log. Records that fail their checksum (e.g. a
+torn write after a crash) are skipped when the log is read. Since entries
+are only ever appended, the log is compacted to one record per position kept
+in memory once it holds more than COMPACT_RATIO times `max_entries` records,
+when it is loaded or appended to.
+"""
+import heapq
+import os
+import struct
+import zlib
+
+try:
+	import fcntl
+except ImportError:  # not available on Windows; appends are still atomic
+	fcntl = None
+
+from isolation import symmetry
+
+RECORD_HEADER = struct.Struct("<IBBHBb")
+
+# default number of entries kept in memory before the least useful are evicted
+MAX_ENTRIES = 200000
+
+# searches shallower than this are not worth remembering unless proven
+MIN_DEPTH = 4
+
+# weight of a proven result when ranking entries for eviction
+PROVEN_BONUS = 1000
+
+# the log is compacted once it holds this many times `max_entries` records
+COMPACT_RATIO = 2
+
+
+class Knowledge(object):
+	""" What is known about one canonical position. """
+
+	__slots__ = ("move", "depth", "result", "hits")
+
+	def __init__(self, move, depth, result, hits=0):
+		self.move = move
+		self.depth = depth
+		self.result = result
+		self.hits = hits
+
+	def usefulness(self):
+		return self.hits + self.depth + (PROVEN_BONUS if self.result else 0)
+
+	def improves_on(self, other):
+		""" Test whether this entry should replace `other` for a position. """
+		if other is None:
+			return True
+		if bool(self.result) != bool(other.result):
+			return bool(self.result)
+		return self.depth > other.depth
+
+
 class BoardStateKnowledge(object):
 
-	def __init__(self):
+	def __init__(self, path=None, max_entries=MAX_ENTRIES, min_depth=MIN_DEPTH):
+		self.path = path
+		self.max_entries = max_entries
+		self.min_depth = min_depth
 		self.knowledge = {}
+		# records in the log, as far as this process knows
+		self.log_records = 0
+		if path is not None and os.path.exists(path):
+			self.load()
 
 	def set_current_player(self, player):
 		self.player = player
 
+	def __len__(self):
+		return len(self.knowledge)
+
+	def lookup(self, game):
+		"""
+		Return what is known about the position of `game` as a tuple of the
+		best move (row, column), the depth it was searched to and the result
+		for the player to move, or None if the position is unknown.
+		"""
+		key, sym = self._key(game)
+		entry = self.knowledge.get(key)
+		if entry is None:
+			return None
+		entry.hits += 1
+		index = symmetry.inverses(game.width, game.height)[sym][entry.move]
+		return divmod(index, game.width), entry.depth, entry.result
+
+	def record(self, game, move, depth, score):
+		"""
+		Remember the outcome of a search from the position of `game`, and
+		append it to the log if it improves on what was known. Searches that
+		are neither proven (infinite score) nor at least `min_depth` deep
+		are ignored.
+		"""
+		result = 1 if score == float("inf") else -1 if score == float("-inf") else 0
+		if not result and depth < self.min_depth:
+			return False
+		if move is None or not game.move_is_legal(move):
+			return False
+
+		key, sym = self._key(game)
+		index = symmetry.transforms(game.width, game.height)[sym][move[0] * game.width + move[1]]
+		entry = Knowledge(index, min(depth, 0xFF), result)
+		if not self._merge(key, entry):
+			return False
+
+		if self.path is not None:
+			self._append(self._encode(key, entry))
+			self.log_records += 1
+			if self.log_records > COMPACT_RATIO * self.max_entries:
+				self.compact()
+		return True
+
+	def load(self):
+		"""
+		Replay the log into memory, keeping the best entry per position, and
+		compact it if it has grown too long.
+		"""
+		with open(self.path, "rb") as f:
+			data = f.read()
+		self.log_records = 0
+		for key, entry in self._decode(data):
+			self._merge(key, entry)
+			self.log_records += 1
+		if self.log_records > COMPACT_RATIO * self.max_entries:
+			self.compact()
+
+	def compact(self):
+		"""
+		Rewrite the log so that it holds exactly one record per position
+		known in memory. Other processes appending concurrently wait for the
+		rewrite and then append to the new log.
+		"""
+		if self.path is None:
+			return
+		fd = self._open_locked()
+		try:
+			hits = {key: entry.hits for key, entry in self.knowledge.items()}
+			self.knowledge.clear()
+			os.lseek(fd, 0, os.SEEK_SET)
+			chunks = []
+			while True:
+				chunk = os.read(fd, 1 << 20)
+				if not chunk:
+					break
+				chunks.append(chunk)
+			for key, entry in self._decode(b"".join(chunks)):
+				self._merge(key, entry)
+			for key, entry in self.knowledge.items():
+				entry.hits = hits.get(key, 0)
+
+			tmp_path = self.path + ".tmp"
+			with open(tmp_path, "wb") as f:
+				for key, entry in self.knowledge.items():
+					f.write(self._encode(key, entry))
+			os.replace(tmp_path, self.path)
+			self.log_records = len(self.knowledge)
+		finally:
+			os.close(fd)
+
+	def _key(self, game):
+		key, sym = game.canonical_key()
+		return (game.width, game.height, key), sym
+
+	def _merge(self, key, entry):
+		current = self.knowledge.get(key)
+		if not entry.improves_on(current):
+			return False
+		if current is not None:
+			entry.hits = current.hits
+		self.knowledge[key] = entry
+		if len(self.knowledge) > self.max_entries:
+			self._evict()
+		return True
+
+	def _evict(self):
+		# drop the least useful tenth in one pass so eviction stays amortized
+		count = max(1, len(self.knowledge) - self.max_entries + self.max_entries // 10)
+		victims = heapq.nsmallest(count, self.knowledge.items(), key=lambda item: item[1].usefulness())
+		for key, _ in victims:
+			del self.knowledge[key]
+
+	def _encode(self, key, entry):
+		width, height, key_bytes = key
+		body = RECORD_HEADER.pack(0, width, height, entry.move, entry.depth, entry.result)[4:] + key_bytes
+		return struct.pack("<I", zlib.crc32(body)) + body
+
+	def _decode(self, data):
+		offset = 0
+		while offset + RECORD_HEADER.size <= len(data):
+			crc, width, height, move, depth, result = RECORD_HEADER.unpack_from(data, offset)
+			end = offset + RECORD_HEADER.size + symmetry.key_size(width, height)
+			body = data[offset + 4:end]
+			if end > len(data) or zlib.crc32(body) != crc:
+				# torn or corrupt record; resynchronize on the next byte
+				offset += 1
+				continue
+			yield (width, height, data[offset + RECORD_HEADER.size:end]), Knowledge(move, depth, result)
+			offset = end
+
+	def _open_locked(self):
+		while True:
+			fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+			if fcntl is None:
+				return fd
+			fcntl.flock(fd, fcntl.LOCK_EX)
+			# the log may have been replaced by compact() while waiting
+			try:
+				if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+					return fd
+			except FileNotFoundError:
+				pass
+			os.close(fd)
+
+	def _append(self, record):
+		fd = self._open_locked()
+		try:
+			os.write(fd, record)
+		finally:
+			os.close(fd)
@@ -0,0 +1,116 @@
+"""
+Test cases for the knowledge kept across games and its log file.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import opening_book
+
+from isolation import symmetry
+from knowledge_board_states import BoardStateKnowledge
+from knowledge_board_states import RECORD_HEADER
+
+
+def positions(count, offset=0):
+    """ Return `count` distinct positions of a 5x5 board and a legal move of each. """
+    boards = []
+    for moves in list(opening_book.opening_positions(5, 5, 3).values())[offset:offset + count]:
+        board = opening_book._replay(5, 5, moves)
+        boards.append((board, board.get_legal_moves()[0]))
+    return boards
+
+
+def append_positions(path, offset, count):
+    knowledge = BoardStateKnowledge(path)
+    for board, move in positions(count, offset):
+        knowledge.record(board, move, 5, 0.)
+
+
+class BoardStateKnowledgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "knowledge.log")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_log_round_trip(self):
+        """ Entries are found again by a store replaying the log """
+        knowledge = BoardStateKnowledge(self.path)
+        boards = positions(20)
+        for depth, (board, move) in enumerate(boards):
+            self.assertTrue(knowledge.record(board, move, 4 + depth, float("inf") if depth % 2 else 0.))
+        # shallow searches are not remembered
+        self.assertFalse(knowledge.record(boards[0][0], boards[0][1], 1, 0.))
+
+        loaded = BoardStateKnowledge(self.path)
+        self.assertEqual(len(loaded), len(boards))
+        for depth, (board, move) in enumerate(boards):
+            self.assertEqual(loaded.lookup(board), (move, 4 + depth, depth % 2))
+
+        # a log of more than twice the capacity is compacted when loaded
+        small = BoardStateKnowledge(self.path, max_entries=5)
+        self.assertEqual(small.log_records, len(small))
+        self.assertEqual(BoardStateKnowledge(self.path).log_records, len(small))
+
+    def test_eviction_and_compaction(self):
+        """ The least useful entries are evicted, and a long log is compacted """
+        knowledge = BoardStateKnowledge(self.path, max_entries=10)
+        boards = positions(11)
+        for depth, (board, move) in enumerate(boards):
+            knowledge.record(board, move, 20 - depth, float("-inf") if depth == 10 else 0.)
+        # the two shallowest unproven entries went, the proven one stayed
+        self.assertEqual(len(knowledge), 9)
+        self.assertIsNone(knowledge.lookup(boards[8][0]))
+        self.assertIsNone(knowledge.lookup(boards[9][0]))
+        self.assertEqual(knowledge.lookup(boards[10][0])[2], -1)
+
+        # the log keeps every record until it grows past twice the capacity
+        record_size = RECORD_HEADER.size + symmetry.key_size(5, 5)
+        more = positions(10, 11)
+        for board, move in more[:-1]:
+            knowledge.record(board, move, 10, 0.)
+        self.assertEqual(os.path.getsize(self.path), 20 * record_size)
+        knowledge.record(more[-1][0], more[-1][1], 10, 0.)
+        self.assertEqual(os.path.getsize(self.path), len(knowledge) * record_size)
+        self.assertEqual(len(BoardStateKnowledge(self.path, max_entries=10)), len(knowledge))
+
+    def test_corrupt_record_is_skipped(self):
+        """ Reading resynchronizes after a corrupt or torn record """
+        knowledge = BoardStateKnowledge(self.path)
+        boards = positions(3)
+        for board, move in boards:
+            knowledge.record(board, move, 6, 0.)
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        size = len(data) // 3
+        data[size + 5] ^= 0xFF
+        with open(self.path, "wb") as f:
+            f.write(b"\x00\x01" + bytes(data) + bytes(data[:size // 2]))
+
+        loaded = BoardStateKnowledge(self.path)
+        self.assertEqual(len(loaded), 2)
+        self.assertIsNone(loaded.lookup(boards[1][0]))
+        self.assertEqual(loaded.lookup(boards[2][0]), (boards[2][1], 6, 0))
+
+    def test_concurrent_appends(self):
+        """ Two processes appending to one log lose no record """
+        workers = [multiprocessing.Process(target=append_positions, args=(self.path, offset, 30))
+                   for offset in (0, 30)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+
+        loaded = BoardStateKnowledge(self.path)
+        self.assertEqual(len(loaded), 60)
+        self.assertEqual(loaded.log_records, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,344 @@
+"""
+Asyncio referee service for playing many games of isolation concurrently.
+
+Agents connect over TCP or a Unix socket and speak a line protocol:
+
+    client -> server : HELLO <name>
+    server -> client : MOVE <id> <seat> <milliseconds> <position>
+    client -> server : <id> <row> <col>
+    server -> client : RESULT <win|loss> <termination>
+    server -> client : BYE
+
+The position is the hex encoding of `Board.to_bytes()`, seat is 1 or 2 and
+the milliseconds are the time the agent has for its move. A client answers
+each MOVE with the same id and its move (-1 -1 for none); replies to an
+earlier id arrived after their deadline and are ignored. Connected clients
+are paired as they become idle, and each game starts from a random two-ply
+opening, as in the tournament. The move deadline is enforced by the server
+with `asyncio.wait_for`: an agent that misses it loses on time.
+
+Run this file to play a number of games between local stand-in clients
+(`sample_players.RandomPlayer` or `game_agent.CustomPlayer`) and report the
+throughput in games per second. The stand-ins of one process share its CPU
+time, so search agents start losing on time when there are more of them
+than cores; `--serve` only runs the server, and `--connect` only runs
+stand-in clients, so that they can be spread over several processes.
+"""
+import argparse
+import asyncio
+import collections
+import os
+import random
+import timeit
+
+from concurrent.futures import ThreadPoolExecutor
+
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+TIME_LIMIT = 150  # milliseconds per move
+LATENCY_MARGIN = 20  # milliseconds of the move time clients keep for the round trip
+OPENING_PLIES = 2
+
+STAND_INS = {
+    "random": RandomPlayer,
+    "custom": lambda: CustomPlayer(score_fn=improved_score, method="alphabeta"),
+}
+
+
+class ClientConnection(object):
+    """ Server-side state of one connected agent. """
+
+    def __init__(self, name, reader, writer):
+        self.name = name
+        self.reader = reader
+        self.writer = writer
+        self.request_id = 0
+        self.closed = asyncio.get_running_loop().create_future()
+
+    async def send(self, line):
+        self.writer.write((line + "\n").encode())
+        await self.writer.drain()
+
+    async def request_move(self, game, time_limit):
+        """ Send the position to the agent and wait for its reply. """
+        self.request_id += 1
+        seat = 1 if game.__player_1__ is self else 2
+        await self.send("MOVE {} {} {} {}".format(self.request_id, seat, time_limit,
+                                                  game.to_bytes().hex()))
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("{} disconnected".format(self.name))
+            request_id, row, col = (int(field) for field in line.split())
+            if request_id == self.request_id:
+                return row, col
+
+
+class MatchServer(object):
+    """
+    Referee that pairs connected clients and plays `games` games between
+    them, at most one game per client at a time.
+
+    Parameters
+    ----------
+    games : int
+        Number of games to play before the server stops.
+
+    time_limit : int (optional)
+        Milliseconds allowed for every move.
+
+    width, height : int (optional)
+        The board geometry.
+    """
+
+    def __init__(self, games, time_limit=TIME_LIMIT, width=7, height=7):
+        self.games = games
+        self.time_limit = time_limit
+        self.width = width
+        self.height = height
+        self.started = 0
+        self.played = 0
+        self.wins = collections.Counter()
+        self.terminations = collections.Counter()
+        self.clients = []
+        self.idle = None
+        self.done = None
+        self.start_time = None
+        self.path = None
+
+    async def serve(self, host="127.0.0.1", port=0, path=None):
+        """
+        Accept clients on a TCP port (or the Unix socket `path`) until every
+        game is played. Returns once the server is listening, with the
+        (host, port) or path it listens on; await `finished()` for the end.
+        """
+        self.idle = asyncio.Queue()
+        self.done = asyncio.get_running_loop().create_future()
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path)
+            address = self.path = path
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+            address = self.server.sockets[0].getsockname()[:2]
+        self.matchmaker = asyncio.ensure_future(self.pair_clients())
+        return address
+
+    async def finished(self):
+        """ Wait until every game is played, then shut the server down. """
+        await self.done
+        for client in self.clients:
+            if not client.closed.done():
+                try:
+                    await client.send("BYE")
+                except ConnectionError:
+                    pass
+                client.writer.close()
+                client.closed.set_result(None)
+        self.server.close()
+        await self.server.wait_closed()
+        if self.path is not None:
+            os.remove(self.path)
+
+    async def handle_client(self, reader, writer):
+        line = await reader.readline()
+        fields = line.decode().split()
+        if len(fields) != 2 or fields[0] != "HELLO":
+            writer.close()
+            return
+        client = ClientConnection(fields[1], reader, writer)
+        self.clients.append(client)
+        await self.idle.put(client)
+        await client.closed
+
+    async def pair_clients(self):
+        games = []
+        while self.started < self.games:
+            client_1 = await self.next_client()
+            client_2 = await self.next_client()
+            if self.start_time is None:
+                self.start_time = timeit.default_timer()
+            self.started += 1
+            games.append(asyncio.ensure_future(self.play_game(client_1, client_2)))
+        await asyncio.gather(*games)
+        self.done.set_result(timeit.default_timer() - self.start_time)
+
+    async def next_client(self):
+        while True:
+            client = await self.idle.get()
+            if not client.closed.done():
+                return client
+
+    async def play_game(self, client_1, client_2):
+        """ Play one game between two clients, then make both idle again. """
+        game = Board(client_1, client_2, self.width, self.height)
+        for _ in range(OPENING_PLIES):
+            game.apply_move(random.choice(game.get_legal_moves()))
+
+        termination = ""
+        while True:
+            player = game.active_player
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            try:
+                move = await asyncio.wait_for(player.request_move(game, self.time_limit),
+                                              self.time_limit / 1000.)
+            except asyncio.TimeoutError:
+                termination = "timeout"
+                break
+            except ConnectionError:
+                termination = "disconnect"
+                break
+            except ValueError:
+                move = None
+            if move not in legal_moves:
+                termination = "illegal move"
+                break
+            game.apply_move(move)
+
+        winner, loser = game.inactive_player, game.active_player
+        self.played += 1
+        self.wins[winner.name] += 1
+        self.terminations[termination] += 1
+        for client, result in ((winner, "win"), (loser, "loss")):
+            try:
+                if termination == "disconnect" and client is loser:
+                    raise ConnectionError
+                await client.send("RESULT {} {}".format(result, termination or "none"))
+            except ConnectionError:
+                if not client.closed.done():
+                    client.closed.set_result(None)
+            else:
+                await self.idle.put(client)
+
+
+async def run_client(player, name, host="127.0.0.1", port=None, path=None, executor=None,
+                     margin=LATENCY_MARGIN):
+    """
+    Connect `player` (an object with a `get_move()` method, like the
+    tournament agents) to a match server and play until it says BYE.
+    `get_move()` runs in `executor` so that slow agents do not block the
+    event loop, and its `time_left()` is reduced by `margin` milliseconds
+    to leave time for the reply to reach the server. Returns the number of
+    games won and lost.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write("HELLO {}\n".format(name).encode())
+    loop = asyncio.get_running_loop()
+    results = collections.Counter()
+    curr_time_millis = lambda: 1000 * timeit.default_timer()
+
+    while True:
+        line = await reader.readline()
+        fields = line.decode().split()
+        if not fields or fields[0] == "BYE":
+            break
+        if fields[0] == "RESULT":
+            results[fields[1]] += 1
+            continue
+        request_id, seat, time_limit, state = fields[1:]
+        players = (player, "opponent") if seat == "1" else ("opponent", player)
+        game = Board.from_bytes(bytes.fromhex(state), *players)
+        start = curr_time_millis()
+        time_left = lambda: int(time_limit) - margin - (curr_time_millis() - start)
+        move = await loop.run_in_executor(executor, player.get_move, game,
+                                          game.get_legal_moves(), time_left)
+        if move is None:
+            move = (-1, -1)
+        writer.write("{} {} {}\n".format(request_id, *move).encode())
+        await writer.drain()
+
+    writer.close()
+    return results["win"], results["loss"]
+
+
+async def play_local(games, clients, agents, time_limit=TIME_LIMIT, path=None):
+    """
+    Run a match server and `clients` stand-in clients on this machine, the
+    clients alternating between the agent kinds in `agents` (keys of
+    STAND_INS), and play `games` games. Returns the server and the elapsed
+    seconds.
+    """
+    server = MatchServer(games, time_limit)
+    address = await server.serve(path=path)
+    executor = ThreadPoolExecutor(max_workers=clients)
+    connect = {"path": path} if path is not None else {"host": address[0], "port": address[1]}
+    tasks = [asyncio.ensure_future(run_client(STAND_INS[agents[i % len(agents)]](),
+                                              "{}-{}".format(agents[i % len(agents)], i),
+                                              executor=executor, **connect))
+             for i in range(clients)]
+    await server.finished()
+    await asyncio.gather(*tasks)
+    executor.shutdown()
+    return server, server.done.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play isolation games on an asyncio match server.")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=100,
+                        help="number of local stand-in clients (default: %(default)s)")
+    parser.add_argument("--agents", default="random",
+                        help="comma separated stand-in kinds, from: " + ", ".join(STAND_INS))
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT,
+                        help="milliseconds per move (default: %(default)s)")
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--serve", action="store_true",
+                        help="only run the server, for external clients")
+    parser.add_argument("--connect", metavar="HOST:PORT", nargs="?", const="",
+                        help="only run the stand-in clients, connected to this server "
+                             "(or, without a value, to the --unix socket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    async def serve():
+        server = MatchServer(args.games, args.time_limit)
+        address = await server.serve(args.host, args.port, args.unix)
+        print("Listening on {}".format(address))
+        await server.finished()
+        return server, server.done.result()
+
+    async def connect():
+        if args.unix:
+            connect = {"path": args.unix}
+        else:
+            host, _, port = args.connect.rpartition(":")
+            connect = {"host": host, "port": int(port)}
+        executor = ThreadPoolExecutor(max_workers=args.clients)
+        agents = args.agents.split(",")
+        names = ["{}-{}".format(agents[i % len(agents)], i) for i in range(args.clients)]
+        results = await asyncio.gather(*(run_client(STAND_INS[name.split("-")[0]](), name,
+                                                    executor=executor, **connect)
+                                         for name in names))
+        executor.shutdown()
+        for name, (wins, losses) in zip(names, results):
+            print("  {!s:<15}{:>6d} wins {:>6d} losses".format(name, wins, losses))
+
+    if args.connect is not None:
+        asyncio.run(connect())
+        return
+    if args.serve:
+        server, elapsed = asyncio.run(serve())
+    else:
+        server, elapsed = asyncio.run(play_local(args.games, args.clients,
+                                                 args.agents.split(","), args.time_limit,
+                                                 args.unix))
+
+    print("{} games in {:.2f}s: {:.1f} games/s".format(server.played, elapsed,
+                                                       server.played / elapsed))
+    for name, wins in server.wins.most_common():
+        print("  {!s:<15}{:>6d} wins".format(name, wins))
+    for termination, count in sorted(server.terminations.items()):
+        print("  {!s:<15}{:>6d}".format(termination or "(none)", count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Test cases for the asyncio match server.
+"""
+import asyncio
+import time
+import unittest
+
+import match_server
+
+
+class SlowPlayer(object):
+    """ Agent that overruns the deadline of every move. """
+
+    def get_move(self, game, legal_moves, time_left):
+        time.sleep(0.2)
+        return legal_moves[0]
+
+
+class MatchServerTest(unittest.TestCase):
+
+    def test_local_games(self):
+        """ Every game is played and reported between local clients """
+        server, elapsed = asyncio.run(match_server.play_local(30, 6, ["random"]))
+        self.assertEqual(server.played, 30)
+        self.assertEqual(sum(server.wins.values()), 30)
+        self.assertEqual(server.terminations[""], 30)
+
+    def test_deadline(self):
+        """ A client that misses the deadline loses on time """
+
+        async def play():
+            server = match_server.MatchServer(2, time_limit=50)
+            host, port = await server.serve()
+            clients = [match_server.run_client(SlowPlayer(), "slow", host, port),
+                       match_server.run_client(SlowPlayer(), "other", host, port)]
+            tasks = [asyncio.ensure_future(client) for client in clients]
+            await server.finished()
+            return server, await asyncio.gather(*tasks)
+
+        server, results = asyncio.run(play())
+        self.assertEqual(server.terminations["timeout"], 2)
+        self.assertEqual(sum(wins for wins, _ in results), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
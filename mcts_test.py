@@ -0,0 +1,86 @@
+"""
+Test cases for the Monte Carlo tree search agent.
+"""
+import random
+import unittest
+
+import isolation
+
+from game_agent import MCTSPlayer
+from game_agent import knight_indices
+from game_agent import random_rollout
+from isolation.isolation import knight_table
+from sample_players import RandomPlayer
+
+
+class MCTSPlayerTest(unittest.TestCase):
+
+    def test_rollout_kernel(self):
+        """ A playout ends when the player to move is stuck """
+        rng = random.Random(0)
+        neighbors = knight_indices(5, 5)
+        for _ in range(50):
+            cells = bytearray(25)
+            cells[0] = cells[24] = 1
+            winner = random_rollout(cells, neighbors, [0, 24], 0, rng.random)
+            self.assertIn(winner, (0, 1))
+            # the number of plies played decides the winner
+            plies = sum(cells) - 2
+            self.assertEqual(winner, (plies + 1) % 2)
+
+    def test_node_budget_and_tree_reuse(self):
+        """ Every move is legal, within the node budget, and reuses the tree """
+        random.seed(0)
+        player = MCTSPlayer(timeout=1., stats=True)
+        board = isolation.Board(player, RandomPlayer())
+        board.apply_move((2, 3))
+        board.apply_move((4, 3))
+        winner, move_history, termination = board.play(node_budget=200)
+
+        self.assertNotEqual(termination, "timeout")
+        searched = [record for record in board.move_stats if record and record["leaves"]]
+        self.assertTrue(searched)
+        self.assertTrue(all(record["leaves"] <= 200 for record in searched))
+        # the tree kept from the previous move is not discarded
+        self.assertGreater(len(player.moves), 1 + searched[-1]["nodes"])
+
+    def play_opening(self, player, first):
+        """ Play `player`'s second move in a game opened at `first` and (4, 3),
+        then a reply the player expanded, and return the board """
+        board = isolation.Board(player, "player2")
+        board.apply_move(first)
+        board.apply_move((4, 3))
+        board.apply_move(player.get_move(board.copy(), board.get_legal_moves(),
+                                         isolation.NodeBudget(300)))
+        reply = player.moves[player.first_child[player.kept_node]]
+        board.apply_move(divmod(reply, board.width))
+        return board
+
+    def reuses_tree(self, player, board):
+        """ Search a legal move and tell whether the tree was kept """
+        move = player.get_move(board.copy(), board.get_legal_moves(), isolation.NodeBudget(300))
+        self.assertIn(move, board.get_legal_moves())
+        # a fresh tree holds only the root and the nodes added by this search
+        return len(player.moves) > 1 + player.last_stats.nodes
+
+    def test_tree_reuse_across_games(self):
+        """ A tree kept from one game is not reused in the next one where the
+        locations and move count match but the blocked cells differ """
+        player = MCTSPlayer(timeout=1., stats=True)
+        player.seed(0)
+        board = self.play_opening(player, (2, 3))
+        self.assertTrue(self.reuses_tree(player, board))
+
+        board = self.play_opening(player, (2, 3))
+        location = board.get_player_location(player)
+        reply = board.get_player_location("player2")
+        # another first move reaching the same second location
+        first = next(move for move in knight_table(7, 7)[location[0] * 7 + location[1]]
+                     if move not in [(2, 3), (4, 3), reply])
+        next_game = isolation.Board(player, "player2")
+        for move in [first, (4, 3), location, reply]:
+            next_game.apply_move(move)
+        self.assertFalse(self.reuses_tree(player, next_game))
+
+if __name__ == '__main__':
+    unittest.main()
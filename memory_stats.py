@@ -0,0 +1,169 @@
+"""
+Memory accounting of the agents, reported with the search statistics.
+
+A `CustomPlayer` created with `memory=True` keeps a `MemoryMonitor` that
+measures every call to `get_move()` with `tracemalloc` and adds a "memory"
+entry to its `search_stats.SearchStats` record:
+
+- "peak": the most bytes allocated at once during the move, above what was
+  allocated when it started;
+- "retained": the bytes still allocated when it returned, above the start;
+- "boards": the number of live `isolation.Board` (or `CompactBoard`)
+  objects after the move.
+
+Every `snapshot_every` moves (and on the first one) the entry also holds:
+
+- "caches": the bytes held by each cache (the knowledge of the player, the
+  mapped opening books, and the move and symmetry tables of the process);
+- "growth": the allocation sites whose traced size grew the most since the
+  previous snapshot, as "file:line" and bytes.
+
+`tracemalloc` slows the whole process down (every allocation is traced), and
+the snapshots are taken before `get_move()` returns, so this mode is meant
+for dedicated measurement runs under a node budget rather than rated games.
+"""
+import collections
+import gc
+import sys
+import tracemalloc
+
+from isolation import Board
+from isolation import CompactBoard
+from isolation import isolation
+from isolation import symmetry
+
+SNAPSHOT_EVERY = 10  # moves between two snapshots of the caches and allocation sites
+GROWTH_SITES = 5  # allocation sites reported per snapshot
+TRACE_FRAMES = 1  # frames kept by tracemalloc for every allocation
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Return the bytes of `obj` and of all the objects it holds (through
+    containers, `__dict__` and `__slots__`), counting every object once.
+    Classes, functions and modules are not followed.
+    """
+    if seen is None:
+        seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(obj)
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        for name in getattr(type(obj), "__slots__", ()):
+            if hasattr(obj, name):
+                stack.append(getattr(obj, name))
+    return size
+
+
+def cache_sizes(player):
+    """ Return the bytes held by each cache that `player` relies on. """
+    sizes = {}
+    knowledge = getattr(player, "knowledge", None)
+    if knowledge is not None:
+        sizes["knowledge"] = deep_sizeof(knowledge.knowledge)
+    # books are only open if the (optional) opening_book module was used
+    books = getattr(sys.modules.get("opening_book"), "_open_books", {})
+    sizes["book_mapped"] = sum(len(book.data) for book in books.values() if book is not None)
+    sizes["knight_tables"] = deep_sizeof(isolation._KNIGHT_TABLES)
+    sizes["symmetry_tables"] = deep_sizeof([symmetry._TRANSFORMS, symmetry._INVERSES])
+    return sizes
+
+
+def live_boards():
+    """ Return the number of boards alive in the process. """
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, (Board, CompactBoard)))
+
+
+class MemoryMonitor(object):
+    """
+    Measure the memory of the moves of a player.
+
+    Parameters
+    ----------
+    snapshot_every : int (optional)
+        Moves between two measurements of the caches and allocation sites.
+
+    growth_sites : int (optional)
+        Number of growing allocation sites reported.
+    """
+
+    def __init__(self, snapshot_every=SNAPSHOT_EVERY, growth_sites=GROWTH_SITES):
+        self.snapshot_every = snapshot_every
+        self.growth_sites = growth_sites
+        self.moves = 0
+        self.start = 0
+        self.snapshot = None
+
+    def begin(self):
+        """ Start measuring a move. """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+
+    def end(self, player):
+        """ Finish measuring a move of `player` and return its measurements. """
+        current, peak = tracemalloc.get_traced_memory()
+        memory = {"peak": peak - self.start, "retained": current - self.start,
+                  "boards": live_boards()}
+        if self.moves % self.snapshot_every == 0:
+            memory["caches"] = cache_sizes(player)
+            memory["growth"] = self.growth()
+        self.moves += 1
+        return memory
+
+    def growth(self):
+        """
+        Return the allocation sites that grew the most since the previous
+        call, as a list of ("file:line", bytes).
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+        previous, self.snapshot = self.snapshot, snapshot
+        if previous is None:
+            return []
+        grown = sorted((stat for stat in snapshot.compare_to(previous, "lineno")
+                        if stat.size_diff > 0), key=lambda stat: -stat.size_diff)
+        return [("{}:{}".format(stat.traceback[0].filename, stat.traceback[0].lineno),
+                 stat.size_diff) for stat in grown[:self.growth_sites]]
+
+
+def summarize(records, key):
+    """
+    Aggregate the memory entries of search records by `key(record)`.
+
+    Returns
+    ----------
+    dict
+        For every key: the number of measured moves, the mean and maximum
+        peak, the most live boards, the bytes of the caches at the last
+        snapshot, and the total growth of every allocation site reported.
+    """
+    totals = collections.OrderedDict()
+    for record in records:
+        memory = record.get("memory")
+        if memory is None:
+            continue
+        total = totals.setdefault(key(record), {"moves": 0, "peak": 0., "max_peak": 0,
+                                                "boards": 0, "caches": {},
+                                                "growth": collections.Counter()})
+        total["moves"] += 1
+        total["peak"] += memory["peak"]
+        total["max_peak"] = max(total["max_peak"], memory["peak"])
+        total["boards"] = max(total["boards"], memory["boards"])
+        total["caches"] = memory.get("caches", total["caches"])
+        total["growth"].update(dict(memory.get("growth", [])))
+    for total in totals.values():
+        total["peak"] /= total["moves"]
+    return totals
@@ -0,0 +1,49 @@
+"""
+Test cases for the memory accounting of the agents.
+"""
+import sys
+import tracemalloc
+import unittest
+
+import isolation
+import memory_stats
+
+from game_agent import CustomPlayer
+from knowledge_board_states import BoardStateKnowledge
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+
+class MemoryStatsTest(unittest.TestCase):
+
+    def tearDown(self):
+        tracemalloc.stop()
+
+    def test_deep_sizeof(self):
+        """ Nested objects are counted once """
+        inner = [1000, 2000]
+        outer = [inner, inner]
+        self.assertEqual(memory_stats.deep_sizeof(outer),
+                         sys.getsizeof(outer) + sys.getsizeof(inner) +
+                         sys.getsizeof(1000) + sys.getsizeof(2000))
+
+    def test_memory_in_search_statistics(self):
+        """ Every move reports its peak, live boards and (first) the caches """
+        player = CustomPlayer(search_depth=3, score_fn=improved_score, iterative=False,
+                              method="alphabeta", knowledge=BoardStateKnowledge(), memory=True)
+        board = isolation.Board(player, RandomPlayer())
+        board.apply_move((2, 3))
+        board.apply_move((4, 3))
+        board.play(time_limit=1000)
+
+        records = board.move_stats[::2]
+        self.assertTrue(all("memory" in record for record in records))
+        self.assertGreater(records[0]["memory"]["peak"], 0)
+        self.assertGreater(records[0]["memory"]["boards"], 0)
+        self.assertIn("knowledge", records[0]["memory"]["caches"])
+        totals = memory_stats.summarize(records, key=lambda record: "AB")
+        self.assertEqual(totals["AB"]["moves"], len(records))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,246 @@
+"""
+Opening book support for the isolation agents.
+
+Books are built offline by running this file as a script: every distinct
+position of the first few plies is searched deeply with a pool of worker
+processes, positions that are rotations or reflections of each other are
+stored once under their canonical key, and the results are written to one
+sorted binary file per board size. At play time `OpeningBook.move_for` finds
+the position with a binary search over the memory-mapped file, so the book is
+never loaded into memory as a whole.
+
+Book file layout (all integers little-endian unless part of a key):
+
+    header  : magic "ISOB", version (u8), width (u8), height (u8),
+              key size (u8), record count (u32)
+    records : canonical key (key size bytes, see `isolation.symmetry`),
+              best move as a cell index in the canonical frame, search depth
+              (u8); sorted by key
+"""
+import argparse
+import mmap
+import os
+import struct
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from isolation import symmetry
+from isolation.isolation import STATE_HEADER
+from game_agent import CustomPlayer
+from game_agent import custom_score
+
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+BOOK_MAGIC = b"ISOB"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<4sBBBBI")
+
+# board sizes built by default when running this file as a script
+SUPPORTED_SIZES = [(5, 5), (7, 7), (9, 9)]
+
+
+def book_path(width, height, book_dir=BOOK_DIR):
+	""" Return the location of the book file for a board geometry. """
+	return os.path.join(book_dir, "book_{}x{}.bin".format(width, height))
+
+
+class BookFile(object):
+	"""
+	Read-only view of a book file. The file is memory-mapped and searched in
+	place; only the pages touched by the binary search are ever read.
+	"""
+
+	def __init__(self, path):
+		with open(path, "rb") as f:
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, self.width, self.height, self.key_size, self.count = \
+			BOOK_HEADER.unpack_from(self.data, 0)
+		if magic != BOOK_MAGIC or version != BOOK_VERSION:
+			self.data.close()
+			raise ValueError("{} is not a version {} opening book".format(path, BOOK_VERSION))
+		self.location_size = symmetry.location_size(self.width, self.height)
+		self.record_size = self.key_size + self.location_size + 1
+
+	def lookup(self, key):
+		"""
+		Find the record stored for a canonical position key.
+
+		Returns
+		----------
+		(int, int) or None
+			The best move as a cell index in the canonical frame and the
+			depth it was searched to, or None if the position is not in the
+			book.
+		"""
+		data = self.data
+		key_size = self.key_size
+		record_size = self.record_size
+		low, high = 0, self.count
+		while low < high:
+			mid = (low + high) // 2
+			start = BOOK_HEADER.size + mid * record_size
+			probe = data[start:start + key_size]
+			if probe < key:
+				low = mid + 1
+			elif probe > key:
+				high = mid
+			else:
+				move = data[start + key_size:start + record_size - 1]
+				return (symmetry.decode_location(move, self.width, self.height),
+						data[start + record_size - 1])
+		return None
+
+	def close(self):
+		self.data.close()
+
+
+def write_book(path, width, height, entries):
+	"""
+	Write a book file from a mapping of canonical key to (move, depth).
+
+	The file is written next to its destination and moved into place, so
+	processes that still have the previous book mapped keep a valid view.
+	"""
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	key_size = symmetry.key_size(width, height)
+	tmp_path = path + ".tmp"
+	with open(tmp_path, "wb") as f:
+		f.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, width, height,
+								 key_size, len(entries)))
+		for key in sorted(entries):
+			move, depth = entries[key]
+			f.write(key)
+			f.write(symmetry.encode_location(move, width, height))
+			f.write(bytes((min(depth, 0xFF),)))
+	os.replace(tmp_path, path)
+	# later lookups in this process map the new file
+	_open_books.pop(path, None)
+
+
+# books opened by this process, shared between all OpeningBook instances
+_open_books = {}
+
+
+def open_book(width, height, book_dir=BOOK_DIR):
+	"""
+	Return the `BookFile` for a board geometry, or None if no book has been
+	built for it (yet: a missing book is looked for again on the next call).
+	"""
+	path = book_path(width, height, book_dir)
+	book = _open_books.get(path)
+	if book is None and os.path.exists(path):
+		book = _open_books[path] = BookFile(path)
+	return book
+
+
+def opening_positions(width, height, plies):
+	"""
+	Enumerate the distinct positions (up to board symmetry) that can arise
+	during the first `plies` plies of a game and still have a move to play.
+
+	Returns
+	----------
+	dict<bytes, list<(int, int)>>
+		A representative move sequence for every canonical position key.
+	"""
+	positions = {}
+	frontier = {Board("player1", "player2", width, height).canonical_key()[0]: []}
+	for _ in range(plies):
+		next_frontier = {}
+		for key, moves in frontier.items():
+			board = _replay(width, height, moves)
+			legal_moves = board.get_legal_moves()
+			if not legal_moves:
+				continue
+			positions[key] = moves
+			for move in legal_moves:
+				child_key, _ = board.forecast_move(move).canonical_key()
+				if child_key not in next_frontier:
+					next_frontier[child_key] = moves + [move]
+		frontier = next_frontier
+	return positions
+
+
+def _replay(width, height, moves, players=("player1", "player2")):
+	board = Board(players[0], players[1], width, height)
+	for move in moves:
+		board.apply_move(move)
+	return board
+
+
+def _search_position(job):
+	"""
+	Worker entry point: search one opening position to a fixed depth and
+	return its canonical key together with the best move in the canonical
+	frame.
+	"""
+	width, height, moves, depth = job
+	agent = CustomPlayer(search_depth=depth, score_fn=custom_score,
+						 iterative=False, method="alphabeta", symmetry_pruning=True)
+	agent.time_left = lambda: float("inf")
+	players = ["player1", "player2"]
+	players[len(moves) % 2] = agent
+	board = _replay(width, height, moves, players)
+
+	_, move = agent.alphabeta(board, depth)
+	if move is None or move == (-1, -1):
+		return None
+
+	key, sym = board.canonical_key()
+	index = symmetry.transforms(width, height)[sym][move[0] * width + move[1]]
+	return key, index, depth
+
+
+def build_book(width, height, plies, depth, workers=None, book_dir=BOOK_DIR):
+	"""
+	Build the opening book for one board size.
+
+	Parameters
+	----------
+	width, height : int
+		The board geometry.
+
+	plies : int
+		Number of plies from the start of the game covered by the book.
+
+	depth : int
+		Fixed alpha-beta search depth used for every book position.
+
+	workers : int (optional)
+		Number of worker processes; defaults to the number of CPUs.
+
+	book_dir : str (optional)
+		Directory the book file is written to.
+
+	Returns
+	----------
+	int
+		The number of positions stored in the book.
+	"""
+	positions = opening_positions(width, height, plies)
+	jobs = [(width, height, moves, depth) for moves in positions.values()]
+
+	entries = {}
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))
+		for result in executor.map(_search_position, jobs, chunksize=chunksize):
+			if result is not None:
+				key, move, searched = result
+				entries[key] = (move, searched)
+
+	write_book(book_path(width, height, book_dir), width, height, entries)
+	return len(entries)
+
+
 class OpeningBook(object):
 
-	def __init__(self):
+	def __init__(self, book_dir=BOOK_DIR):
+		self.book_dir = book_dir
+		# (move count after our last reflected reply, that reply, the cells
+		# of the position it answered), checked against every new game
+		self.reflection = None
 		self.load_rules()
 
 	def set_game(self, game):
@@ -18,37 +258,189 @@ class OpeningBook(object):
 		return None
 
 	def load_rules(self):
-		self.rules = ["occupy_center_square"]
+		self.rules = ["find_reflection_move", "lookup_book_move", "occupy_center_square"]
+
+	def lookup_book_move(self):
+		# book built offline for this board size, if any
+		book = open_book(self.game.width, self.game.height, self.book_dir)
+		if book is None:
+			return None
+		# search the book under the canonical form of the position
+		key, sym = self.game.canonical_key()
+		found = book.lookup(key)
+		if found is None or found[0] is None:
+			return None
+		# map the stored move back from the canonical frame
+		index = symmetry.inverses(self.game.width, self.game.height)[sym][found[0]]
+		book_move = divmod(index, self.game.width)
+		# check if is legal
+		if book_move in self.game.get_legal_moves():
+			return book_move
+
+		return None
 
 	def occupy_center_square(self):
 		# area of board
 		area = self.game.width * self.game.height
-		# available blank spaces indicating game state
-		blank_spaces = self.game.get_blank_spaces()
+		# number of available blank spaces indicating game state
+		blank_spaces = len(self.game.get_blank_spaces())
 		# check if the game is just starting
 		if (blank_spaces == area and self.game.is_player_one(self.player) or (blank_spaces == area - 1 and self.game.is_player_two(self.player))):
-			# center move
-			center_move = (int(self.game.width / 2), int(self.game.height / 2))
+			# center move as (row, column)
+			center_move = (int(self.game.height / 2), int(self.game.width / 2))
 			# check if is legal
 			if self.game.move_is_legal(center_move):
 				return center_move
 		
 		return None
 
-	# TODO: Buggy
 	def find_reflection_move(self):
-		# for now, only odd length and odd width board works
-		if self.game.width % 2 == 1 and self.game.height % 2 == 1 and self.game.is_player_one(self.player):
-			# fetch opponent's move
-			opponent_move = self.game.get_player_location(self.game.get_opponent(self.player))
-			# sanity check whether opponent move is valid
-			if not opponent_move:
-				return None
-			# find its reflection
-			reflected_move = (self.game.height - 1 - opponent_move[0], self.game.width - 1 - opponent_move[0])
-			# check if is legal
-			if reflected_move in self.game.get_legal_moves(self.player):
-				return reflected_move
-			
-		return None
-		
+		# only the second player can answer every move with its reflection
+		if not self.game.is_player_two(self.player):
+			return None
+		# fetch opponent's move
+		opponent_move = self.game.get_player_location(self.game.get_opponent(self.player))
+		# sanity check whether opponent move is valid
+		if not opponent_move:
+			return None
+		# find its reflection through the center of the board
+		reflected_move = self.reflect(opponent_move)
+		# the symmetry is broken if the opponent took the center cell, or if
+		# the position was not a mirror image before the opponent moved
+		cells = self.game.to_bytes()[STATE_HEADER.size:]
+		if (reflected_move == opponent_move or
+				not (self.continues_reflection(opponent_move, cells) or
+					 self.is_reflected_position(opponent_move))):
+			self.reflection = None
+			return None
+		# check if is legal
+		if reflected_move not in self.game.get_legal_moves(self.player):
+			self.reflection = None
+			return None
+
+		self.reflection = (self.game.move_count + 1, reflected_move, cells)
+		return reflected_move
+
+	def reflect(self, move):
+		return (self.game.height - 1 - move[0], self.game.width - 1 - move[1])
+
+	def continues_reflection(self, opponent_move, cells):
+		# shortcut for is_reflected_position(): the position follows our
+		# previous reflected reply by exactly one knight move of the
+		# opponent. The cells are compared too, since the state outlives the
+		# game it was played in (players are reused from game to game, and
+		# only see copies of the board): this is still linear in the cells,
+		# but one bytes comparison instead of a Python loop over them
+		if self.reflection is None:
+			return False
+		move_count, own_move, previous = self.reflection
+		if self.game.move_count != move_count + 1 or self.game.get_player_location(self.player) != own_move:
+			return False
+		if not is_knight_move(self.reflect(own_move), opponent_move):
+			return False
+		expected = bytearray(previous)
+		expected[own_move[0] * self.game.width + own_move[1]] = 2
+		expected[opponent_move[0] * self.game.width + opponent_move[1]] = 1
+		return expected == cells
+
+	def is_reflected_position(self, opponent_move):
+		# full check, used when no reflection has been played in this game
+		# yet: apart from the opponent's last move, the blocked cells must be
+		# symmetric and the opponent must have come from our mirror image
+		own_move = self.game.get_player_location(self.player)
+		if own_move is None:
+			if self.game.move_count != 1:
+				return False
+		elif not is_knight_move(self.reflect(own_move), opponent_move):
+			return False
+
+		for row in range(self.game.height):
+			for col in range(self.game.width):
+				cell = (row, col)
+				mirror = self.reflect(cell)
+				blocked = cell != opponent_move and not self.game.move_is_legal(cell)
+				mirror_blocked = mirror != opponent_move and not self.game.move_is_legal(mirror)
+				if blocked != mirror_blocked:
+					return False
+		return True
+
+
+def is_knight_move(start, end):
+	return sorted((abs(start[0] - end[0]), abs(start[1] - end[1]))) == [1, 2]
+
+
+def benchmark_reflection(width=8, height=8, games=20, time_limit=150):
+	"""
+	Measure the reflection strategy as a move source: play the second player
+	with a book-backed `CustomPlayer` against a random first player, and
+	report how often the reflected reply was played, its cost per move and
+	the search budget it saved.
+	"""
+	import timeit
+	from sample_players import RandomPlayer
+
+	book = OpeningBook()
+	reflected_moves = searched_moves = wins = 0
+	reflect_time = 0.
+	for _ in range(games):
+		agent = CustomPlayer(score_fn=custom_score, method="alphabeta", book=book)
+		game = Board(RandomPlayer(), agent, width, height)
+		book.reflection = None
+		while True:
+			legal_moves = game.get_legal_moves()
+			if not legal_moves:
+				wins += game.is_winner(agent)
+				break
+			if game.active_player is agent:
+				book.set_game(game)
+				start = timeit.default_timer()
+				move = book.find_reflection_move()
+				reflect_time += timeit.default_timer() - start
+				if move is None:
+					searched_moves += 1
+					start = 1000 * timeit.default_timer()
+					move = agent.get_move(game.copy(), legal_moves,
+										  lambda: time_limit - (1000 * timeit.default_timer() - start))
+				else:
+					reflected_moves += 1
+			else:
+				move = game.active_player.get_move(game, legal_moves, lambda: time_limit)
+			game.apply_move(move)
+
+	total = reflected_moves + searched_moves
+	print("{}x{}: second player won {} of {} games".format(width, height, wins, games))
+	print("reflected replies: {} of {} moves, {:.1f} us per lookup".format(
+		reflected_moves, total, 1e6 * reflect_time / max(1, total)))
+	print("search budget saved: {:.1f} s".format(reflected_moves * time_limit / 1000.))
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Build the isolation opening books.")
+	parser.add_argument("--sizes", nargs="+", default=["{}x{}".format(*size) for size in SUPPORTED_SIZES],
+						help="board sizes to build, as WIDTHxHEIGHT")
+	parser.add_argument("--plies", type=int, default=3,
+						help="number of plies from the start of the game covered by the book")
+	parser.add_argument("--depth", type=int, default=5,
+						help="alpha-beta search depth for every book position")
+	parser.add_argument("--workers", type=int, default=None,
+						help="number of worker processes (default: one per CPU)")
+	parser.add_argument("--book-dir", default=BOOK_DIR,
+						help="directory the books are written to")
+	parser.add_argument("--benchmark", action="store_true",
+						help="benchmark the reflection strategy instead of building books")
+	args = parser.parse_args()
+
+	if args.benchmark:
+		for size in args.sizes:
+			width, height = (int(n) for n in size.lower().split("x"))
+			benchmark_reflection(width, height)
+		return
+
+	for size in args.sizes:
+		width, height = (int(n) for n in size.lower().split("x"))
+		count = build_book(width, height, args.plies, args.depth, args.workers, args.book_dir)
+		print("{}: {} positions -> {}".format(size, count, book_path(width, height, args.book_dir)))
+
+
+if __name__ == "__main__":
+	main()
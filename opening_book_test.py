@@ -0,0 +1,141 @@
+"""
+Test cases for building and reading the opening book.
+"""
+import random
+import shutil
+import tempfile
+import unittest
+
+import isolation
+import opening_book
+import opening_suite
+
+from isolation import symmetry
+from sample_players import RandomPlayer
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.book_dir = tempfile.mkdtemp()
+        opening_book._open_books.clear()
+
+    def tearDown(self):
+        for book in opening_book._open_books.values():
+            if book is not None:
+                book.close()
+        opening_book._open_books.clear()
+        shutil.rmtree(self.book_dir)
+
+    def test_symmetric_positions_share_a_key(self):
+        """ Mirror images of a position have the same canonical key """
+        w, h = 5, 5
+        board = isolation.Board("p1", "p2", w, h)
+        board.apply_move((0, 1))
+        board.apply_move((2, 2))
+        mirror = isolation.Board("p1", "p2", w, h)
+        mirror.apply_move((1, 0))
+        mirror.apply_move((2, 2))
+        self.assertEqual(board.canonical_key()[0], mirror.canonical_key()[0])
+        self.assertEqual(len(isolation.Board("p1", "p2", w, h).unique_moves()), 6)
+        self.assertEqual(len(symmetry.transforms(w, h)), 8)
+        self.assertEqual(len(symmetry.transforms(w, h + 1)), 4)
+
+    def test_occupy_center_square(self):
+        """ The center rule fires on the first move of each player """
+        book = opening_book.OpeningBook(self.book_dir)
+        book.set_current_player("p1")
+        board = isolation.Board("p1", "p2", 7, 5)
+        self.assertEqual(book.move_for(board), (2, 3))
+
+    def test_build_and_lookup(self):
+        """ Every book position is found and returns a legal move """
+        w, h = 5, 5
+        count = opening_book.build_book(w, h, plies=2, depth=2, workers=1,
+                                        book_dir=self.book_dir)
+        positions = opening_book.opening_positions(w, h, 2)
+        self.assertEqual(count, len(positions))
+
+        book = opening_book.OpeningBook(self.book_dir)
+        for moves in positions.values():
+            board = isolation.Board("p1", "p2", w, h)
+            for move in moves:
+                board.apply_move(move)
+            book.set_game(board)
+            self.assertIn(book.lookup_book_move(), board.get_legal_moves())
+
+        # a rotated position is answered with the rotated book move
+        board = isolation.Board("p1", "p2", w, h)
+        board.apply_move((0, 1))
+        rotated = isolation.Board("p1", "p2", w, h)
+        rotated.apply_move((1, 4))
+        book.set_game(board)
+        move = book.lookup_book_move()
+        book.set_game(rotated)
+        self.assertEqual(book.lookup_book_move(), (move[1], h - 1 - move[0]))
+
+    def test_book_built_after_a_miss(self):
+        """ A book written after a failed lookup is found by the next one """
+        book = opening_book.OpeningBook(self.book_dir)
+        board = isolation.Board("p1", "p2", 5, 5)
+        book.set_game(board)
+        self.assertIsNone(book.lookup_book_move())
+        opening_book.build_book(5, 5, plies=2, depth=2, workers=1, book_dir=self.book_dir)
+        self.assertIn(book.lookup_book_move(), board.get_legal_moves())
+
+    def test_reflection_wins_as_second_player(self):
+        """ Reflecting every move wins on a board without a center cell """
+        random.seed(0)
+        for _ in range(5):
+            book = opening_book.OpeningBook(self.book_dir)
+            book.set_current_player("p2")
+            board = isolation.Board(RandomPlayer(), "p2", 6, 6)
+            while board.get_legal_moves():
+                if board.active_player == "p2":
+                    opponent = board.get_player_location(board.inactive_player)
+                    move = book.move_for(board)
+                    self.assertEqual(move, (5 - opponent[0], 5 - opponent[1]))
+                else:
+                    move = board.active_player.get_move(board, board.get_legal_moves(), None)
+                board.apply_move(move)
+            self.assertTrue(board.is_winner("p2"))
+
+    def test_reflection_state_of_a_previous_game(self):
+        """ The reflection played in one game is not continued in the next """
+        book = opening_book.OpeningBook(self.book_dir)
+        book.set_current_player("p2")
+        board = isolation.Board("p1", "p2", 6, 6)
+        board.apply_move((0, 0))
+        self.assertEqual(book.move_for(board), (5, 5))
+
+        # same move count, own location and opponent knight move as a
+        # continued reflection, but not a mirror image position
+        board = isolation.Board("p1", "p2", 6, 6)
+        for move in [(3, 3), (5, 5), (1, 2)]:
+            board.apply_move(move)
+        book.set_game(board)
+        self.assertIsNone(book.find_reflection_move())
+
+    def test_reflection_falls_back_on_center(self):
+        """ No reflection is offered once the center cell is taken """
+        book = opening_book.OpeningBook(self.book_dir)
+        book.set_current_player("p2")
+        board = isolation.Board("p1", "p2", 5, 5)
+        board.apply_move((2, 2))
+        book.set_game(board)
+        self.assertIsNone(book.find_reflection_move())
+
+    def test_opening_suite(self):
+        """ Suite openings are distinct up to symmetry and survive a round trip """
+        openings = opening_suite.generate_suite(5, 5, balance_depth=1)
+        keys = {opening_book._replay(5, 5, moves).canonical_key()[0] for moves in openings}
+        self.assertEqual(len(keys), len(openings))
+        self.assertTrue(all(len(moves) == 2 for moves in openings))
+
+        path = self.book_dir + "/suite.txt"
+        opening_suite.write_suite(path, openings, "5x5")
+        self.assertEqual(opening_suite.load_suite(path), openings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Generate a fixed suite of tournament openings.
+
+`tournament.play_match` starts every game pair from an opening of two plies.
+Drawing those at random makes two runs play different openings, and most of
+them are mirror images of each other. This script enumerates the distinct
+openings up to board symmetry (see `Board.canonical_key`) instead, and writes
+them to a file that `tournament.py --openings` plays through in order.
+
+Openings can be balanced with a shallow search: each position is scored for
+the player to move with a fixed-depth alpha-beta search, decided positions
+are dropped, and the rest are ordered from the most to the least balanced so
+that `--count` keeps the fairest ones.
+
+The suite file holds one opening per line, as space separated "row,col"
+moves; lines starting with "#" are comments.
+"""
+import argparse
+
+from isolation import Board
+from opening_book import opening_positions
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+SUITE_PLIES = 2
+
+
+def score_opening(width, height, moves, depth):
+    """
+    Return the score of an opening for the player to move, from a fixed-depth
+    alpha-beta search with the "improved" heuristic.
+    """
+    agent = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False,
+                         method="alphabeta")
+    agent.time_left = lambda: float("inf")
+    players = ["player1", "player2"]
+    players[len(moves) % 2] = agent
+    board = Board(players[0], players[1], width, height)
+    for move in moves:
+        board.apply_move(move)
+    score, _ = agent.alphabeta(board, depth)
+    return score
+
+
+def generate_suite(width=7, height=7, plies=SUITE_PLIES, balance_depth=0, count=None):
+    """
+    Enumerate the distinct openings of `plies` plies up to board symmetry.
+
+    Parameters
+    ----------
+    width, height : int
+        The board geometry.
+
+    plies : int
+        Length of every opening.
+
+    balance_depth : int (optional)
+        When positive, score every opening with a search of this depth,
+        drop the decided ones and order the rest by how balanced they are.
+
+    count : int (optional)
+        Keep at most this many openings.
+
+    Returns
+    ----------
+    list<list<(int, int)>>
+        The move sequences of the openings.
+    """
+    # positions with a move left after `plies` plies are those from which
+    # the enumeration one ply further continued
+    openings = [moves for moves in opening_positions(width, height, plies + 1).values()
+                if len(moves) == plies]
+    if balance_depth > 0:
+        scores = [score_opening(width, height, moves, balance_depth) for moves in openings]
+        ranked = sorted((abs(score), index) for index, score in enumerate(scores)
+                        if abs(score) != float("inf"))
+        openings = [openings[index] for _, index in ranked]
+    return openings[:count]
+
+
+def write_suite(path, openings, comment=None):
+    with open(path, "w") as f:
+        if comment:
+            f.write("# {}\n".format(comment))
+        for moves in openings:
+            f.write(" ".join("{},{}".format(*move) for move in moves) + "\n")
+
+
+def load_suite(path):
+    """ Read the openings of a suite file written by `write_suite()`. """
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                openings.append([tuple(int(x) for x in move.split(","))
+                                 for move in line.split()])
+    return openings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a symmetry-deduplicated opening suite.")
+    parser.add_argument("path", help="the suite file to write")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--plies", type=int, default=SUITE_PLIES,
+                        help="length of the openings (default: %(default)s)")
+    parser.add_argument("--balance-depth", type=int, default=0,
+                        help="order the openings by the score of a search of this depth, "
+                             "most balanced first (default: no search)")
+    parser.add_argument("--count", type=int, default=None,
+                        help="keep at most this many openings (default: all)")
+    args = parser.parse_args()
+
+    openings = generate_suite(args.width, args.height, args.plies, args.balance_depth, args.count)
+    write_suite(args.path, openings, "{}x{}, {} plies, balance depth {}".format(
+        args.width, args.height, args.plies, args.balance_depth))
+    print("{} openings written to {}".format(len(openings), args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Perft: count the nodes of the full game tree to a fixed depth.
+
+`perft(board, depth)` is the number of move sequences of exactly `depth`
+plies that can be played from a position (a position without legal moves
+ends its branches early, and they are not counted). The counts only depend
+on the rules, so they validate a move generator: a faster backend must give
+the same counts, and `validate()` compares the moves it generates with the
+reference `Board.__get_moves__` at every node of the tree. Timing perft is
+also a pure measure of move-generation throughput.
+
+Run this file to print the perft counts (optionally divided per root move)
+and the nodes per second of a generator.
+"""
+import argparse
+import time
+
+from isolation import Board
+from isolation import CompactBoard
+
+
+def reference_moves(board):
+    """ The moves of the active player from the reference generator. """
+    return board.__get_moves__(board.__last_player_move__[board.active_player])
+
+
+def iter_moves(board):
+    """ The moves of the active player from `Board.iter_legal_moves()`. """
+    return board.iter_legal_moves()
+
+
+GENERATORS = {
+    "reference": reference_moves,
+    "iter": iter_moves,
+}
+
+# perft counts from the empty board, by (width, height), for depths 0, 1, ...
+PERFT_TABLE = {
+    (3, 3): [1, 9, 72, 112, 160, 128, 96, 64, 32, 0],
+    (4, 4): [1, 16, 240, 672, 1792, 3456, 6416, 10560, 16384, 22912, 28640],
+    (5, 5): [1, 25, 600, 2208, 7712, 24160, 73248, 190528, 475040],
+    (5, 7): [1, 35, 1190, 5016, 20368, 76320, 277584],
+    (6, 6): [1, 36, 1260, 5440, 22624, 88000, 332336, 1171840],
+    (7, 7): [1, 49, 2352, 11280, 52672, 232416, 999456],
+    (8, 8): [1, 64, 4032, 20832, 105536, 506176],
+    (9, 9): [1, 81, 6480, 35392, 190432, 968416],
+}
+
+
+def perft(board, depth, generator=iter_moves, memo=None):
+    """
+    Count the move sequences of `depth` plies from a position.
+
+    Parameters
+    ----------
+    board : isolation.Board
+        The starting position.
+
+    depth : int
+        The number of plies.
+
+    generator : callable (optional)
+        Function returning the moves of the active player of a board.
+
+    memo : dict (optional)
+        Cache of counts by (canonical position key, depth). Positions that
+        are equivalent under a board symmetry have the same counts, so with
+        a memo every class of transpositions and mirror images is only
+        counted once.
+
+    Returns
+    ----------
+    int
+    """
+    if depth == 0:
+        return 1
+    if memo is not None:
+        key = (board.canonical_key()[0], depth)
+        if key in memo:
+            return memo[key]
+
+    if depth == 1:
+        count = sum(1 for _ in generator(board))
+    else:
+        count = sum(perft(board.forecast_move(move), depth - 1, generator, memo)
+                    for move in generator(board))
+
+    if memo is not None:
+        memo[key] = count
+    return count
+
+
+def divide(board, depth, generator=iter_moves, memo=None):
+    """
+    Return {move: perft count of the rest of the tree} for every root move,
+    to locate the branch where two generators disagree.
+    """
+    return {move: perft(board.forecast_move(move), depth - 1, generator, memo)
+            for move in generator(board)}
+
+
+def validate(board, depth, generator=iter_moves):
+    """
+    Compare the moves of `generator` with the reference generator at every
+    node of the tree to `depth` plies.
+
+    Returns
+    ----------
+    int
+        The perft count of the tree.
+
+    Raises
+    ----------
+    AssertionError
+        With the position and both move lists at the first node where the
+        generators disagree.
+    """
+    expected = reference_moves(board)
+    actual = list(generator(board))
+    if actual != expected:
+        raise AssertionError("move generators disagree on\n{}reference: {}\n{}: {}".format(
+            board.to_string(), expected, getattr(generator, "__name__", generator), actual))
+    if depth == 0:
+        return 1
+    return sum(validate(board.forecast_move(move), depth - 1, generator) for move in expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count the isolation game tree to a depth.")
+    parser.add_argument("--width", type=int, default=7)
+    parser.add_argument("--height", type=int, default=7)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--moves", nargs="*", default=[], metavar="ROW,COL",
+                        help="moves to play from the empty board first")
+    parser.add_argument("--generator", choices=sorted(GENERATORS), default="iter")
+    parser.add_argument("--compact", action="store_true",
+                        help="count on an isolation.CompactBoard instead of a Board")
+    parser.add_argument("--memo", action="store_true",
+                        help="count every position once up to symmetry")
+    parser.add_argument("--divide", action="store_true",
+                        help="print the count under every root move")
+    parser.add_argument("--validate", action="store_true",
+                        help="check the generator against the reference at every node")
+    args = parser.parse_args()
+
+    board = (CompactBoard if args.compact else Board)("player1", "player2", args.width, args.height)
+    for move in args.moves:
+        board.apply_move(tuple(int(x) for x in move.split(",")))
+    generator = GENERATORS[args.generator]
+
+    start = time.perf_counter()
+    if args.validate:
+        count = validate(board, args.depth, generator)
+    elif args.divide:
+        counts = divide(board, args.depth, generator, {} if args.memo else None)
+        for move, move_count in counts.items():
+            print("  {}: {}".format(move, move_count))
+        count = sum(counts.values())
+    else:
+        count = perft(board, args.depth, generator, {} if args.memo else None)
+    elapsed = time.perf_counter() - start
+
+    print("perft({}) = {} in {:.2f}s ({:.0f} leaves/s)".format(
+        args.depth, count, elapsed, count / elapsed if elapsed else 0.))
+    expected = PERFT_TABLE.get((args.width, args.height), [])
+    if not args.moves and args.depth < len(expected) and expected[args.depth] != count:
+        print("MISMATCH: expected {}".format(expected[args.depth]))
+
+
+if __name__ == "__main__":
+    main()
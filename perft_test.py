@@ -0,0 +1,45 @@
+"""
+Test cases for the move generators, checked against the stored perft table.
+"""
+import random
+import unittest
+
+import isolation
+import perft
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_perft_table(self):
+        """ The fast generator reproduces the stored perft counts """
+        for (width, height), counts in perft.PERFT_TABLE.items():
+            memo = {}
+            for depth, count in enumerate(counts[:5]):
+                board = isolation.Board("p1", "p2", width, height)
+                self.assertEqual(perft.perft(board, depth, perft.iter_moves, memo), count,
+                                 "perft({}) on {}x{}".format(depth, width, height))
+
+    def test_memo_and_divide(self):
+        """ Memoized and divided counts agree with the plain count """
+        board = isolation.Board("p1", "p2", 5, 5)
+        board.apply_move((0, 1))
+        board.apply_move((2, 2))
+        count = perft.perft(board, 4, perft.reference_moves)
+        self.assertEqual(perft.perft(board, 4, perft.iter_moves, {}), count)
+        self.assertEqual(sum(perft.divide(board, 4, memo={}).values()), count)
+
+    def test_validate_mid_game(self):
+        """ Both generators agree at every node below random positions """
+        rng = random.Random(0)
+        for size in (5, 8, 11):
+            board = isolation.Board("p1", "p2", size, size)
+            for _ in range(size * size // 3):
+                moves = board.get_legal_moves()
+                if not moves:
+                    break
+                board.apply_move(rng.choice(moves))
+            perft.validate(board, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+"""
+Per-agent profiles of the moves played with `Board.play`.
+
+A `MoveProfiler` passed to `Board.play` (or to `tournament.play_match`)
+runs the `get_move` call of every player under a profiler of its own for
+that agent and game phase, the phase being given by the share of the cells
+already occupied (see `PHASES`). Two profilers are available:
+
+- "cprofile" uses `cProfile`: exact call counts and times of every
+  function, saved as `.pstats` files (read them with `pstats`, snakeviz...);
+- "sample" uses a thread that records the call stack of the searching
+  thread every `interval` seconds, saved as collapsed stacks
+  ("frame;frame;frame count" lines) for flame graph tools.
+
+The profiler runs inside the move, so its overhead is charged to the
+time limit of the player (cProfile makes a search roughly twice slower);
+use a node budget for profiles that are comparable with normal play.
+
+`dump(directory)` writes the profiles of this process to per-process files,
+and `merge(directory)` sums the files of all processes into one profile per
+agent and phase plus one per agent. Run this file on a directory to merge
+it and print the functions that take the most time for every agent.
+"""
+import argparse
+import collections
+import cProfile
+import glob
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+
+MODES = ("cprofile", "sample")
+SAMPLE_INTERVAL = 0.001  # seconds between two stack samples
+
+# (share of the cells occupied below which the phase applies, phase name)
+PHASES = ((0.2, "opening"), (0.5, "midgame"), (1.0, "endgame"))
+
+PROCESS_FILE = re.compile(r"^(?P<agent>.+)-(?P<phase>{})\.(?P<pid>\d+)\.(?P<ext>pstats|collapsed)$"
+                          .format("|".join(name for _, name in PHASES)))
+
+
+def game_phase(game):
+    """ Return the name of the phase of a game from its move count. """
+    occupied = game.move_count / float(game.width * game.height)
+    for limit, name in PHASES:
+        if occupied < limit:
+            return name
+    return PHASES[-1][1]
+
+
+def _file_name(name):
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+def _frame_name(code):
+    return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+
+class MoveProfiler(object):
+    """
+    Profiles of the moves of every agent, by (agent name, game phase).
+
+    Parameters
+    ----------
+    mode : str (optional)
+        "cprofile" or "sample" (see the module documentation).
+
+    interval : float (optional)
+        Seconds between two samples of the stack in "sample" mode.
+
+    names : dict (optional)
+        Name of the profiles of each player object; other players are named
+        after their class.
+    """
+
+    def __init__(self, mode="cprofile", interval=SAMPLE_INTERVAL, names=None):
+        if mode not in MODES:
+            raise ValueError("unknown profiler mode: {}".format(mode))
+        self.mode = mode
+        self.interval = interval
+        self.names = names if names is not None else {}
+        # (agent, phase) -> cProfile.Profile or Counter of collapsed stacks
+        self.profiles = {}
+        # (thread id, root frame, Counter) of the move being sampled
+        self.target = None
+        self.sampler = None
+
+    def name_of(self, player):
+        return self.names.get(player, type(player).__name__)
+
+    def wrap(self, player, game):
+        """
+        Return the `get_move` of `player` running under the profile of its
+        agent for the phase of `game`.
+        """
+        key = (self.name_of(player), game_phase(game))
+        if self.mode == "cprofile":
+            if key not in self.profiles:
+                self.profiles[key] = cProfile.Profile()
+            profile = self.profiles[key]
+
+            def get_move(*args):
+                profile.enable()
+                try:
+                    return player.get_move(*args)
+                finally:
+                    profile.disable()
+            return get_move
+
+        samples = self.profiles.setdefault(key, collections.Counter())
+        self.start_sampler()
+
+        def get_move(*args):
+            self.target = (threading.get_ident(), sys._getframe(), samples)
+            try:
+                return player.get_move(*args)
+            finally:
+                self.target = None
+        return get_move
+
+    def start_sampler(self):
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self._sample, daemon=True)
+            self.sampler.start()
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            target = self.target
+            if target is None:
+                continue
+            thread_id, root, samples = target
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None and frame is not root:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if frame is root:
+                samples[";".join(reversed(stack))] += 1
+
+    def dump(self, directory):
+        """
+        Write the profiles of this process to `directory`, one file per
+        agent and phase, replacing those of an earlier call.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for (agent, phase), profile in self.profiles.items():
+            base = os.path.join(directory, "{}-{}.{}".format(_file_name(agent), phase, os.getpid()))
+            if self.mode == "cprofile":
+                profile.create_stats()
+                if profile.stats:
+                    pstats.Stats(profile).dump_stats(base + ".pstats")
+            else:
+                write_collapsed(base + ".collapsed", profile)
+
+
+def read_collapsed(path):
+    samples = collections.Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                samples[stack] += int(count)
+    return samples
+
+
+def write_collapsed(path, samples):
+    with open(path, "w") as f:
+        for stack, count in sorted(samples.items()):
+            f.write("{} {}\n".format(stack, count))
+
+
+def merge(directory):
+    """
+    Merge the per-process files written by `MoveProfiler.dump` into
+    "<agent>-<phase>.<ext>" and "<agent>.<ext>" files (`ext` being pstats or
+    collapsed).
+
+    Returns
+    ----------
+    list<str>
+        The paths of the merged files.
+    """
+    groups = collections.defaultdict(list)
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        match = PROCESS_FILE.match(os.path.basename(path))
+        if match:
+            agent, phase, ext = match.group("agent", "phase", "ext")
+            groups[(agent + "-" + phase, ext)].append(path)
+            groups[(agent, ext)].append(path)
+
+    written = []
+    for (name, ext), paths in sorted(groups.items()):
+        path = os.path.join(directory, "{}.{}".format(name, ext))
+        if ext == "pstats":
+            pstats.Stats(*paths).dump_stats(path)
+        else:
+            samples = collections.Counter()
+            for source in paths:
+                samples.update(read_collapsed(source))
+            write_collapsed(path, samples)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge and summarize the move profiles in a "
+                                                 "directory written by tournament.py --profile.")
+    parser.add_argument("directory")
+    parser.add_argument("--top", type=int, default=15,
+                        help="functions printed for every agent (default: %(default)s)")
+    parser.add_argument("--sort", default="tottime",
+                        help="pstats sort key (default: %(default)s)")
+    args = parser.parse_args()
+
+    for path in merge(args.directory):
+        name = os.path.basename(path)
+        if os.path.splitext(name)[0].endswith(tuple("-" + phase for _, phase in PHASES)):
+            # only print the profile of the whole game
+            continue
+        print("=" * 70)
+        print(name)
+        if name.endswith(".pstats"):
+            pstats.Stats(path).sort_stats(args.sort).print_stats(args.top)
+        else:
+            samples = read_collapsed(path)
+            leaves = collections.Counter()
+            for stack, count in samples.items():
+                leaves[stack.rpartition(";")[2]] += count
+            total = sum(samples.values())
+            for frame, count in leaves.most_common(args.top):
+                print("{:>7.1%}  {}".format(count / float(total), frame))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Test cases for the per-agent move profiles.
+"""
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+import isolation
+import profiling
+
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+
+class MoveProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self, mode):
+        player = CustomPlayer(search_depth=3, score_fn=improved_score, iterative=False,
+                              method="alphabeta")
+        profiler = profiling.MoveProfiler(mode, interval=0.0002, names={player: "AB"})
+        board = isolation.Board(player, RandomPlayer())
+        board.apply_move((2, 3))
+        board.apply_move((4, 3))
+        board.play(time_limit=1000, profiler=profiler)
+        profiler.dump(self.directory)
+        return profiling.merge(self.directory)
+
+    def test_cprofile_per_agent_and_phase(self):
+        """ Profiles are kept per agent and phase and merged per agent """
+        merged = [os.path.basename(path) for path in self.play("cprofile")]
+        self.assertIn("AB.pstats", merged)
+        self.assertIn("AB-opening.pstats", merged)
+        self.assertIn("RandomPlayer.pstats", merged)
+        functions = pstats.Stats(os.path.join(self.directory, "AB.pstats")).stats
+        self.assertTrue(any(name == "alphabeta" for _, _, name in functions))
+
+    def test_sampled_collapsed_stacks(self):
+        """ Sampled stacks start at the get_move of the agent """
+        self.play("sample")
+        samples = profiling.read_collapsed(os.path.join(self.directory, "AB.collapsed"))
+        self.assertTrue(samples)
+        self.assertTrue(all(stack.startswith("game_agent.py:get_move") for stack in samples))
+
+
+if __name__ == '__main__':
+    unittest.main()
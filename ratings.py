@@ -0,0 +1,195 @@
+"""
+Incremental Bradley-Terry (Elo) ratings over a stream of game results.
+
+Every agent has a rating such that the probability of agent i beating agent j
+is 1 / (1 + 10^((r_j - r_i) / 400)). Ratings are the maximum-likelihood
+estimate of this model given all recorded games, regularized by a few virtual
+drawn games against an anchor rated 0 so that undefeated (or winless) agents
+keep finite ratings.
+
+Results are kept as sparse per-pair counts, and each new result only refines
+the ratings of the two agents involved with one Newton step each. Because
+each step only touches the opponents an agent has actually played, the table
+stays cheap with thousands of agents; `refit()` runs full sweeps to converge
+every rating after a batch of results. Confidence intervals come from the
+curvature (Fisher information) of the likelihood at each rating.
+"""
+import json
+import math
+
+# conversion between natural log-odds units and Elo points
+ELO_PER_UNIT = 400. / math.log(10.)
+
+# number of virtual games drawn against an anchor rated 0
+PRIOR_GAMES = 2.
+
+
+class RatingTable(object):
+    """
+    Maximum-likelihood ratings for any number of agents.
+
+    Parameters
+    ----------
+    prior_games : float (optional)
+        Weight of the virtual draws against the anchor that regularize every
+        rating towards 0.
+    """
+
+    def __init__(self, prior_games=PRIOR_GAMES):
+        self.prior_games = prior_games
+        # name -> rating in natural units
+        self.theta = {}
+        # name -> {opponent name: [wins, games]}
+        self.results = {}
+
+    def __len__(self):
+        return len(self.theta)
+
+    def add_agent(self, name):
+        if name not in self.theta:
+            self.theta[name] = 0.
+            self.results[name] = {}
+
+    def add_result(self, winner, loser, count=1):
+        """
+        Record `count` games won by `winner` against `loser` and update both
+        ratings incrementally.
+        """
+        self.add_agent(winner)
+        self.add_agent(loser)
+        pair = self.results[winner].setdefault(loser, [0, 0])
+        pair[0] += count
+        pair[1] += count
+        pair = self.results[loser].setdefault(winner, [0, 0])
+        pair[1] += count
+        self._step(winner)
+        self._step(loser)
+
+    def refit(self, iterations=50, tolerance=1e-6):
+        """
+        Run full Newton sweeps over all agents until no rating moves by more
+        than `tolerance` (natural units) or `iterations` sweeps are done.
+        """
+        for _ in range(iterations):
+            change = 0.
+            for name in self.theta:
+                change = max(change, abs(self._step(name)))
+            change = max(change, abs(self._shift()))
+            if change < tolerance:
+                break
+
+    def rating(self, name):
+        """ Return the rating of an agent in Elo points. """
+        return ELO_PER_UNIT * self.theta[name]
+
+    def stderr(self, name):
+        """ Return the standard error of the rating of an agent, in Elo. """
+        return ELO_PER_UNIT / math.sqrt(self._gradient(name)[1])
+
+    def interval(self, name, z=1.96):
+        """ Return the (low, high) confidence interval of a rating in Elo. """
+        rating, error = self.rating(name), self.stderr(name)
+        return rating - z * error, rating + z * error
+
+    def games(self, name):
+        return sum(games for _, games in self.results[name].values())
+
+    def next_pairing(self):
+        """
+        Pick the next pair of agents to play: the agent whose rating is most
+        uncertain, against the opponent that maximizes the expected
+        information of one game, p(1 - p) weighted by the uncertainty of both
+        ratings.
+
+        Returns
+        ----------
+        (str, str) or None
+            The names of the two agents, or None with fewer than two agents.
+        """
+        if len(self.theta) < 2:
+            return None
+        variance = {name: 1. / self._gradient(name)[1] for name in self.theta}
+        first = max(variance, key=variance.get)
+        theta = self.theta[first]
+
+        def information(name):
+            p = _win_probability(theta, self.theta[name])
+            return p * (1. - p) * (variance[first] + variance[name])
+
+        second = max((name for name in self.theta if name != first), key=information)
+        return first, second
+
+    def leaderboard(self):
+        """
+        Return (name, rating, low, high, games) for every agent, best first.
+        """
+        rows = []
+        for name in self.theta:
+            low, high = self.interval(name)
+            rows.append((name, self.rating(name), low, high, self.games(name)))
+        rows.sort(key=lambda row: -row[1])
+        return rows
+
+    def save(self, path):
+        """ Write the recorded results (not the ratings) as JSON. """
+        with open(path, "w") as f:
+            json.dump({"prior_games": self.prior_games,
+                       "results": {name: {opponent: wins for opponent, (wins, _) in opponents.items() if wins}
+                                   for name, opponents in self.results.items()}}, f)
+
+    @classmethod
+    def load(cls, path):
+        """ Rebuild a table from a file written by `save()`. """
+        with open(path) as f:
+            data = json.load(f)
+        table = cls(data["prior_games"])
+        for winner, opponents in data["results"].items():
+            table.add_agent(winner)
+            for loser, wins in opponents.items():
+                table.add_agent(loser)
+                table.results[winner].setdefault(loser, [0, 0])[0] += wins
+                table.results[winner][loser][1] += wins
+                table.results[loser].setdefault(winner, [0, 0])[1] += wins
+        table.refit()
+        return table
+
+    def _gradient(self, name):
+        """
+        Return the first and (negated) second derivatives of the regularized
+        log-likelihood with respect to the rating of `name`.
+        """
+        theta = self.theta[name]
+        p = _win_probability(theta, 0.)
+        gradient = self.prior_games * (0.5 - p)
+        curvature = self.prior_games * p * (1. - p)
+        for opponent, (wins, games) in self.results[name].items():
+            p = _win_probability(theta, self.theta[opponent])
+            gradient += wins - games * p
+            curvature += games * p * (1. - p)
+        return gradient, curvature
+
+    def _step(self, name):
+        gradient, curvature = self._gradient(name)
+        # damped so a single lopsided result cannot throw a rating far off
+        step = max(-1., min(1., gradient / curvature))
+        self.theta[name] += step
+        return step
+
+    def _shift(self):
+        # only the prior pins the common offset of all ratings, so steps on
+        # single ratings barely move it: take a Newton step on it as a whole
+        gradient = curvature = 0.
+        for theta in self.theta.values():
+            p = _win_probability(theta, 0.)
+            gradient += self.prior_games * (0.5 - p)
+            curvature += self.prior_games * p * (1. - p)
+        if not curvature:
+            return 0.
+        step = max(-1., min(1., gradient / curvature))
+        for name in self.theta:
+            self.theta[name] += step
+        return step
+
+
+def _win_probability(theta_1, theta_2):
+    return 1. / (1. + math.exp(theta_2 - theta_1))
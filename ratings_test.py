@@ -0,0 +1,84 @@
+"""
+Test cases for the incremental Bradley-Terry ratings.
+"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from ratings import RatingTable
+from sprt import elo_to_score
+
+TRUE_RATINGS = {"A": -150., "B": -50., "C": 50., "D": 150.}
+
+
+def centered(table):
+    """ Return the ratings of `table` relative to their mean. """
+    mean = sum(table.rating(name) for name in TRUE_RATINGS) / len(TRUE_RATINGS)
+    return {name: table.rating(name) - mean for name in TRUE_RATINGS}
+
+
+class RatingTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def play(self, table, games, rng):
+        names = sorted(TRUE_RATINGS)
+        for _ in range(games):
+            first, second = rng.sample(names, 2)
+            if rng.random() < elo_to_score(TRUE_RATINGS[first] - TRUE_RATINGS[second]):
+                table.add_result(first, second)
+            else:
+                table.add_result(second, first)
+
+    def test_recovers_known_ratings(self):
+        """ Ratings generated from known strengths fall in their intervals """
+        table = RatingTable()
+        self.play(table, 4000, random.Random(0))
+        incremental = centered(table)
+        table.refit()
+        for name, rating in TRUE_RATINGS.items():
+            low, high = table.interval(name)
+            self.assertTrue(low <= rating <= high, (name, rating, low, high))
+        # the incremental updates already order the agents as the converged
+        # fit does, up to the common offset only pinned by the prior
+        for name, rating in centered(table).items():
+            self.assertAlmostEqual(incremental[name], rating, delta=table.stderr(name))
+        names = [row[0] for row in table.leaderboard()]
+        self.assertEqual(names, ["D", "C", "B", "A"])
+
+    def test_next_pairing(self):
+        """ The agent with the widest interval plays next """
+        table = RatingTable()
+        self.play(table, 400, random.Random(1))
+        table.add_result("E", "A")
+        first, second = table.next_pairing()
+        widths = {name: high - low for name, _, low, high, _ in table.leaderboard()}
+        self.assertEqual(first, "E")
+        self.assertEqual(first, max(widths, key=widths.get))
+        self.assertNotEqual(second, first)
+        self.assertIsNone(RatingTable().next_pairing())
+
+    def test_save_and_load(self):
+        """ A saved table loads with the same results and ratings """
+        table = RatingTable(prior_games=1.)
+        self.play(table, 300, random.Random(2))
+        table.refit()
+        path = os.path.join(self.directory, "ratings.json")
+        table.save(path)
+
+        loaded = RatingTable.load(path)
+        self.assertEqual(loaded.prior_games, 1.)
+        self.assertEqual(loaded.results, table.results)
+        for name in TRUE_RATINGS:
+            self.assertAlmostEqual(loaded.rating(name), table.rating(name), places=3)
+            self.assertAlmostEqual(loaded.stderr(name), table.stderr(name), places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Test cases for the binary game record format.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import isolation
+
+from isolation import records
+from sample_players import RandomPlayer
+
+
+class RecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def play_games(self, count):
+        random.seed(0)
+        games = []
+        for _ in range(count):
+            player1, player2 = RandomPlayer(), RandomPlayer()
+            board = isolation.Board(player1, player2, 5, 7)
+            winner, move_history, termination = board.play()
+            moves = records.flatten_history(move_history)
+            record = records.make_record(5, 7, moves, 1 if winner is player1 else 2, termination)
+            records.append_record(self.path, record)
+            games.append((board, winner, move_history, termination, record))
+        return games
+
+    def test_round_trip_and_replay(self):
+        """ Appended games are read back and replay to the final position """
+        games = self.play_games(3)
+        read = list(records.read_records(self.path))
+        self.assertEqual(read, [game[-1] for game in games])
+        for (board, _, _, _, record) in games:
+            *_, (plies, cells, locations) = records.replay(record)
+            self.assertEqual(plies, board.move_count)
+            for player, location in zip((board.__player_1__, board.__player_2__), locations):
+                self.assertEqual(divmod(location, 5), board.get_player_location(player))
+            self.assertEqual(cells.count(0), len(board.get_blank_spaces()))
+
+    def test_text_matches_game_as_text(self):
+        """ Records render like the move history they were made from """
+        board, winner, move_history, termination, record = self.play_games(1)[0]
+        record = record._replace(winner="player")
+        expected = isolation.game_as_text("player", move_history, termination,
+                                          isolation.Board(1, 2, 5, 7))
+        self.assertEqual("".join(records.iter_record_text(record)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
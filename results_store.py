@@ -0,0 +1,175 @@
+"""
+Persistent store for tournament results.
+
+Every completed game is written to a local SQLite database as soon as it
+finishes, so an interrupted tournament loses at most the games in progress.
+Games are grouped by a match key chosen by the tournament (one match is the
+pair of games played from the same opening); a resumed tournament looks its
+matches up by key and only plays the games that are missing.
+
+Aggregates (wins per agent and opponent, termination reasons) are computed by
+SQL over the stored records and never replay a game.
+
+Run this file with the path of a database to print a summary of its results.
+"""
+import json
+import sqlite3
+import sys
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    match_key TEXT,
+    game_index INTEGER NOT NULL,
+    player_1 TEXT NOT NULL,
+    player_2 TEXT NOT NULL,
+    winner TEXT,
+    termination TEXT,
+    seed INTEGER,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    opening TEXT NOT NULL,
+    move_history TEXT NOT NULL,
+    move_times TEXT NOT NULL,
+    time_limit REAL,
+    node_budget INTEGER,
+    finished REAL NOT NULL,
+    UNIQUE (match_key, game_index)
+);
+CREATE INDEX IF NOT EXISTS games_players ON games (player_1, player_2);
+"""
+
+
+class ResultsStore(object):
+    """
+    SQLite-backed store of game records. Several processes may write to the
+    same database; each game is committed on its own.
+
+    Parameters
+    ----------
+    path : str
+        Location of the database file; it is created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60.)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def record_game(self, match_key, game_index, player_1, player_2, winner,
+                    termination, seed, width, height, opening, move_history,
+                    move_times, time_limit=None, node_budget=None):
+        """
+        Store one finished game, replacing any earlier record with the same
+        match key and game index.
+
+        Parameters
+        ----------
+        match_key : str or None
+            Identifier of the match the game belongs to.
+
+        game_index : int
+            Position of the game within its match.
+
+        player_1, player_2, winner : str
+            Names of the agents (player 1 moved first) and of the winner.
+
+        termination : str
+            Reason the game ended (e.g., "timeout" or "illegal move").
+
+        seed : int or None
+            Seed of the random generator the match was played with.
+
+        width, height : int
+            The board geometry.
+
+        opening : list<(int, int)>
+            Moves applied before the players took over.
+
+        move_history : list<[(int, int), (int, int)]>
+            The move history returned by `Board.play`.
+
+        move_times : list<float>
+            Milliseconds taken by each move of the move history, in order.
+
+        time_limit, node_budget : numeric (optional)
+            The time control of the game.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO games (match_key, game_index, player_1, player_2, winner, "
+            "termination, seed, width, height, opening, move_history, move_times, time_limit, "
+            "node_budget, finished) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (match_key, game_index, player_1, player_2, winner, termination, seed, width,
+             height, json.dumps(opening), json.dumps(move_history), json.dumps(move_times),
+             time_limit, node_budget, time.time()))
+        self.connection.commit()
+
+    def match_games(self, match_key):
+        """
+        Return the (game index, player_1, player_2, winner, opening) rows
+        stored for a match, ordered by game index, with the opening decoded.
+        """
+        rows = self.connection.execute(
+            "SELECT game_index, player_1, player_2, winner, opening FROM games "
+            "WHERE match_key = ? ORDER BY game_index", (match_key,)).fetchall()
+        return [row[:4] + (json.loads(row[4]),) for row in rows]
+
+    def games(self, player=None):
+        """
+        Iterate over the full records (as dicts, with the JSON columns
+        decoded), optionally only those of games played by `player`.
+        """
+        query = "SELECT * FROM games"
+        args = ()
+        if player is not None:
+            query += " WHERE player_1 = ? OR player_2 = ?"
+            args = (player, player)
+        cursor = self.connection.execute(query + " ORDER BY id", args)
+        columns = [column[0] for column in cursor.description]
+        for row in cursor:
+            record = dict(zip(columns, row))
+            for column in ("opening", "move_history", "move_times"):
+                record[column] = json.loads(record[column])
+            yield record
+
+    def wins_by_opponent(self):
+        """
+        Return {(agent, opponent): (wins, games)} over all stored games.
+        """
+        rows = self.connection.execute(
+            "SELECT agent, opponent, SUM(agent = winner), COUNT(*) FROM ("
+            " SELECT player_1 AS agent, player_2 AS opponent, winner FROM games"
+            " UNION ALL"
+            " SELECT player_2 AS agent, player_1 AS opponent, winner FROM games"
+            ") GROUP BY agent, opponent").fetchall()
+        return {(agent, opponent): (wins, games) for agent, opponent, wins, games in rows}
+
+    def terminations(self):
+        """ Return {(loser, termination): count} over all stored games. """
+        rows = self.connection.execute(
+            "SELECT CASE WHEN winner = player_1 THEN player_2 ELSE player_1 END, "
+            "termination, COUNT(*) FROM games GROUP BY 1, 2").fetchall()
+        return {(loser, termination): count for loser, termination, count in rows}
+
+
+def print_summary(store):
+    table = store.wins_by_opponent()
+    for agent in sorted({agent for agent, _ in table}):
+        print(agent)
+        for (name, opponent), (wins, games) in sorted(table.items()):
+            if name == agent:
+                print("  vs {!s:<15}{:>6d} / {:<6d}{:>8.2f}%".format(
+                    opponent, wins, games, 100. * wins / games))
+    print("\nLosses by termination:")
+    for (loser, termination), count in sorted(store.terminations().items()):
+        print("  {!s:<15}{!s:<15}{:>6d}".format(loser, termination, count))
+
+
+if __name__ == "__main__":
+    print_summary(ResultsStore(sys.argv[1]))
@@ -2,6 +2,7 @@
 own agent and example heuristic functions.
 """
 
+from random import Random
 from random import randint
 
 
@@ -61,7 +62,7 @@ def open_move_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    return float(len(game.get_legal_moves(player)))
+    return float(game.count_legal_moves(player))
 
 
 def improved_score(game, player):
@@ -91,13 +92,20 @@ def improved_score(game, player):
     if game.is_winner(player):
         return float("inf")
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    own_moves = game.count_legal_moves(player)
+    opp_moves = game.count_legal_moves(game.get_opponent(player))
     return float(own_moves - opp_moves)
 
 
 class RandomPlayer():
-    """Player that chooses a move randomly."""
+    """Player that chooses a move randomly, with the global random generator
+    unless `seed()` gives it one of its own."""
+
+    rng = None
+
+    def seed(self, seed):
+        """Choose the moves with a private random generator seeded with `seed`."""
+        self.rng = Random(seed)
 
     def get_move(self, game, legal_moves, time_left):
         """Randomly select a move from the available legal moves.
@@ -126,7 +134,8 @@ class RandomPlayer():
 
         if not legal_moves:
             return (-1, -1)
-        return legal_moves[randint(0, len(legal_moves) - 1)]
+        choose = randint if self.rng is None else self.rng.randint
+        return legal_moves[choose(0, len(legal_moves) - 1)]
 
 
 class GreedyPlayer():
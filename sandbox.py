@@ -0,0 +1,150 @@
+"""
+Run agents out of process, with the move deadline enforced by the referee.
+
+`Board.play` only checks the clock after `get_move()` returns, so an agent
+that hangs (or ignores `time_left`) stalls the game forever. A
+`SandboxedPlayer` stands in for an agent on the board: the real agent lives
+in a persistent child process, built once from its `tournament.AgentSpec`
+and reused across moves and games. Each move request sends the position
+(`Board.to_bytes()`) and the time left over a pipe, and the referee waits at
+most until the deadline for the reply. An agent that misses it forfeits the
+game on time (the stand-in returns no move once `time_left()` has run out);
+its child process is killed and a fresh one is started for the next game.
+An agent that raises an exception forfeits the game with no move (as an
+illegal move); the error is sent back over the pipe and reported by the
+referee as a warning.
+
+Node-budget time controls (see `isolation.NodeBudget`) are forwarded to the
+child and the nodes it used are charged to the referee's budget; since they
+have no wall-clock deadline, `hang_timeout` bounds how long a move may take.
+"""
+import multiprocessing
+import timeit
+import traceback
+import warnings
+
+from isolation import Board
+from isolation import NodeBudget
+
+# seconds a move may take under a node budget before the agent is abandoned
+HANG_TIMEOUT = 60.
+
+# placeholder for the opponent on boards rebuilt in the child process
+OPPONENT = "opponent"
+
+
+def _serve(connection, spec):
+    """
+    Child process entry point: build the agent and answer move requests
+    until the pipe is closed.
+    """
+    from tournament import AgentSpec
+    from tournament import build_agent
+
+    player = build_agent(AgentSpec(*spec)).player
+    curr_time_millis = lambda: 1000 * timeit.default_timer()
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        request_id, state, seat, remaining, nodes = request
+        players = (player, OPPONENT) if seat == 1 else (OPPONENT, player)
+        game = Board.from_bytes(state, *players)
+
+        start = curr_time_millis()
+        if nodes:
+            time_left = NodeBudget(remaining)
+        else:
+            time_left = lambda: remaining - (curr_time_millis() - start)
+        error = None
+        try:
+            move = player.get_move(game, game.get_legal_moves(), time_left)
+        except Exception:
+            move, error = None, traceback.format_exc()
+        connection.send((request_id, move, time_left.used if nodes else 0, error))
+
+
+class SandboxedPlayer(object):
+    """
+    Referee-side stand-in for an agent that runs in a child process.
+
+    Parameters
+    ----------
+    spec : tournament.AgentSpec
+        Description of the agent to build in the child process (a plain
+        sequence with the same fields is accepted).
+
+    hang_timeout : float (optional)
+        Seconds a move may take when the time control is a node budget.
+    """
+
+    def __init__(self, spec, hang_timeout=HANG_TIMEOUT):
+        self.spec = tuple(spec)
+        self.hang_timeout = hang_timeout
+        self.process = None
+        self.connection = None
+        self.request_id = 0
+        # number of moves abandoned at the deadline, and failed with an error
+        self.forfeits = 0
+        self.errors = 0
+
+    def __getstate__(self):
+        # the child process belongs to the process that started it
+        state = self.__dict__.copy()
+        state.update(process=None, connection=None)
+        return state
+
+    def start(self):
+        """ Start the child process, unless it is already running. """
+        if self.process is not None and self.process.is_alive():
+            return
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, self.spec),
+                                               daemon=True)
+        self.process.start()
+        child.close()
+
+    def close(self):
+        """ Stop the child process. """
+        if self.process is not None:
+            self.connection.close()
+            self.process.kill()
+            self.process.join()
+            self.process = self.connection = None
+
+    def get_move(self, game, legal_moves, time_left):
+        """
+        Ask the agent in the child process for a move, waiting no longer
+        than the time left. Returns None (a forfeit, once the time has run
+        out or as an illegal move) when no reply arrives in time, the child
+        fails or the agent raises an exception.
+        """
+        self.start()
+        self.request_id += 1
+        seat = 1 if game.__player_1__ is self else 2
+        nodes = hasattr(time_left, "count")
+        self.connection.send((self.request_id, game.to_bytes(), seat, time_left(), nodes))
+
+        wait = self.hang_timeout if nodes else time_left() / 1000.
+        if self.connection.poll(max(wait, 0.)):
+            try:
+                _, move, used, error = self.connection.recv()
+            except EOFError:
+                pass
+            else:
+                if nodes:
+                    time_left.count(used)
+                if error is not None:
+                    self.errors += 1
+                    warnings.warn("sandboxed agent {} failed:\n{}".format(self.spec[0], error))
+                    return None
+                return move
+
+        # no reply in time: the agent forfeits, and since it may still be
+        # busy with the abandoned request its process is replaced
+        self.forfeits += 1
+        self.close()
+        if nodes:
+            time_left.count(time_left() + 1)
+        return None
@@ -0,0 +1,90 @@
+"""
+Test cases for running agents in child processes behind the referee.
+"""
+import os
+import time
+import unittest
+
+import isolation
+import tournament
+
+from sandbox import SandboxedPlayer
+from sample_players import RandomPlayer
+
+TIME_LIMIT = 100
+
+
+class SleepyPlayer(object):
+    """ Plays its first legal move, after sleeping on the first move of a game. """
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_move(self, game, legal_moves, time_left):
+        if game.move_count < 2:
+            time.sleep(self.delay)
+        return legal_moves[0] if legal_moves else (-1, -1)
+
+
+class FailingPlayer(object):
+
+    def get_move(self, game, legal_moves, time_left):
+        raise ValueError("no move")
+
+
+class RecordingSandbox(SandboxedPlayer):
+    """ Remembers the child process that answered each move. """
+
+    def get_move(self, game, legal_moves, time_left):
+        move = super(RecordingSandbox, self).get_move(game, legal_moves, time_left)
+        self.pids.append(self.process.pid if self.process is not None else None)
+        return move
+
+
+class SandboxedPlayerTest(unittest.TestCase):
+
+    def tearDown(self):
+        self.player.close()
+
+    def test_hanging_agent_forfeits(self):
+        """ An agent past the deadline loses on time and its process is replaced """
+        self.player = RecordingSandbox(tournament.make_spec("Sleepy", SleepyPlayer, delay=2.))
+        self.player.pids = []
+        self.player.start()
+        hung = self.player.process
+
+        opponent = RandomPlayer()
+        start = time.time()
+        winner, move_history, termination = isolation.Board(self.player, opponent).play(TIME_LIMIT)
+        self.assertLess(time.time() - start, 1.)
+        self.assertEqual((winner, termination), (opponent, "timeout"))
+        self.assertEqual(self.player.forfeits, 1)
+        self.assertEqual(self.player.pids, [None])
+        self.assertFalse(hung.is_alive())
+
+        # the next game starts a fresh process and keeps it for every move
+        board = isolation.Board(self.player, opponent)
+        board.apply_move((2, 3))
+        board.apply_move((4, 3))
+        winner, move_history, termination = board.play(TIME_LIMIT)
+        pids = self.player.pids[1:]
+        self.assertGreater(len(pids), 1)
+        self.assertEqual(set(pids), {self.player.process.pid})
+        self.assertNotEqual(pids[0], hung.pid)
+        self.assertNotEqual(pids[0], os.getpid())
+        self.assertEqual(self.player.forfeits, 1)
+
+    def test_failing_agent_forfeits(self):
+        """ An exception in the agent is reported to the referee, which forfeits it """
+        self.player = SandboxedPlayer(tournament.make_spec("Failing", FailingPlayer))
+        opponent = RandomPlayer()
+        with self.assertWarnsRegex(UserWarning, "ValueError: no move"):
+            winner, move_history, termination = isolation.Board(self.player, opponent).play(1000)
+        self.assertEqual((winner, termination), (opponent, "illegal move"))
+        self.assertEqual((self.player.errors, self.player.forfeits), (1, 0))
+        # the process survives the failure
+        self.assertTrue(self.player.process.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,236 @@
+"""
+Fixed-position benchmark of the `CustomPlayer` search methods.
+
+Every search method runs to each fixed depth from 1 to its maximum depth
+on a suite of positions (seeded random playouts on 7x7 and 9x9 boards). The
+boards are `agent_test.CounterBoard`s, which count the nodes the search
+expands through `forecast_move`. For every method, position and depth the
+benchmark records the nodes visited, the time to reach the depth, the
+nodes per second, the effective branching factor (the b* for which a
+uniform tree of that depth has as many nodes as the search expanded) and
+the best move and score.
+
+`--rollouts` also measures the playout kernel of `MCTSPlayer`
+(`game_agent.random_rollout`) on its own: the random games played to the
+end per second from the positions of the suite.
+
+`--json` stores the results; with `--baseline` the run fails (exit status 1)
+when the node count of any search grew, or the total nodes per second of a
+method dropped, by more than the given thresholds against a stored file.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from agent_test import CounterBoard
+from game_agent import CustomPlayer
+from game_agent import knight_indices
+from game_agent import random_rollout
+from isolation.isolation import NO_LOCATION
+from isolation.isolation import STATE_HEADER
+from sample_players import improved_score
+
+# maximum fixed depth of every method
+METHOD_DEPTHS = {"minimax": 5, "alphabeta": 8}
+
+# (width, height, number of positions, plies played) of the position suite
+SUITE = [(7, 7, 4, 8), (7, 7, 2, 16), (9, 9, 2, 12)]
+
+NODE_THRESHOLD = 0.  # percent more nodes allowed against the baseline
+SPEED_THRESHOLD = 10.  # percent fewer nodes per second allowed
+
+
+def benchmark_positions(seed=0):
+    """
+    Return the benchmark suite as a list of (name, width, height, moves),
+    where the moves of each position are played from the empty board by a
+    seeded random playout; every position has a legal move left.
+    """
+    rng = random.Random(seed)
+    positions = []
+    for width, height, count, plies in SUITE:
+        found = 0
+        while found < count:
+            board = CounterBoard("player1", "player2", width, height)
+            moves = []
+            for _ in range(plies):
+                legal_moves = board.get_legal_moves()
+                if not legal_moves:
+                    break
+                moves.append(rng.choice(legal_moves))
+                board.apply_move(moves[-1])
+            if len(moves) == plies and board.get_legal_moves():
+                positions.append(("{}x{}-{}-{}".format(width, height, plies, found),
+                                  width, height, moves))
+                found += 1
+    return positions
+
+
+def effective_branching_factor(nodes, depth):
+    """ Solve nodes = b + b^2 + ... + b^depth for b. """
+    if nodes <= 0 or depth <= 0:
+        return 0.
+    low, high = 0., max(1., float(nodes))
+    for _ in range(100):
+        b = (low + high) / 2.
+        if sum(b ** k for k in range(1, depth + 1)) < nodes:
+            low = b
+        else:
+            high = b
+    return (low + high) / 2.
+
+
+def search(method, width, height, moves, depth, player_args=None):
+    """
+    Run one fixed-depth search of `method` from a position.
+
+    Returns
+    ----------
+    dict
+        nodes, time (seconds), move and score of the search.
+    """
+    agent = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False,
+                         method=method, **(player_args or {}))
+    agent.time_left = lambda: float("inf")
+    players = ["player1", "player2"]
+    players[len(moves) % 2] = agent
+    board = CounterBoard(players[0], players[1], width, height)
+    for move in moves:
+        board.apply_move(move)
+
+    start = time.perf_counter()
+    score, move = getattr(agent, method)(board, depth)
+    elapsed = time.perf_counter() - start
+    return {"nodes": board.counts[0], "time": elapsed, "move": list(move), "score": score}
+
+
+def run_benchmark(methods=None, max_depth=None, player_args=None):
+    """
+    Search every position of the suite with every method (by default those
+    of METHOD_DEPTHS) to each depth up to its maximum (or `max_depth`).
+
+    Returns
+    ----------
+    list<dict>
+        One entry per method, position and depth.
+    """
+    results = []
+    positions = benchmark_positions()
+    for method in methods or METHOD_DEPTHS:
+        for depth in range(1, (max_depth or METHOD_DEPTHS.get(method, 4)) + 1):
+            for name, width, height, moves in positions:
+                result = search(method, width, height, moves, depth, player_args)
+                result.update(method=method, position=name, depth=depth,
+                              ebf=effective_branching_factor(result["nodes"], depth))
+                results.append(result)
+    return results
+
+
+def rollouts_per_second(seconds=1., seed=0):
+    """
+    Return the random playouts per second of the `MCTSPlayer` kernel from
+    the positions of the suite, played in turn for about `seconds`.
+    """
+    rng = random.Random(seed)
+    starts = []
+    for name, width, height, moves in benchmark_positions():
+        board = CounterBoard("player1", "player2", width, height)
+        for move in moves:
+            board.apply_move(move)
+        state = board.to_bytes()
+        _, _, move_count, loc_1, loc_2 = STATE_HEADER.unpack_from(state)
+        starts.append((bytes(state[STATE_HEADER.size:]), knight_indices(width, height),
+                       [None if loc == NO_LOCATION else loc for loc in (loc_1, loc_2)],
+                       move_count % 2))
+
+    rollouts = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for cells, neighbors, locations, active in starts:
+            random_rollout(bytearray(cells), neighbors, locations, active, rng.random)
+        rollouts += len(starts)
+    return rollouts / (time.perf_counter() - start)
+
+
+def nodes_per_second(results, method):
+    rows = [r for r in results if r["method"] == method]
+    elapsed = sum(r["time"] for r in rows)
+    return sum(r["nodes"] for r in rows) / elapsed if elapsed else 0.
+
+
+def compare(results, baseline, node_threshold=NODE_THRESHOLD, speed_threshold=SPEED_THRESHOLD):
+    """
+    Return the list of regressions of `results` against `baseline` (the
+    results of an earlier run): searches that expanded more nodes, and
+    methods whose overall nodes per second dropped, beyond the thresholds
+    (in percent).
+    """
+    regressions = []
+    expected = {(r["method"], r["position"], r["depth"]): r["nodes"] for r in baseline}
+    for r in results:
+        base = expected.get((r["method"], r["position"], r["depth"]))
+        if base is not None and r["nodes"] > base * (1. + node_threshold / 100.):
+            regressions.append("{} {} depth {}: {} nodes, baseline {}".format(
+                r["method"], r["position"], r["depth"], r["nodes"], base))
+    for method in sorted({r["method"] for r in results}):
+        speed, base = nodes_per_second(results, method), nodes_per_second(baseline, method)
+        if base and speed < base * (1. - speed_threshold / 100.):
+            regressions.append("{}: {:.0f} nodes/s, baseline {:.0f}".format(method, speed, base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search methods on fixed positions.")
+    parser.add_argument("--methods", nargs="+", default=list(METHOD_DEPTHS),
+                        help="CustomPlayer search methods (default: %(default)s)")
+    parser.add_argument("--max-depth", type=int,
+                        help="deepest fixed depth (default: {})".format(METHOD_DEPTHS))
+    parser.add_argument("--player-args", type=json.loads, default=None, metavar="JSON",
+                        help='extra CustomPlayer arguments, e.g. \'{"symmetry_pruning": true}\'')
+    parser.add_argument("--rollouts", type=float, default=0., metavar="SECONDS",
+                        help="also time the MCTS playout kernel for this long")
+    parser.add_argument("--json", metavar="FILE", help="write the results as JSON to FILE")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="fail on regressions against the results stored in FILE")
+    parser.add_argument("--node-threshold", type=float, default=NODE_THRESHOLD,
+                        help="percent more nodes tolerated (default: %(default)s)")
+    parser.add_argument("--speed-threshold", type=float, default=SPEED_THRESHOLD,
+                        help="percent fewer nodes per second tolerated (default: %(default)s)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.methods, args.max_depth, args.player_args)
+
+    print("{:<10}{:<14}{:>6}{:>10}{:>10}{:>12}{:>7}{:>10}".format(
+        "method", "position", "depth", "nodes", "ms", "nodes/s", "ebf", "move"))
+    for r in results:
+        print("{:<10}{:<14}{:>6}{:>10}{:>10.1f}{:>12.0f}{:>7.2f}{:>10}".format(
+            r["method"], r["position"], r["depth"], r["nodes"], 1000. * r["time"],
+            r["nodes"] / r["time"] if r["time"] else 0., r["ebf"], str(tuple(r["move"]))))
+    for method in args.methods:
+        print("{}: {} nodes, {:.0f} nodes/s".format(
+            method, sum(r["nodes"] for r in results if r["method"] == method),
+            nodes_per_second(results, method)))
+    rollouts = None
+    if args.rollouts:
+        rollouts = rollouts_per_second(args.rollouts)
+        print("rollouts: {:.0f} playouts/s".format(rollouts))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"player_args": args.player_args, "results": results,
+                       "rollouts_per_second": rollouts}, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.node_threshold, args.speed_threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Tests of the regression gate of the search benchmark against a baseline.
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from unittest import mock
+
+import search_benchmark
+
+
+def result(method, position, depth, nodes, time):
+    return {"method": method, "position": position, "depth": depth, "nodes": nodes,
+            "time": time, "move": [0, 0], "score": 0., "ebf": 1.}
+
+
+# two methods at 1000 nodes/s each
+BASELINE = [result("minimax", "a", 1, 100, 0.1), result("minimax", "a", 2, 400, 0.4),
+            result("alphabeta", "a", 1, 100, 0.1), result("alphabeta", "a", 2, 300, 0.3)]
+
+
+class CompareTest(unittest.TestCase):
+
+    def test_clean(self):
+        """ Identical results, fewer nodes and faster searches are not regressions """
+        self.assertEqual(search_benchmark.compare(BASELINE, BASELINE), [])
+        faster = [dict(r, nodes=r["nodes"] - 10, time=r["time"] / 2.) for r in BASELINE]
+        self.assertEqual(search_benchmark.compare(faster, BASELINE), [])
+
+    def test_node_regression(self):
+        """ Any search expanding more nodes fails at the default NODE_THRESHOLD """
+        results = [dict(r) for r in BASELINE]
+        results[1].update(nodes=401, time=0.401)
+        regressions = search_benchmark.compare(results, BASELINE)
+        self.assertEqual(regressions, ["minimax a depth 2: 401 nodes, baseline 400"])
+        # tolerated within an explicit threshold (in percent)
+        self.assertEqual(search_benchmark.compare(results, BASELINE, node_threshold=1.), [])
+
+    def test_speed_regression(self):
+        """ A method slower by more than SPEED_THRESHOLD percent fails """
+        slowdown = 1. / (1. - (search_benchmark.SPEED_THRESHOLD + 1.) / 100.)
+        results = [dict(r, time=r["time"] * (slowdown if r["method"] == "alphabeta" else 1.))
+                   for r in BASELINE]
+        regressions = search_benchmark.compare(results, BASELINE)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("alphabeta: 890 nodes/s, baseline 1000"))
+
+        within = 1. / (1. - (search_benchmark.SPEED_THRESHOLD - 1.) / 100.)
+        results = [dict(r, time=r["time"] * within) for r in BASELINE]
+        self.assertEqual(search_benchmark.compare(results, BASELINE), [])
+
+    def test_new_searches(self):
+        """ Searches missing from the baseline are not compared """
+        results = BASELINE + [result("minimax", "b", 1, 10 ** 6, 1000.)]
+        self.assertEqual(search_benchmark.compare(results, BASELINE), [])
+
+
+class BaselineExitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.directory, "baseline.json")
+        with open(self.baseline, "w") as f:
+            json.dump({"player_args": None, "results": BASELINE, "rollouts_per_second": None}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_main(self, results, *args):
+        """ Run main() on `results`, returning its output and exit status """
+        output = io.StringIO()
+        argv = ["search_benchmark.py", "--baseline", self.baseline] + list(args)
+        with mock.patch.object(sys, "argv", argv), \
+                mock.patch.object(search_benchmark, "run_benchmark", return_value=results), \
+                contextlib.redirect_stdout(output):
+            try:
+                search_benchmark.main()
+            except SystemExit as e:
+                return output.getvalue(), e.code
+        return output.getvalue(), 0
+
+    def test_clean_run(self):
+        output, status = self.run_main(BASELINE)
+        self.assertEqual(status, 0)
+        self.assertNotIn("REGRESSION", output)
+
+    def test_node_regression(self):
+        results = [dict(r) for r in BASELINE]
+        results[3].update(nodes=330, time=0.33)
+        output, status = self.run_main(results)
+        self.assertEqual(status, 1)
+        self.assertIn("REGRESSION alphabeta a depth 2: 330 nodes, baseline 300", output)
+        # within --node-threshold the same run passes
+        _, status = self.run_main(results, "--node-threshold", "10")
+        self.assertEqual(status, 0)
+
+    def test_speed_regression(self):
+        results = [dict(r, time=2. * r["time"]) for r in BASELINE]
+        output, status = self.run_main(results)
+        self.assertEqual(status, 1)
+        self.assertIn("REGRESSION minimax: 500 nodes/s, baseline 1000", output)
+        self.assertIn("REGRESSION alphabeta: 500 nodes/s, baseline 1000", output)
+        _, status = self.run_main(results, "--speed-threshold", "60")
+        self.assertEqual(status, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
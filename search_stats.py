@@ -0,0 +1,159 @@
+"""
+Per-move search statistics and the sinks that collect them.
+
+A `CustomPlayer` created with a `stats` sink fills one `SearchStats` record
+per call to `get_move()`: the depth completed, the nodes expanded, the
+leaves evaluated, the alpha-beta cutoffs by ply from the root, the answers
+taken from its knowledge or book, the time of every iteration and the time
+(or nodes) left when it returned. The counters are plain attribute updates
+on a slotted object, and nothing is collected without a sink.
+
+Finished records are emitted as dicts to the sink: a `RingBuffer` keeps the
+most recent ones in memory, a `JsonlFile` appends them to a file (safe to
+share between processes, one line per record). `Board.play` also keeps the
+record of every move on the board (`Board.move_stats`, one entry per ply,
+parallel to `Board.move_times`), and `attach_stats()` pairs them with the
+entries of the move history.
+"""
+import collections
+import json
+import os
+
+RING_SIZE = 10000  # records kept by default in a ring buffer
+
+
+class SearchStats(object):
+    """ Statistics of the search for one move. """
+
+    __slots__ = ("source", "depth", "root_depth", "nodes", "leaves", "cutoffs",
+                 "cache_hits", "iteration_ms", "margin", "move", "extra")
+
+    def __init__(self):
+        # "search", or where a move played without searching came from
+        self.source = "search"
+        # deepest completed iteration (or fixed depth)
+        self.depth = 0
+        # depth of the iteration in progress
+        self.root_depth = 0
+        self.nodes = 0
+        self.leaves = 0
+        # cutoffs by ply from the root
+        self.cutoffs = []
+        self.cache_hits = 0
+        self.iteration_ms = []
+        # time_left() when get_move() returned
+        self.margin = None
+        self.move = None
+        # measurements added by other instrumentation (e.g., memory)
+        self.extra = {}
+
+    def cutoff(self, depth):
+        """ Count a cutoff at the node `depth` plies above the horizon. """
+        ply = self.root_depth - depth
+        cutoffs = self.cutoffs
+        while len(cutoffs) <= ply:
+            cutoffs.append(0)
+        cutoffs[ply] += 1
+
+    def as_dict(self):
+        record = {name: getattr(self, name) for name in self.__slots__
+                  if name not in ("root_depth", "extra")}
+        record["move"] = None if self.move is None else list(self.move)
+        record.update(self.extra)
+        return record
+
+
+class RingBuffer(object):
+    """ Sink keeping the last `size` records in memory. """
+
+    def __init__(self, size=RING_SIZE):
+        self.records = collections.deque(maxlen=size)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+class JsonlFile(object):
+    """
+    Sink appending every record as a line of JSON to the file at `path`.
+    Each record is written with a single `os.write` in append mode, so
+    several processes can share the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def emit(self, record):
+        os.write(self.fd, (json.dumps(record) + "\n").encode())
+
+    def close(self):
+        os.close(self.fd)
+
+    def __getstate__(self):
+        # reopened by the process that unpickles it
+        return self.path
+
+    def __setstate__(self, path):
+        self.__init__(path)
+
+
+def read_jsonl(path):
+    """ Iterate over the records of a file written by `JsonlFile`. """
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def attach_stats(move_history, move_stats):
+    """
+    Pair every move of a move history returned by `Board.play` with the
+    search record of that move from `Board.move_stats`.
+
+    Returns
+    ----------
+    list<[((int, int), dict or None),]>
+        The move history, with every move replaced by a (move, record) pair.
+    """
+    plies = iter(move_stats)
+    return [[(move, next(plies, None)) for move in turn] for turn in move_history]
+
+
+def summarize(records, key):
+    """
+    Aggregate search records by `key(record)`.
+
+    Returns
+    ----------
+    dict
+        For every key: the number of moves, of searched moves, the mean and
+        median depth of the searched moves (iterative deepening runs past the
+        end of the game once a position is solved, so the median is the more
+        robust of the two), and their mean nodes and margin.
+    """
+    totals = collections.OrderedDict()
+    depths = {}
+    for record in records:
+        name = key(record)
+        total = totals.setdefault(name, {"moves": 0, "searched": 0, "depth": 0.,
+                                         "nodes": 0., "margin": 0.})
+        total["moves"] += 1
+        if record.get("source") == "search":
+            total["searched"] += 1
+            total["depth"] += record["depth"]
+            total["nodes"] += record["nodes"]
+            total["margin"] += record["margin"] or 0.
+            depths.setdefault(name, []).append(record["depth"])
+    for name, total in totals.items():
+        for field in ("depth", "nodes", "margin"):
+            total[field] = total[field] / total["searched"] if total["searched"] else 0.
+        searched = sorted(depths.get(name, [0]))
+        total["median_depth"] = searched[len(searched) // 2]
+    return totals
@@ -0,0 +1,170 @@
+"""
+Test cases for the per-move search statistics.
+"""
+import random
+import unittest
+
+import isolation
+import search_stats
+
+from game_agent import CustomPlayer
+from game_agent import NULL_WINDOW
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_fixed_depth_statistics(self):
+        """ A fixed-depth search reports its depth, nodes and cutoffs """
+        sink = search_stats.RingBuffer()
+        player = CustomPlayer(search_depth=3, score_fn=improved_score, iterative=False,
+                              method="alphabeta", stats=sink)
+        board = isolation.Board(player, RandomPlayer(), 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        # player 1 is to move again
+        move = player.get_move(board, board.get_legal_moves(), lambda: 1000.)
+
+        self.assertEqual(len(sink), 1)
+        record = list(sink)[0]
+        self.assertEqual(record["source"], "search")
+        self.assertEqual(record["depth"], 3)
+        self.assertEqual(tuple(record["move"]), move)
+        self.assertGreater(record["nodes"], record["leaves"] // 8)
+        self.assertEqual(len(record["iteration_ms"]), 1)
+        self.assertEqual(player.last_stats.depth, 3)
+
+    def test_play_attaches_statistics(self):
+        """ Board.play keeps the statistics of every move """
+        player = CustomPlayer(search_depth=2, score_fn=improved_score, iterative=False,
+                              method="alphabeta", stats=True)
+        board = isolation.Board(player, RandomPlayer())
+        winner, move_history, termination = board.play(time_limit=1000)
+
+        self.assertEqual(len(board.move_stats), len(board.move_times))
+        self.assertTrue(all(record["depth"] == 2 for record in board.move_stats[::2]))
+        self.assertTrue(all(record is None for record in board.move_stats[1::2]))
+        totals = search_stats.summarize([r for r in board.move_stats if r], key=lambda r: "all")
+        self.assertEqual(totals["all"]["median_depth"], 2)
+
+        # the records pair up with the moves of the history
+        history = search_stats.attach_stats(move_history, board.move_stats)
+        self.assertEqual([[move for move, _ in turn] for turn in history], move_history)
+        self.assertTrue(all(tuple(record["move"]) == move for move, record in
+                            (turn[0] for turn in history) if record is not None))
+
+    def test_late_move_reductions(self):
+        """ Reduced searches are counted and visit fewer nodes """
+        nodes = []
+        for reductions in (None, True):
+            player = CustomPlayer(search_depth=5, score_fn=improved_score, iterative=False,
+                                  method="alphabeta", stats=True, reductions=reductions)
+            board = isolation.Board(player, RandomPlayer(), 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            player.get_move(board, board.get_legal_moves(), lambda: 1000.)
+            nodes.append(player.last_stats.nodes)
+
+        extra = player.last_stats.extra
+        self.assertGreater(extra["reduced"], extra.get("re_searched", 0))
+        self.assertLess(nodes[1], nodes[0])
+
+
+def fixed_positions(count=6, width=7, height=7):
+    """ Return `count` opening move lists of seeded random games, each
+    leaving a legal move to the player to move """
+    positions = []
+    for seed in range(count):
+        rng = random.Random(seed)
+        plies = 6 + seed
+        while len(positions) == seed:
+            board = isolation.Board("player1", "player2", width, height)
+            moves = []
+            while len(moves) < plies and board.get_legal_moves():
+                moves.append(rng.choice(board.get_legal_moves()))
+                board.apply_move(moves[-1])
+            if len(moves) == plies and board.get_legal_moves():
+                positions.append(moves)
+    return positions
+
+
+class LateMoveReductionTest(unittest.TestCase):
+
+    def player_board(self, moves, depth, reductions):
+        """ Return a player set up to search `depth` plies with statistics,
+        and the board after `moves` with the player to move """
+        player = CustomPlayer(search_depth=depth, score_fn=improved_score, iterative=False,
+                              method="alphabeta", reductions=reductions)
+        player.time_left = lambda: float("inf")
+        player.search_stats = search_stats.SearchStats()
+        player.search_stats.root_depth = depth
+        players = ["player1", "player2"]
+        players[len(moves) % 2] = player
+        board = isolation.Board(players[0], players[1], 7, 7)
+        for move in moves:
+            board.apply_move(move)
+        return player, board
+
+    def test_zero_reduction_matches_alphabeta(self):
+        """ With no plies reduced, checking every move against the null
+        window first finds the move and score of plain alpha-beta """
+        for moves in fixed_positions():
+            for depth in range(1, 6):
+                player, board = self.player_board(moves, depth, None)
+                expected = player.alphabeta(board, depth)
+                player, board = self.player_board(moves, depth, lambda depth, move_index: 0)
+                self.assertEqual(player.alphabeta(board, depth), expected)
+                if depth > 1:
+                    self.assertTrue(player.search_stats.extra.get("reduced"))
+
+    def test_fail_high_is_searched_again(self):
+        """ A reduced move that beats its bound is searched again at full
+        depth with the full window, and only then """
+        reduced = re_searched = 0
+        for moves in fixed_positions():
+            player, board = self.player_board(moves, 6, True)
+            calls = []
+            scouts = []
+            alphabeta, reduced_search = player.alphabeta, player.reduced_search
+
+            def traced_alphabeta(game, depth, alpha=float("-inf"), beta=float("inf"),
+                                 maximizing_player=True):
+                calls.append((game.to_bytes(), depth, alpha, beta))
+                return alphabeta(game, depth, alpha, beta, maximizing_player)
+
+            def traced_reduced_search(game, depth, move_index, bound, maximizing_player):
+                first = len(calls)
+                score = reduced_search(game, depth, move_index, bound, maximizing_player)
+                if player.reductions(depth, move_index) is not None:
+                    scouts.append((game.to_bytes(), depth, first, len(calls), score))
+                return score
+
+            player.alphabeta = traced_alphabeta
+            player.reduced_search = traced_reduced_search
+            player.alphabeta(board, 6)
+
+            for state, depth, first, last, score in scouts:
+                scout = calls[first]
+                self.assertEqual(scout[0], state)
+                self.assertLess(scout[1], depth - 1)
+                self.assertAlmostEqual(scout[3] - scout[2], NULL_WINDOW)
+                following = calls[last] if last < len(calls) else None
+                if score is None:
+                    # searched again right away, at full depth
+                    self.assertEqual(following[0], state)
+                    self.assertEqual(following[1], depth - 1)
+                    self.assertGreater(following[3] - following[2], NULL_WINDOW)
+                    re_searched += 1
+                else:
+                    self.assertFalse(following is not None and following[0] == state)
+            extra = player.search_stats.extra
+            self.assertEqual(len(scouts), extra["reduced"])
+            self.assertEqual(sum(score is None for _, _, _, _, score in scouts),
+                             extra.get("re_searched", 0))
+            reduced += len(scouts)
+        self.assertTrue(re_searched)
+        self.assertGreater(reduced, re_searched)
+
+if __name__ == '__main__':
+    unittest.main()
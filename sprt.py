@@ -0,0 +1,111 @@
+"""
+Sequential probability ratio test (SPRT) for comparing two agents.
+
+Rather than playing a fixed number of games, the test consumes the results of
+game pairs (the same opening played twice with the players switching
+initiative, as in `tournament.play_match`) and stops as soon as one of two
+hypotheses about the Elo difference between the agents can be accepted:
+
+    H0 : elo <= elo0        H1 : elo >= elo1
+
+with a probability of at most `alpha` of accepting H1 when H0 holds and of at
+most `beta` of accepting H0 when H1 holds. The log-likelihood ratio uses the
+normal approximation of the generalized SPRT over pair scores (0, 1/2 or 1),
+which accounts for the correlation between the two games of a pair.
+"""
+import math
+
+# outcome counts are regularized with this many virtual pairs of each kind so
+# the variance is defined before every outcome has been observed
+PRIOR_PAIRS = 0.5
+
+
+def elo_to_score(elo):
+    """ Return the expected score of a player `elo` points stronger. """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def score_to_elo(score):
+    """ Return the Elo difference corresponding to an expected score. """
+    score = min(max(score, 1e-6), 1. - 1e-6)
+    return -400. * math.log10(1. / score - 1.)
+
+
+class SPRT(object):
+    """
+    State of a sequential probability ratio test.
+
+    Parameters
+    ----------
+    elo0 : float (optional)
+        Elo difference of the null hypothesis H0.
+
+    elo1 : float (optional)
+        Elo difference of the alternative hypothesis H1.
+
+    alpha : float (optional)
+        Maximum probability of accepting H1 when H0 is true.
+
+    beta : float (optional)
+        Maximum probability of accepting H0 when H1 is true.
+    """
+
+    def __init__(self, elo0=0., elo1=30., alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower_bound = math.log(beta / (1. - alpha))
+        self.upper_bound = math.log((1. - beta) / alpha)
+        # number of pairs scored 0, 1/2 and 1 by the first agent
+        self.pairs = [0, 0, 0]
+
+    def add_pair(self, wins):
+        """
+        Record one game pair, given the number of games (0, 1 or 2) of the
+        pair won by the first agent.
+        """
+        self.pairs[wins] += 1
+
+    @property
+    def games(self):
+        """ Number of games recorded. """
+        return 2 * sum(self.pairs)
+
+    @property
+    def score(self):
+        """ Mean score of the first agent per game. """
+        total = sum(self.pairs)
+        if not total:
+            return 0.5
+        return (0.5 * self.pairs[1] + self.pairs[2]) / total
+
+    def llr(self):
+        """ Return the log-likelihood ratio of H1 against H0. """
+        total = sum(self.pairs)
+        if not total:
+            return 0.
+        counts = [count + PRIOR_PAIRS for count in self.pairs]
+        n = sum(counts)
+        mean = (0.5 * counts[1] + counts[2]) / n
+        var = (counts[0] * mean ** 2 + counts[1] * (0.5 - mean) ** 2 +
+               counts[2] * (1. - mean) ** 2) / n
+        s0, s1 = elo_to_score(self.elo0), elo_to_score(self.elo1)
+        return total * (s1 - s0) * (2. * mean - s0 - s1) / (2. * var)
+
+    def status(self):
+        """
+        Return "H1" or "H0" once the corresponding hypothesis is accepted,
+        or None while more games are needed.
+        """
+        llr = self.llr()
+        if llr >= self.upper_bound:
+            return "H1"
+        if llr <= self.lower_bound:
+            return "H0"
+        return None
+
+    def __str__(self):
+        return "LLR {:.2f} [{:.2f}, {:.2f}], {} games, score {:.1f}% (Elo {:+.0f})".format(
+            self.llr(), self.lower_bound, self.upper_bound, self.games,
+            100. * self.score, score_to_elo(self.score))
@@ -0,0 +1,54 @@
+"""
+Test cases for the sequential probability ratio test between two agents.
+"""
+import math
+import random
+import unittest
+
+from sprt import SPRT
+from sprt import elo_to_score
+
+
+def run_test(test, elo, rng, max_pairs=100000):
+    """ Feed `test` game pairs between agents `elo` points apart until it decides. """
+    p = elo_to_score(elo)
+    for _ in range(max_pairs):
+        test.add_pair((rng.random() < p) + (rng.random() < p))
+        status = test.status()
+        if status is not None:
+            return status
+    return None
+
+
+class SPRTTest(unittest.TestCase):
+
+    def test_bounds(self):
+        """ The acceptance bounds follow from alpha and beta """
+        test = SPRT(0., 30., alpha=0.05, beta=0.1)
+        self.assertAlmostEqual(test.lower_bound, math.log(0.1 / 0.95))
+        self.assertAlmostEqual(test.upper_bound, math.log(0.9 / 0.05))
+        self.assertEqual(test.llr(), 0.)
+        self.assertIsNone(test.status())
+
+    def test_llr_sign_around_midpoint(self):
+        """ The LLR is 0 at the midpoint score of the hypotheses and grows with the score """
+        test = SPRT(-20., 20.)
+        test.pairs = [30, 40, 30]
+        self.assertAlmostEqual(test.score, 0.5)
+        self.assertAlmostEqual(test.llr(), 0.)
+        test.pairs = [29, 40, 31]
+        self.assertGreater(test.llr(), 0.)
+        test.pairs = [31, 40, 29]
+        self.assertLess(test.llr(), 0.)
+
+    def test_simulated_streams(self):
+        """ Streams at elo1 accept H1, and streams at elo0 accept H0 """
+        rng = random.Random(0)
+        for elo, expected in [(100., "H1"), (0., "H0")]:
+            outcomes = [run_test(SPRT(0., 100.), elo, rng) for _ in range(20)]
+            # each error has a probability of at most 5%
+            self.assertGreaterEqual(outcomes.count(expected), 17)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,22 +19,52 @@ initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
 """
 
+import argparse
+import importlib
 import itertools
+import json
+import multiprocessing
+import os
 import random
+import threading
+import types
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
 
 from isolation import Board
+from isolation.records import append_record
+from isolation.records import flatten_history
+from isolation.records import make_record
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
+from game_agent import MCTSPlayer
 from game_agent import custom_score
+from opening_suite import load_suite
+from profiling import MODES as PROFILE_MODES
+from profiling import MoveProfiler
+from profiling import merge as merge_profiles
+from ratings import RatingTable
+from results_store import ResultsStore
+from memory_stats import summarize as summarize_memory
+from search_stats import read_jsonl
+from search_stats import summarize
+from sprt import SPRT
 
 NUM_MATCHES = 5  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+KNOWLEDGE_FILE = "knowledge.log"  # positions solved by the student agent
+REMOTE_IN_FLIGHT = 16  # SPRT game pairs in flight on remote workers
+
+# draws the seed of every match (and is seeded by --seed), leaving the global
+# state of the `random` module to the agents
+match_seeds = random.Random()
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
@@ -56,28 +86,125 @@ same opponents.
 
 Agent = namedtuple("Agent", ["player", "name"])
 
+# Picklable description of an agent, used to rebuild it inside worker
+# processes. `factory` is a "module:name" reference to the player class, and
+# `kwargs` holds its constructor arguments, where functions are encoded as
+# {"ref": "module:name"} and objects to construct as {"factory": ...,
+# "kwargs": {...}}.
+AgentSpec = namedtuple("AgentSpec", ["name", "factory", "kwargs"])
+
+
+def _reference(obj):
+    return "{}:{}".format(obj.__module__, obj.__qualname__)
+
+
+def _resolve(reference):
+    module, _, name = reference.partition(":")
+    obj = importlib.import_module(module)
+    for attr in name.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def make_spec(name, factory, **kwargs):
+    """
+    Describe an agent named `name` that is built by calling `factory` (a
+    player class) with `kwargs`. Function arguments (e.g., `score_fn`) are
+    stored by reference.
+    """
+    encoded = {key: {"ref": _reference(value)} if isinstance(value, types.FunctionType) else value
+               for key, value in kwargs.items()}
+    return AgentSpec(name, _reference(factory), encoded)
+
+
+def _build_arg(value):
+    if isinstance(value, dict) and "ref" in value:
+        return _resolve(value["ref"])
+    if isinstance(value, dict) and "factory" in value:
+        return _resolve(value["factory"])(**{key: _build_arg(arg)
+                                             for key, arg in value.get("kwargs", {}).items()})
+    return value
+
+
+def build_agent(spec):
+    """ Construct the `Agent` described by an `AgentSpec`. """
+    kwargs = {key: _build_arg(value) for key, value in spec.kwargs.items()}
+    return Agent(_resolve(spec.factory)(**kwargs), spec.name)
+
+
+def collect_stats(spec, memory=False):
+    """
+    Describe the `CustomPlayer` of `spec` collecting search statistics (and
+    memory statistics with `memory`).
+    """
+    return spec._replace(kwargs=dict(spec.kwargs, stats=True, memory=memory))
+
+
+def sandboxed(spec):
+    """
+    Describe the agent of `spec` running in a child process behind a
+    `sandbox.SandboxedPlayer`, which forfeits it at the move deadline even
+    if it hangs.
+    """
+    return AgentSpec(spec.name, "sandbox:SandboxedPlayer", {"spec": tuple(spec)})
+
 
-def play_match(player1, player2):
+def play_match(player1, player2, node_budget=None, seed=None, on_game=None, opening=None,
+               profiler=None, played=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    With a `node_budget`, every move is limited to that many search nodes
+    instead of `TIME_LIMIT` milliseconds (see `isolation.NodeBudget`), which
+    makes the outcome independent of machine speed and load. A `seed`
+    seeds the random generator the opening is chosen with, and the agents
+    that have a `seed(seed)` method (e.g., `RandomPlayer`) are seeded from
+    it, without touching the global state of the `random` module; and
+    `on_game(index, game, winner, move_history, termination, opening)` is
+    called as soon as each game finishes. Both games start from `opening`
+    (a list of moves, e.g., from an `opening_suite` file) when one is given.
+    A `profiler` (see `profiling.MoveProfiler`) profiles every move.
+    `played` maps the index of the games of the match that were already
+    played (e.g., before an interrupted run, from the same `opening`) to
+    their winner; they are tallied without being played again.
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
     games = [Board(player1, player2), Board(player2, player1)]
 
+    rng = random.Random(seed)
+    if seed is not None:
+        for player in (player1, player2):
+            if hasattr(player, "seed"):
+                player.seed(rng.getrandbits(32))
+
     # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+    if opening is None:
+        opening = [None, None]
+    opening = list(opening)
+    for index, move in enumerate(opening):
+        if move is None:
+            move = opening[index] = rng.choice(games[0].get_legal_moves())
         games[0].apply_move(move)
         games[1].apply_move(move)
 
     # play both games and tally the results
-    for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+    played = played or {}
+    for index, game in enumerate(games):
+        if index in played:
+            if played[index] in num_wins:
+                num_wins[played[index]] += 1
+            continue
+
+        winner, move_history, termination = game.play(time_limit=TIME_LIMIT, node_budget=node_budget,
+                                                      profiler=profiler)
+
+        if on_game is not None:
+            on_game(index, game, winner, move_history, termination, opening)
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -102,41 +229,473 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+# results stores opened by this process, by path and thread (SQLite
+# connections cannot be shared between threads)
+_stores = {}
+
+
+def open_store(path):
+    key = (path, threading.get_ident())
+    if key not in _stores:
+        _stores[key] = ResultsStore(path)
+    return _stores[key]
+
+
+# move profilers of this process, by (directory, mode)
+_profilers = {}
+
+
+def open_profiler(directory, mode):
+    key = (directory, mode)
+    if key not in _profilers:
+        _profilers[key] = MoveProfiler(mode)
+    return _profilers[key]
+
+
+def stored_result(results, match_key, name_1, name_2):
+    """
+    Return the (wins of `name_1`, wins of `name_2`) of a match that is
+    complete in the results store at path `results`, or None.
+    """
+    stored = open_store(results).match_games(match_key)
+    if len(stored) != 2:
+        return None
+    return sum(row[3] == name_1 for row in stored), sum(row[3] == name_2 for row in stored)
+
+
+def save_game(row, results=None, records=None, stats=None):
+    """
+    Write a finished game, given as the keyword arguments of
+    `ResultsStore.record_game` (and the `move_stats` of the board), to the
+    results store at path `results`, to the binary record file at path
+    `records`, and the search statistics of its moves as JSON lines to the
+    file at path `stats`.
+    """
+    if results is not None:
+        open_store(results).record_game(**{key: value for key, value in row.items()
+                                           if key != "move_stats"})
+    if records is not None:
+        winner = {row["player_1"]: 1, row["player_2"]: 2}.get(row["winner"], 0)
+        opening = list(row["opening"])
+        append_record(records, make_record(row["width"], row["height"],
+                                           opening + flatten_history(row["move_history"]),
+                                           winner, row["termination"], len(opening)))
+    if stats is not None:
+        lines = []
+        players = (row["player_1"], row["player_2"])
+        for ply, record in enumerate(row.get("move_stats") or []):
+            if record is not None:
+                record = dict(record, agent=players[ply % 2], opponent=players[1 - ply % 2],
+                              match_key=row["match_key"], game_index=row["game_index"], ply=ply)
+                lines.append(json.dumps(record) + "\n")
+        with open(stats, "a") as f:
+            f.writelines(lines)
+
+
+def run_match(agent_1, agent_2, match_key=None, seed=None, results=None,
+              resume=False, records=None, openings=None, opening_index=0, on_record=None,
+              stats=None, profile=None, profile_mode="cprofile", **options):
+    """
+    Play one match between two `Agent`s with `play_match`, passing it
+    `seed` and `options` (e.g., a node budget).
+
+    With `results` (the path of a `results_store.ResultsStore`), every game
+    is written to the store as soon as it finishes, under `match_key`. If
+    `resume` is set and the store already holds the complete match, its
+    stored result is returned without playing; if it holds part of the
+    match, only the missing games are played, from the stored opening.
+
+    With `records` (the path of a binary record file, see
+    `isolation.records`), every game is also appended to that file. With
+    `stats` (the path of a JSON lines file), the search statistics of every
+    move are appended to that file. `on_record` is called with every game in
+    the form taken by `save_game()`.
+
+    With `profile` (a directory), the moves of both agents are profiled by
+    the `profile_mode` `profiling.MoveProfiler` of the process, which writes
+    its profiles to the directory after every game. With a list of
+    `openings`, the match is played from opening number `opening_index`
+    (wrapping around) instead of a random one.
+    """
+    if openings:
+        options["opening"] = openings[opening_index % len(openings)]
+    if profile is not None:
+        options["profiler"] = open_profiler(profile, profile_mode)
+        options["profiler"].names.update({agent_1.player: agent_1.name,
+                                          agent_2.player: agent_2.name})
+    if results is None and records is None and stats is None and on_record is None \
+            and profile is None:
+        return play_match(agent_1.player, agent_2.player, seed=seed, **options)
+
+    if results is not None and resume and match_key is not None:
+        stored = stored_result(results, match_key, agent_1.name, agent_2.name)
+        if stored is not None:
+            return stored
+        rows = open_store(results).match_games(match_key)
+        if rows:
+            players = {agent_1.name: agent_1.player, agent_2.name: agent_2.player}
+            options["opening"] = [tuple(move) for move in rows[0][4]]
+            options["played"] = {row[0]: players.get(row[3]) for row in rows}
+
+    names = {agent_1.player: agent_1.name, agent_2.player: agent_2.name}
+    node_budget = options.get("node_budget")
+
+    def on_game(index, game, winner, move_history, termination, opening):
+        row = dict(match_key=match_key, game_index=index, player_1=names[game.__player_1__],
+                   player_2=names[game.__player_2__], winner=names.get(winner),
+                   termination=termination, seed=seed, width=game.width, height=game.height,
+                   opening=opening, move_history=move_history, move_times=game.move_times,
+                   time_limit=TIME_LIMIT if node_budget is None else None,
+                   node_budget=node_budget, move_stats=game.move_stats)
+        save_game(row, results, records, stats)
+        if profile is not None:
+            options["profiler"].dump(profile)
+        if on_record is not None:
+            on_record(row)
+
+    return play_match(agent_1.player, agent_2.player, seed=seed, on_game=on_game, **options)
+
+
+def play_round(agents, num_matches, executor=None, ratings=None, match_options=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    Every game result is also fed to `ratings` (a `ratings.RatingTable`)
+    when one is given. `match_options` holds extra keyword arguments for
+    every call to `run_match` (e.g., a node budget or a results store).
+
+    When an executor from `make_executor()` is given, `agents` must be
+    `AgentSpec` descriptions; every match of the round is submitted at once
+    and played in the worker processes, and the results are reported in the
+    same per-opponent tables as a sequential round.
     """
     agent_1 = agents[-1]
     wins = 0.
     total = 0.
 
+    # with a pool, queue every match of the round up front to keep all
+    # workers busy; the results are then collected opponent by opponent
+    match_options = match_options or {}
+    pending = []
+    if executor is not None:
+        for agent_2 in agents[:-1]:
+            pending.append([(agent_1 is p1, executor.submit(_play_match_job, p1, p2,
+                                                            _match_key(p1, p2, k),
+                                                            match_seeds.getrandbits(32), k,
+                                                            match_options))
+                            for p1, p2 in itertools.permutations((agent_1, agent_2))
+                            for k in range(num_matches)])
+
     print("\nPlaying Matches:")
     print("----------")
 
     for idx, agent_2 in enumerate(agents[:-1]):
 
-        counts = {agent_1.player: 0., agent_2.player: 0.}
+        counts = {agent_1.name: 0., agent_2.name: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
+
+        if executor is not None:
+            for agent_1_first, future in pending[idx]:
+                score_1, score_2 = future.result()
+                if not agent_1_first:
+                    score_1, score_2 = score_2, score_1
+                counts[agent_1.name] += score_1
+                counts[agent_2.name] += score_2
                 total += score_1 + score_2
+                record_ratings(ratings, agent_1.name, agent_2.name, score_1, score_2)
+        else:
+            # Each player takes a turn going first
+            for p1, p2 in itertools.permutations((agent_1, agent_2)):
+                for k in range(num_matches):
+                    score_1, score_2 = run_match(p1, p2, _match_key(p1, p2, k),
+                                                 match_seeds.getrandbits(32), opening_index=k,
+                                                 **match_options)
+                    counts[p1.name] += score_1
+                    counts[p2.name] += score_2
+                    total += score_1 + score_2
+                    record_ratings(ratings, p1.name, p2.name, score_1, score_2)
+
+        wins += counts[agent_1.name]
+
+        print("\tResult: {} to {}".format(int(counts[agent_1.name]),
+                                          int(counts[agent_2.name])))
+
+    return 100. * wins / total
 
-        wins += counts[agent_1.player]
 
-        print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+def _match_key(agent_1, agent_2, index, mode="round"):
+    return "{}:{}:{}:{}".format(mode, agent_1.name, agent_2.name, index)
 
-    return 100. * wins / total
+
+def record_ratings(ratings, name_1, name_2, wins_1, wins_2):
+    """ Feed the games of one match to a rating table, if any. """
+    if ratings is None:
+        return
+    if wins_1:
+        ratings.add_result(name_1, name_2, int(wins_1))
+    if wins_2:
+        ratings.add_result(name_2, name_1, int(wins_2))
+
+
+def play_scheduled(agents, ratings, num_pairs, match_options=None):
+    """
+    Play `num_pairs` matches among `agents`, each time between the pair of
+    agents picked by `ratings.next_pairing()` (i.e., where the ratings are
+    most uncertain).
+    """
+    match_options = match_options or {}
+    by_name = {agent.name: agent for agent in agents}
+    for agent in agents:
+        ratings.add_agent(agent.name)
+    for k in range(num_pairs):
+        name_1, name_2 = ratings.next_pairing()
+        if match_seeds.random() < 0.5:
+            name_1, name_2 = name_2, name_1
+        wins_1, wins_2 = run_match(by_name[name_1], by_name[name_2], None,
+                                   match_seeds.getrandbits(32), opening_index=k,
+                                   **match_options)
+        record_ratings(ratings, name_1, name_2, wins_1, wins_2)
+
+
+def name_width(names, minimum=15):
+    """ Return the width of a column of agent names, at least `minimum`,
+    leaving a space after the longest name. """
+    return max([minimum] + [len(str(name)) + 1 for name in names])
+
+
+def print_stats(path):
+    """ Print the search statistics of the file at `path` per agent and opponent. """
+    totals = summarize(read_jsonl(path), key=lambda record: (record["agent"], record["opponent"]))
+    width = name_width(name for pair in totals for name in pair)
+    print("\nSearch statistics:")
+    print("{:<{w}}{:<{w}}{:>8}{:>12}{:>14}{:>12}{:>10}".format(
+        "agent", "opponent", "moves", "mean depth", "median depth", "nodes", "margin", w=width))
+    for (agent, opponent), total in sorted(totals.items()):
+        print("{:<{w}}{:<{w}}{:>8}{:>12.2f}{:>14}{:>12.0f}{:>10.1f}".format(
+            agent, opponent, total["moves"], total["depth"], total["median_depth"],
+            total["nodes"], total["margin"], w=width))
+
+    memory = summarize_memory(read_jsonl(path), key=lambda record: record["agent"])
+    if memory:
+        width = name_width(memory)
+        print("\nMemory (KiB):")
+        print("{:<{w}}{:>10}{:>10}{:>8}  {}".format("agent", "mean peak", "max peak", "boards",
+                                                   "caches", w=width))
+        for agent, total in sorted(memory.items()):
+            print("{:<{w}}{:>10.0f}{:>10.0f}{:>8}  {}".format(
+                agent, total["peak"] / 1024., total["max_peak"] / 1024., total["boards"],
+                ", ".join("{} {:.0f}".format(name, size / 1024.)
+                          for name, size in sorted(total["caches"].items())), w=width))
+            for site, size in total["growth"].most_common(3):
+                print("{:<{w}}  grew {:.0f} at {}".format("", size / 1024., site, w=width))
+
+
+def print_ratings(ratings):
+    ratings.refit()
+    print("\n\nRatings:")
+    print("----------")
+    leaderboard = ratings.leaderboard()
+    width = name_width(name for name, _, _, _, _ in leaderboard)
+    for name, rating, low, high, games in leaderboard:
+        print("{!s:<{w}}{:>8.0f}  [{:>6.0f}, {:>6.0f}]  {:>6d} games".format(
+            name, rating, low, high, games, w=width))
+
+
+def play_sprt(agent_1, agent_2, test, max_pairs, executor=None, workers=1, match_options=None,
+              ratings=None):
+    """
+    Play game pairs between two agents until the sequential probability
+    ratio test `test` (an `sprt.SPRT`) accepts one of its hypotheses about
+    the strength of `agent_1` relative to `agent_2`, or until `max_pairs`
+    pairs have been played.
+
+    With an executor, `agent_1` and `agent_2` must be `AgentSpec`
+    descriptions and one pair per worker (`workers`) is kept in flight;
+    pairs still running when the test stops are discarded. Every pair is
+    also fed to `ratings` (a `ratings.RatingTable`) when one is given.
+
+    Returns
+    ----------
+    str or None
+        "H1" or "H0" for the accepted hypothesis, None if undecided.
+    """
+    print("\nPlaying game pairs: {} vs {}".format(agent_1.name, agent_2.name))
+    print("----------")
+
+    def record(wins, losses):
+        record_ratings(ratings, agent_1.name, agent_2.name, wins, losses)
+        test.add_pair(wins)
+        if test.games % 20 == 0:
+            print("  " + str(test))
+        return test.status()
+
+    match_options = match_options or {}
+    status = None
+    if executor is None:
+        for k in range(max_pairs):
+            wins, losses = run_match(agent_1, agent_2, _match_key(agent_1, agent_2, k, "sprt"),
+                                     match_seeds.getrandbits(32), opening_index=k,
+                                     **match_options)
+            status = record(wins, losses)
+            if status is not None:
+                break
+    else:
+        submitted = 0
+        running = set()
+        while status is None and (running or submitted < max_pairs):
+            while submitted < max_pairs and len(running) < workers:
+                running.add(executor.submit(_play_match_job, agent_1, agent_2,
+                                            _match_key(agent_1, agent_2, submitted, "sprt"),
+                                            match_seeds.getrandbits(32), submitted,
+                                            match_options))
+                submitted += 1
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                if status is None:
+                    status = record(*future.result())
+        for future in running:
+            future.cancel()
+
+    print("\nResult: {}".format(test))
+    print("{} accepted after {} games; {} games saved out of {}".format(
+        status or "Nothing", test.games, 2 * max_pairs - test.games, 2 * max_pairs))
+    return status
+
+
+# agents built by this worker process, reused across matches
+_worker_agents = {}
+
+
+def _init_worker(cores):
+    """ Pin each worker process to a dedicated core, when the OS allows. """
+    if cores is not None:
+        core = cores.get()
+        os.sched_setaffinity(0, {core})
+
+
+def _play_match_job(spec1, spec2, match_key, seed, opening_index, match_options):
+    agents = []
+    for spec in (spec1, spec2):
+        key = repr(spec)
+        if key not in _worker_agents:
+            _worker_agents[key] = build_agent(spec)
+        agents.append(_worker_agents[key])
+    return run_match(agents[0], agents[1], match_key, seed, opening_index=opening_index,
+                     **match_options)
+
+
+def make_executor(workers):
+    """
+    Create a pool of `workers` processes for playing matches. On systems
+    that support CPU affinity each worker is pinned to its own core, so the
+    wall-clock time limit stays fair under load; asking for more workers
+    than available cores is refused for the same reason.
+    """
+    cores = None
+    if hasattr(os, "sched_setaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+        if workers > len(available):
+            raise ValueError("{} workers requested but only {} cores are available".format(
+                workers, len(available)))
+        cores = multiprocessing.Queue()
+        for core in available[:workers]:
+            cores.put(core)
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cores,))
 
 
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="play matches in this many worker processes, one per core "
+                             "(default: play sequentially in this process)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="play Student (MCTS with --mcts, else ID_Improved_LMR with "
+                             "--lmr) against ID_Improved until a "
+                             "sequential probability ratio test decides between --elo0 and "
+                             "--elo1")
+    parser.add_argument("--elo0", type=float, default=0.,
+                        help="Elo difference of the null hypothesis (default: 0)")
+    parser.add_argument("--elo1", type=float, default=30.,
+                        help="Elo difference of the alternative hypothesis (default: 30)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="maximum false positive rate (default: 0.05)")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="maximum false negative rate (default: 0.05)")
+    parser.add_argument("--max-pairs", type=int, default=1000,
+                        help="stop the test undecided after this many game pairs")
+    parser.add_argument("--ratings", metavar="FILE",
+                        help="rate all agents over every game played, accumulating results "
+                             "across runs in FILE")
+    parser.add_argument("--rated-pairs", type=int, default=0,
+                        help="instead of the round robin, play this many matches between the "
+                             "agents whose ratings are most uncertain (implies --ratings)")
+    parser.add_argument("--node-budget", type=int, default=None,
+                        help="limit every move to this many search nodes instead of "
+                             "TIME_LIMIT milliseconds, for load-independent results")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed the random generator that draws the seed and opening of "
+                             "every match, so that runs with --node-budget are reproducible")
+    parser.add_argument("--results", metavar="FILE",
+                        help="write every finished game to the SQLite results store FILE")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the matches already complete in the --results store")
+    parser.add_argument("--records", metavar="FILE",
+                        help="append every finished game to the binary game record file FILE")
+    parser.add_argument("--listen", metavar="HOST:PORT",
+                        help="play the matches on the worker daemons (tournament_worker.py) "
+                             "that connect to this address; with --sprt, --workers is the "
+                             "number of game pairs kept in flight (default: {})".format(
+                                 REMOTE_IN_FLIGHT))
+    parser.add_argument("--sandbox", action="store_true",
+                        help="run every agent in its own child process and forfeit it as soon "
+                             "as it overruns a move, instead of waiting for it to return")
+    parser.add_argument("--openings", metavar="FILE",
+                        help="play the openings of a suite written by opening_suite.py in "
+                             "order, one match per opening against each opponent, instead of "
+                             "NUM_MATCHES random openings")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="append the search statistics of every move of the CustomPlayer "
+                             "agents to FILE (JSON lines) and print their mean search depth "
+                             "against each opponent")
+    parser.add_argument("--mcts", action="store_true",
+                        help="also evaluate the Monte Carlo tree search agent (MCTSPlayer) at "
+                             "the same time limit as the other agents")
+    parser.add_argument("--lmr", action="store_true",
+                        help="also evaluate ID_Improved with late move reductions "
+                             "(ID_Improved_LMR); with --stats, compare the depth it reaches")
+    parser.add_argument("--memory", action="store_true",
+                        help="add the memory used by every move, the bytes of the caches and "
+                             "the growing allocation sites to the --stats FILE (slow: traces "
+                             "every allocation; use with --node-budget)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="profile the moves of every agent by game phase and write the "
+                             "profiles to DIR (merged at the end; remote workers write to DIR "
+                             "on their own machine, and --sandbox agents are not profiled "
+                             "inside their child process)")
+    parser.add_argument("--profile-mode", choices=PROFILE_MODES, default="cprofile",
+                        help="cProfile statistics (.pstats) or sampled collapsed stacks for "
+                             "flame graphs (default: %(default)s)")
+    args = parser.parse_args()
+    if args.resume and not args.results:
+        parser.error("--resume needs a --results store")
+    if args.memory and not args.stats:
+        parser.error("--memory reports through a --stats file")
+    if args.sprt and args.rated_pairs:
+        parser.error("--rated-pairs and --sprt choose the matches differently; pick one")
+    if args.seed is not None:
+        match_seeds.seed(args.seed)
+    match_options = {"node_budget": args.node_budget, "results": args.results,
+                     "resume": args.resume, "records": args.records, "stats": args.stats}
+    num_matches = NUM_MATCHES
+    if args.profile:
+        match_options.update(profile=args.profile, profile_mode=args.profile_mode)
+    if args.openings:
+        match_options["openings"] = load_suite(args.openings)
+        num_matches = len(match_options["openings"])
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
@@ -149,20 +708,102 @@ def main():
     # (MM=minimax, AB=alpha-beta) and the heuristic function (Null=null_score,
     # Open=open_move_score, Improved=improved_score). For example, MM_Open is
     # an agent using minimax search with the open moves heuristic.
-    mm_agents = [Agent(CustomPlayer(score_fn=h, **MM_ARGS),
-                       "MM_" + name) for name, h in HEURISTICS]
-    ab_agents = [Agent(CustomPlayer(score_fn=h, **AB_ARGS),
-                       "AB_" + name) for name, h in HEURISTICS]
-    random_agents = [Agent(RandomPlayer(), "Random")]
+    mm_agents = [make_spec("MM_" + name, CustomPlayer, score_fn=h, **MM_ARGS)
+                 for name, h in HEURISTICS]
+    ab_agents = [make_spec("AB_" + name, CustomPlayer, score_fn=h, **AB_ARGS)
+                 for name, h in HEURISTICS]
+    random_agents = [make_spec("Random", RandomPlayer)]
 
     # ID_Improved agent is used for comparison to the performance of the
     # submitted agent for calibration on the performance across different
     # systems; i.e., the performance of the student agent is considered
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
-    test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
-
+    test_agents = [make_spec("ID_Improved", CustomPlayer, score_fn=improved_score, **CUSTOM_ARGS),
+                   make_spec("Student", CustomPlayer, score_fn=custom_score,
+                             knowledge=KNOWLEDGE_FILE, symmetry_pruning=True,
+                             book={"factory": "opening_book:OpeningBook"},
+                             **CUSTOM_ARGS)]
+    if args.lmr:
+        test_agents.append(make_spec("ID_Improved_LMR", CustomPlayer, score_fn=improved_score,
+                                     reductions=True, **CUSTOM_ARGS))
+
+    if args.stats:
+        # collected by the agents and attached to the moves by Board.play
+        mm_agents = [collect_stats(spec, args.memory) for spec in mm_agents]
+        ab_agents = [collect_stats(spec, args.memory) for spec in ab_agents]
+        test_agents = [collect_stats(spec, args.memory) for spec in test_agents]
+
+    if args.mcts:
+        test_agents.append(make_spec("MCTS", MCTSPlayer, **({"stats": True} if args.stats else {})))
+
+    if args.sandbox:
+        random_agents = [sandboxed(spec) for spec in random_agents]
+        mm_agents = [sandboxed(spec) for spec in mm_agents]
+        ab_agents = [sandboxed(spec) for spec in ab_agents]
+        test_agents = [sandboxed(spec) for spec in test_agents]
+
+    # agents are only rebuilt from their specs inside the workers when
+    # playing in parallel; otherwise build each of them once here
+    executor = None
+    if args.listen:
+        # imported here since the worker module builds on this one
+        from tournament_worker import RemoteExecutor
+        host, _, port = args.listen.rpartition(":")
+        executor = RemoteExecutor(host, int(port))
+        print("Waiting for tournament_worker.py --connect {}:{}".format(*executor.address))
+    elif args.workers:
+        executor = make_executor(args.workers)
+    else:
+        built = {spec.name: build_agent(spec) for spec in
+                 random_agents + mm_agents + ab_agents + test_agents}
+        random_agents = [built[spec.name] for spec in random_agents]
+        mm_agents = [built[spec.name] for spec in mm_agents]
+        ab_agents = [built[spec.name] for spec in ab_agents]
+        test_agents = [built[spec.name] for spec in test_agents]
+
+    ratings = None
+    if args.ratings or args.rated_pairs:
+        if args.ratings and os.path.exists(args.ratings):
+            ratings = RatingTable.load(args.ratings)
+        else:
+            ratings = RatingTable()
+
+    if args.sprt:
+        test = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+        play_sprt(test_agents[-1], test_agents[0], test, args.max_pairs, executor,
+                  args.workers or (REMOTE_IN_FLIGHT if args.listen else 1), match_options,
+                  ratings)
+
+    elif args.rated_pairs:
+        if executor is not None:
+            parser.error("--rated-pairs plays sequentially; drop --workers and --listen")
+        play_scheduled(random_agents + mm_agents + ab_agents + test_agents,
+                       ratings, args.rated_pairs, match_options)
+
+    else:
+        play_tournament(random_agents + mm_agents + ab_agents, test_agents,
+                        executor, ratings, match_options, num_matches)
+
+    if ratings is not None:
+        print_ratings(ratings)
+        if args.ratings:
+            ratings.save(args.ratings)
+
+    if args.stats:
+        print_stats(args.stats)
+
+    if args.profile:
+        print("\nProfiles written to {} (see profiling.py)".format(
+            ", ".join(merge_profiles(args.profile))))
+
+    if executor is not None:
+        executor.shutdown()
+
+
+def play_tournament(opponents, test_agents, executor=None, ratings=None, match_options=None,
+                    num_matches=NUM_MATCHES):
+    """ Evaluate every test agent against the fixed list of opponents. """
     print(DESCRIPTION)
     for agentUT in test_agents:
         print("")
@@ -170,8 +811,8 @@ def main():
         print("{:^25}".format("Evaluating: " + agentUT.name))
         print("*************************")
 
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
+        agents = opponents + [agentUT]
+        win_ratio = play_round(agents, num_matches, executor, ratings, match_options)
 
         print("\n\nResults:")
         print("----------")
@@ -0,0 +1,183 @@
+"""
+Test cases for playing tournament matches, alone or in a pool of worker
+processes.
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from concurrent.futures import ProcessPoolExecutor
+
+import tournament
+
+from game_agent import CustomPlayer
+from ratings import RatingTable
+from sample_players import RandomPlayer
+from sample_players import improved_score
+from sprt import SPRT
+
+NODE_BUDGET = 300
+
+
+class MatchTest(unittest.TestCase):
+
+    def test_seeded_node_budget_match(self):
+        """ A seeded match under a node budget replays move for move """
+        def play(seed):
+            histories = []
+            player = CustomPlayer(score_fn=improved_score, method="alphabeta", iterative=True)
+            tournament.play_match(player, RandomPlayer(), node_budget=NODE_BUDGET, seed=seed,
+                                  on_game=lambda index, game, winner, history, *args:
+                                  histories.append(history))
+            return histories
+
+        state = random.getstate()
+        first = play(7)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(play(7), first)
+        self.assertNotEqual(play(8), first)
+
+    def test_sprt_pairs_are_rated(self):
+        """ The game pairs of an SPRT run are fed to the rating table """
+        agents = [tournament.build_agent(tournament.make_spec(name, RandomPlayer))
+                  for name in ("Random1", "Random2")]
+        table = RatingTable()
+        with contextlib.redirect_stdout(io.StringIO()):
+            tournament.play_sprt(*agents, SPRT(), 3, ratings=table)
+        self.assertEqual(table.games("Random1"), 6)
+        self.assertEqual(table.games("Random2"), 6)
+
+    def test_long_agent_names(self):
+        """ The name columns of the reports widen to the longest agent name """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "stats.jsonl")
+        with open(path, "w") as f:
+            for agent, opponent in (("ID_Improved_LMR", "AB_Improved"),
+                                    ("AB_Improved", "ID_Improved_LMR")):
+                f.write(json.dumps({"agent": agent, "opponent": opponent, "source": "search",
+                                    "depth": 3, "nodes": 100, "margin": 5.}) + "\n")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tournament.print_stats(path)
+        lines = output.getvalue().splitlines()
+        header = next(line for line in lines if line.startswith("agent"))
+        row = next(line for line in lines if line.startswith("ID_Improved_LMR"))
+        self.assertEqual(row.split()[:2], ["ID_Improved_LMR", "AB_Improved"])
+        self.assertEqual(row.index("AB_Improved"), header.index("opponent"))
+
+        table = RatingTable()
+        table.add_result("ID_Improved_LMR_Reduced", "AB_Improved", 2)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            tournament.print_ratings(table)
+        rows = [line for line in output.getvalue().splitlines() if line.endswith("games")]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(len({line.index("[") for line in rows}), 1)
+        self.assertEqual({line.split()[0] for line in rows},
+                         {"ID_Improved_LMR_Reduced", "AB_Improved"})
+
+
+
+class ResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "results.db")
+        self.agents = [tournament.build_agent(tournament.make_spec(
+            name, CustomPlayer, score_fn=improved_score, search_depth=depth, method="alphabeta",
+            iterative=False)) for name, depth in (("AB_2", 2), ("AB_3", 3))]
+
+    def tearDown(self):
+        for key in [key for key in tournament._stores if key[0] == self.path]:
+            tournament._stores.pop(key).close()
+        shutil.rmtree(self.directory)
+
+    def run_match(self, resume, played):
+        return tournament.run_match(*self.agents, match_key="m", seed=3, results=self.path,
+                                    resume=resume, node_budget=NODE_BUDGET,
+                                    on_record=lambda row: played.append(row["game_index"]))
+
+    def test_resume_plays_missing_games(self):
+        """ Resuming a partly stored match only plays its missing games """
+        played = []
+        result = self.run_match(False, played)
+        self.assertEqual(played, [0, 1])
+        store = tournament.open_store(self.path)
+        wins, terminations = store.wins_by_opponent(), store.terminations()
+        games = list(store.games())
+        self.assertEqual(wins[("AB_2", "AB_3")][1], 2)
+        self.assertEqual(sum(terminations.values()), 2)
+        self.assertEqual(sum(wins[key][0] for key in wins), 2)
+
+        # an interrupted run stored the first game only
+        store.connection.execute("DELETE FROM games WHERE game_index = 1")
+        store.connection.commit()
+        played = []
+        self.assertEqual(self.run_match(True, played), result)
+        self.assertEqual(played, [1])
+        self.assertEqual(store.wins_by_opponent(), wins)
+        self.assertEqual(store.terminations(), terminations)
+        self.assertEqual([game["move_history"] for game in store.games()],
+                         [game["move_history"] for game in games])
+
+        # a complete match is not played again
+        played = []
+        self.assertEqual(self.run_match(True, played), result)
+        self.assertEqual(played, [])
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.specs = [tournament.make_spec("Random", RandomPlayer),
+                      tournament.make_spec("AB_Improved", CustomPlayer, score_fn=improved_score,
+                                           search_depth=3, method="alphabeta", iterative=False),
+                      tournament.make_spec("ID_Improved", CustomPlayer, score_fn=improved_score,
+                                           method="alphabeta", iterative=True)]
+        # every pair in both seats, twice, with fixed seeds
+        self.jobs = [(p1, p2, tournament._match_key(p1, p2, k), 1000 * i + k, k)
+                     for i, (p1, p2) in enumerate((p1, p2) for p1 in self.specs
+                                                  for p2 in self.specs if p1 is not p2)
+                     for k in range(2)]
+
+    def test_pool_matches_sequential_play(self):
+        """ Worker processes reach the scores of sequential play under a node budget """
+        options = {"node_budget": NODE_BUDGET}
+        agents = {spec.name: tournament.build_agent(spec) for spec in self.specs}
+        sequential = [tournament.run_match(agents[p1.name], agents[p2.name], key, seed,
+                                           opening_index=k, **options)
+                      for p1, p2, key, seed, k in self.jobs]
+
+        try:
+            executor = tournament.make_executor(2)
+        except ValueError:
+            # fewer than two cores here: the same pool, without pinning
+            executor = ProcessPoolExecutor(max_workers=2, initializer=tournament._init_worker,
+                                           initargs=(None,))
+        with executor:
+            futures = [executor.submit(tournament._play_match_job, p1, p2, key, seed, k, options)
+                       for p1, p2, key, seed, k in self.jobs]
+            pooled = [future.result(timeout=120) for future in futures]
+        self.assertEqual(pooled, sequential)
+
+    @unittest.skipUnless(hasattr(os, "sched_getaffinity"), "no CPU affinity on this system")
+    def test_workers_are_pinned_to_cores(self):
+        """ Workers run on one core each, and no more workers than cores start """
+        cores = os.sched_getaffinity(0)
+        with self.assertRaises(ValueError):
+            tournament.make_executor(len(cores) + 1)
+        with tournament.make_executor(1) as executor:
+            affinity = executor.submit(os.sched_getaffinity, 0).result(timeout=60)
+        self.assertEqual(len(affinity), 1)
+        self.assertLessEqual(affinity, cores)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+"""
+Distribute tournament matches to worker daemons over TCP.
+
+The tournament process runs a `RemoteExecutor`, which stands in for the
+process pool of `tournament.make_executor()`: it listens on a TCP port and
+hands the submitted matches to whichever worker daemons connect to it.
+Each worker (run this file with `--connect HOST:PORT`, once per machine,
+with one slot per core) pulls a new match as soon as it has finished the
+previous one, so fast machines take more of the work. Messages are JSON
+objects, one per line:
+
+    worker -> coordinator : {"type": "hello", "name": ...}
+    worker -> coordinator : {"type": "request"}
+    coordinator -> worker : {"type": "job", "id": ..., "args": [...]}
+    worker -> coordinator : {"type": "heartbeat"}
+    worker -> coordinator : {"type": "result", "id": ..., "result": [...],
+                             "games": [...]}
+    worker -> coordinator : {"type": "error", "id": ..., "error": ...}
+    coordinator -> worker : {"type": "shutdown"}
+
+The job arguments are those of `tournament._play_match_job`, with the
+agents given as `AgentSpec` lists. While playing, a worker sends a
+heartbeat every few seconds; a worker that disconnects or stays silent
+longer than the heartbeat timeout is dropped, and its matches are handed
+to the next worker that asks. The games of every finished match come back
+with its result and are written by the coordinator to its results store
+and record file, so workers need no shared storage.
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import socket
+import threading
+import time
+
+from concurrent.futures import Future
+
+from tournament import AgentSpec
+from tournament import _play_match_job
+from tournament import save_game
+from tournament import stored_result
+
+HEARTBEAT_INTERVAL = 5.  # seconds between the heartbeats of a busy worker
+HEARTBEAT_TIMEOUT = 30.  # seconds of silence before a worker is dropped
+
+# match options handled by the coordinator rather than the workers
+STORAGE_OPTIONS = ("results", "records", "resume", "stats")
+
+
+def send_message(connection, message, lock=None):
+    data = (json.dumps(message) + "\n").encode()
+    if lock is None:
+        connection.sendall(data)
+    else:
+        with lock:
+            connection.sendall(data)
+
+
+class RemoteExecutor(object):
+    """
+    Executor that plays `tournament._play_match_job` calls on remote worker
+    daemons; it supports the `submit()` and `shutdown()` calls the
+    tournament makes on a process pool.
+
+    Parameters
+    ----------
+    host, port : str, int (optional)
+        Address to listen on for workers; port 0 picks a free port (see the
+        `address` attribute).
+
+    heartbeat_timeout : float (optional)
+        Seconds a worker may stay silent while playing before its matches
+        are reassigned.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, heartbeat_timeout=HEARTBEAT_TIMEOUT):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()[:2]
+        self.lock = threading.Condition()
+        self.pending = collections.deque()
+        self.jobs = {}
+        self.next_id = 0
+        self.closing = False
+        # connection of every busy worker -> time of its last message
+        self.busy = {}
+        self.reassigned = 0
+        threading.Thread(target=self._accept, daemon=True).start()
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def submit(self, fn, spec1, spec2, match_key, seed, opening_index, match_options):
+        """
+        Queue one match. `fn` must be `tournament._play_match_job`; the
+        other arguments are passed to it on a worker.
+        """
+        if fn is not _play_match_job:
+            raise ValueError("only tournament matches can be played remotely")
+        future = Future()
+        storage = {key: match_options.get(key) for key in STORAGE_OPTIONS}
+        if storage["results"] and storage["resume"] and match_key is not None:
+            stored = stored_result(storage["results"], match_key, spec1.name, spec2.name)
+            if stored is not None:
+                future.set_result(stored)
+                return future
+
+        options = {key: value for key, value in match_options.items()
+                   if key not in STORAGE_OPTIONS}
+        with self.lock:
+            self.next_id += 1
+            self.jobs[self.next_id] = (future, [spec1, spec2, match_key, seed, opening_index,
+                                                options], storage)
+            self.pending.append(self.next_id)
+            self.lock.notify()
+        return future
+
+    def shutdown(self, wait=True):
+        """ Tell the workers to stop once no matches are left. """
+        with self.lock:
+            self.closing = True
+            self.lock.notify_all()
+        self.listener.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _next_job(self):
+        """ Wait for a match to hand out; None once shutting down. """
+        with self.lock:
+            while True:
+                while self.pending:
+                    job_id = self.pending.popleft()
+                    future = self.jobs[job_id][0]
+                    if future.done() or (not future.running() and
+                                         not future.set_running_or_notify_cancel()):
+                        del self.jobs[job_id]
+                        continue
+                    return job_id
+                if self.closing:
+                    return None
+                self.lock.wait()
+
+    def _serve(self, connection):
+        """ Talk to one worker until it leaves or is dropped. """
+        assigned = set()
+        reader = connection.makefile("r")
+        try:
+            for line in reader:
+                message = json.loads(line)
+                with self.lock:
+                    if connection in self.busy:
+                        self.busy[connection] = time.time()
+
+                if message["type"] == "request":
+                    job_id = self._next_job()
+                    if job_id is None:
+                        send_message(connection, {"type": "shutdown"})
+                        break
+                    assigned.add(job_id)
+                    with self.lock:
+                        self.busy[connection] = time.time()
+                        args = self.jobs[job_id][1]
+                    send_message(connection, {"type": "job", "id": job_id, "args": args})
+
+                elif message["type"] in ("result", "error"):
+                    job_id = message["id"]
+                    assigned.discard(job_id)
+                    with self.lock:
+                        self.busy.pop(connection, None)
+                        job = self.jobs.pop(job_id, None)
+                    if job is None or job[0].done():
+                        continue  # already played by another worker
+                    future, _, storage = job
+                    if message["type"] == "error":
+                        future.set_exception(RuntimeError(message["error"]))
+                        continue
+                    for row in message["games"]:
+                        save_game(row, storage["results"], storage["records"], storage["stats"])
+                    future.set_result(tuple(message["result"]))
+        except (OSError, ValueError):
+            pass
+        finally:
+            connection.close()
+            with self.lock:
+                self.busy.pop(connection, None)
+                # hand the unfinished matches of this worker to the others
+                for job_id in assigned:
+                    if job_id in self.jobs:
+                        self.pending.appendleft(job_id)
+                        self.reassigned += 1
+                self.lock.notify_all()
+
+    def _monitor(self):
+        """ Drop the workers that stopped sending heartbeats. """
+        while not self.closing:
+            time.sleep(min(1., self.heartbeat_timeout / 4.))
+            now = time.time()
+            with self.lock:
+                silent = [connection for connection, seen in self.busy.items()
+                          if now - seen > self.heartbeat_timeout]
+            for connection in silent:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+def run_worker(host, port, name, heartbeat_interval=HEARTBEAT_INTERVAL):
+    """
+    Play the matches handed out by the coordinator at (host, port) until it
+    says to stop. Returns the number of matches played.
+    """
+    connection = socket.create_connection((host, port))
+    reader = connection.makefile("r")
+    lock = threading.Lock()
+    played = 0
+    send_message(connection, {"type": "hello", "name": name}, lock)
+    try:
+        while True:
+            send_message(connection, {"type": "request"}, lock)
+            line = reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message["type"] != "job":
+                break
+
+            spec1, spec2, match_key, seed, opening_index, options = message["args"]
+            games = []
+            options["on_record"] = games.append
+            if options.get("openings"):
+                options["openings"] = [[tuple(move) for move in opening]
+                                       for opening in options["openings"]]
+
+            # keep the coordinator informed that the match is in progress
+            done = threading.Event()
+
+            def beat():
+                while not done.wait(heartbeat_interval):
+                    send_message(connection, {"type": "heartbeat"}, lock)
+
+            threading.Thread(target=beat, daemon=True).start()
+            try:
+                result = _play_match_job(AgentSpec(*spec1), AgentSpec(*spec2), match_key, seed,
+                                         opening_index, options)
+            except Exception as e:
+                send_message(connection, {"type": "error", "id": message["id"],
+                                          "error": repr(e)}, lock)
+                continue
+            finally:
+                done.set()
+            send_message(connection, {"type": "result", "id": message["id"],
+                                      "result": list(result), "games": games}, lock)
+            played += 1
+    finally:
+        connection.close()
+    return played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tournament matches for a remote "
+                                                 "tournament.py --listen coordinator.")
+    parser.add_argument("--connect", metavar="HOST:PORT", required=True,
+                        help="address of the coordinator")
+    parser.add_argument("--slots", type=int, default=1,
+                        help="number of matches to play at once, one process each "
+                             "(default: %(default)s)")
+    parser.add_argument("--name", default=socket.gethostname())
+    args = parser.parse_args()
+    host, _, port = args.connect.rpartition(":")
+
+    processes = [multiprocessing.Process(target=run_worker,
+                                         args=(host, int(port), "{}/{}".format(args.name, slot)))
+                 for slot in range(args.slots)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Test cases for distributing tournament matches to worker daemons.
+"""
+import json
+import socket
+import threading
+import unittest
+
+import tournament
+import tournament_worker
+
+from sample_players import RandomPlayer
+
+
+class RemoteExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = tournament_worker.RemoteExecutor()
+        self.specs = [tournament.make_spec(name, RandomPlayer) for name in ("Random1", "Random2")]
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def submit(self, count):
+        return [self.executor.submit(tournament._play_match_job, *self.specs,
+                                     "match:{}".format(k), k, k, {}) for k in range(count)]
+
+    def start_worker(self, name):
+        host, port = self.executor.address
+        thread = threading.Thread(target=tournament_worker.run_worker, args=(host, port, name))
+        thread.start()
+        return thread
+
+    def test_matches_are_played_by_workers(self):
+        """ Several workers share the queued matches """
+        futures = self.submit(6)
+        workers = [self.start_worker("w{}".format(i)) for i in range(2)]
+        for future in futures:
+            self.assertEqual(sum(future.result(timeout=60)), 2)
+        self.executor.shutdown()
+        for worker in workers:
+            worker.join(timeout=60)
+            self.assertFalse(worker.is_alive())
+
+    def test_lost_job_is_reassigned(self):
+        """ The match of a worker that disconnects goes to another worker """
+        future = self.submit(1)[0]
+        connection = socket.create_connection(self.executor.address)
+        tournament_worker.send_message(connection, {"type": "hello", "name": "lost"})
+        tournament_worker.send_message(connection, {"type": "request"})
+        self.assertEqual(json.loads(connection.makefile("r").readline())["type"], "job")
+        connection.close()
+
+        worker = self.start_worker("w")
+        self.assertEqual(sum(future.result(timeout=60)), 2)
+        self.assertEqual(self.executor.reassigned, 1)
+        self.executor.shutdown()
+        worker.join(timeout=60)
+
+
+if __name__ == '__main__':
+    unittest.main()